@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
+
+    def ready(self):
+        from django.conf import settings
+        from . import conexiones
+
+        if any('POOL_OPTIONS' in db for db in settings.DATABASES.values()):
+            conexiones.registrar_pool()
@@ -0,0 +1,85 @@
+"""
+Conteo de conexiones a la base de datos abiertas por este proceso
+
+Permite medir el efecto de CONN_MAX_AGE / pool: con conexiones persistentes
+el total crece con los hilos del servidor, no con los requests.
+
+Con el pool (DB_POOL=1) connection_created se emite en cada préstamo del
+pool, no solo al abrir: esos se cuentan aparte como préstamos y las
+aperturas reales se toman del evento connect del pool de SQLAlchemy.
+"""
+import os
+import threading
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.utils import timezone
+
+
+_bloqueo = threading.Lock()
+_abiertas = {}
+_prestamos = {}
+_desde = timezone.now()
+
+# Aperturas del pool en este hilo que aún no se asignan a un alias: el
+# evento connect ocurre dentro de get_new_connection, justo antes de
+# connection_created para la misma conexión
+_pendientes = threading.local()
+
+
+def _con_pool(alias):
+    return 'POOL_OPTIONS' in settings.DATABASES.get(alias, {})
+
+
+def contar_apertura_pool(dbapi_connection, connection_record):
+    _pendientes.total = getattr(_pendientes, 'total', 0) + 1
+
+
+def registrar_pool():
+    """Escucha las aperturas reales de los pools de SQLAlchemy (DB_POOL)"""
+    from sqlalchemy import event
+    from sqlalchemy.pool import Pool
+
+    if not event.contains(Pool, 'connect', contar_apertura_pool):
+        event.listen(Pool, 'connect', contar_apertura_pool)
+
+
+@receiver(connection_created)
+def contar_conexion(sender, connection, **kwargs):
+    alias = connection.alias
+    with _bloqueo:
+        if _con_pool(alias):
+            _prestamos[alias] = _prestamos.get(alias, 0) + 1
+            nuevas = getattr(_pendientes, 'total', 0)
+            _pendientes.total = 0
+        else:
+            nuevas = 1
+        if nuevas:
+            _abiertas[alias] = _abiertas.get(alias, 0) + nuevas
+
+
+def resumen() -> dict:
+    """
+    Conexiones abiertas por alias desde que inició el proceso, préstamos del
+    pool (solo con DB_POOL) y la configuración
+    """
+    with _bloqueo:
+        abiertas = dict(_abiertas)
+        prestamos = dict(_prestamos)
+
+    return {
+        'proceso': os.getpid(),
+        'desde': _desde,
+        'abiertas': abiertas,
+        'prestamos_pool': prestamos,
+        'configuracion': {
+            alias: {
+                'engine': db['ENGINE'],
+                'conn_max_age': db.get('CONN_MAX_AGE', 0),
+                'conn_health_checks': db.get('CONN_HEALTH_CHECKS', False),
+                'pool': db.get('POOL_OPTIONS'),
+            }
+            for alias, db in settings.DATABASES.items()
+        }
+    }
@@ -1,3 +1,44 @@
-from django.test import TestCase
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.test import SimpleTestCase
+
+from authentication import conexiones
+from migo_back import pruebas
+
+
+class PresupuestoConsultasAuthenticationTest(pruebas.PresupuestoConsultasTestCase):
+    APP = 'authentication'
+
+
+class ConexionesTest(SimpleTestCase):
+    def setUp(self):
+        for contador in (conexiones._abiertas, conexiones._prestamos):
+            parche = mock.patch.dict(contador, clear=True)
+            parche.start()
+            self.addCleanup(parche.stop)
+
+    def _prestar(self, apertura):
+        """Un préstamo del pool; apertura si el pool tuvo que abrir una conexión nueva"""
+        if apertura:
+            conexiones.contar_apertura_pool(None, None)
+        connection_created.send(sender=None, connection=SimpleNamespace(alias='default'))
+
+    def test_con_pool_cuenta_aperturas_reales_y_prestamos(self):
+        with mock.patch.dict(settings.DATABASES['default'], {'POOL_OPTIONS': {'POOL_SIZE': 10}}):
+            self._prestar(apertura=True)
+            for _ in range(4):
+                self._prestar(apertura=False)
+
+        resumen = conexiones.resumen()
+        self.assertEqual(resumen['abiertas'], {'default': 1})
+        self.assertEqual(resumen['prestamos_pool'], {'default': 5})
+
+    def test_sin_pool_cada_conexion_es_una_apertura(self):
+        self._prestar(apertura=False)
+        self._prestar(apertura=False)
+
+        self.assertEqual(conexiones.resumen()['abiertas'], {'default': 2})
+        self.assertEqual(conexiones.resumen()['prestamos_pool'], {})
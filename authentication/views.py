@@ -7,6 +7,7 @@ from rest_framework.permissions import AllowAny
 from rest_framework.response import Response
 from django.db import connection
 from django.views.decorators.csrf import csrf_exempt
+from . import conexiones
 from .models import Usuarios
 from .serializers import (
     LoginSerializer,
@@ -20,7 +21,8 @@ from .serializers import (
 def verificar_conexion(request):
     """
     Endpoint para verificar que el backend está funcionando
-    y que hay conexión con la base de datos
+    y que hay conexión con la base de datos. Incluye las conexiones abiertas
+    por el proceso (para medir la reutilización de conexiones).
     """
     try:
         # Intentar hacer una consulta simple
@@ -30,7 +32,8 @@ def verificar_conexion(request):
         return Response({
             'status': 'OK',
             'message': 'Backend conectado correctamente',
-            'database': 'Conexión a MySQL exitosa'
+            'database': 'Conexión a MySQL exitosa',
+            'conexiones': conexiones.resumen()
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({
@@ -243,32 +246,19 @@ def listar_tecnicos_disponibles(request):
     Un técnico está ocupado si tiene tickets en estado Abierto (1) o En Proceso (2)
     """
     try:
-        from tickets.models import Ticket
+        from tickets import contadores
         
-        # Obtener IDs de técnicos ocupados (con tickets abiertos o en proceso)
-        tecnicos_ocupados = Ticket.objects.filter(
-            estado_id__in=[1, 2],  # Abierto o En Proceso
-            tecnico_asignado_id__isnull=False
-        ).values_list('tecnico_asignado_id', flat=True).distinct()
+        # Técnicos con su contador de tickets activos (una consulta)
+        tecnicos = contadores.tecnicos_con_carga()
+        disponibles = [t for t in tecnicos if t.contador_tickets.activos == 0]
         
-        # Obtener todos los técnicos (rol_id = 1)
-        tecnicos = Usuarios.objects.select_related(
-            'personas_id_personas',
-            'roles_id_roles',
-            'cargos_id_cargos'
-        ).filter(
-            roles_id_roles__id_roles=1  # Solo técnicos
-        ).exclude(
-            id_usuarios__in=tecnicos_ocupados  # Excluir ocupados
-        )
-        
-        serializer = UsuarioBasicoSerializer(tecnicos, many=True)
+        serializer = UsuarioBasicoSerializer(disponibles, many=True)
         
         return Response({
             'success': True,
-            'count': tecnicos.count(),
+            'count': len(disponibles),
             'tecnicos': serializer.data,
-            'ocupados': len(tecnicos_ocupados)
+            'ocupados': len(tecnicos) - len(disponibles)
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -285,33 +275,19 @@ def listar_todos_tecnicos(request):
     Obtener todos los técnicos con su estado (disponible/ocupado)
     """
     try:
-        from tickets.models import Ticket
+        from tickets import contadores
         
-        # Obtener todos los técnicos
-        tecnicos = Usuarios.objects.select_related(
-            'personas_id_personas',
-            'roles_id_roles',
-            'cargos_id_cargos'
-        ).filter(roles_id_roles__id_roles=1)
-        
-        # Obtener técnicos ocupados
-        tecnicos_ocupados_ids = Ticket.objects.filter(
-            estado_id__in=[1, 2],
-            tecnico_asignado_id__isnull=False
-        ).values_list('tecnico_asignado_id', flat=True).distinct()
+        # Técnicos con su contador de tickets activos (una consulta)
+        tecnicos = contadores.tecnicos_con_carga()
         
         # Crear respuesta con estado
         tecnicos_data = []
         for tecnico in tecnicos:
+            contador = tecnico.contador_tickets
             tecnico_dict = UsuarioBasicoSerializer(tecnico).data
-            tecnico_dict['disponible'] = tecnico.id_usuarios not in tecnicos_ocupados_ids
-            
-            # Contar tickets activos del técnico
-            tickets_activos = Ticket.objects.filter(
-                tecnico_asignado_id=tecnico.id_usuarios,
-                estado_id__in=[1, 2]
-            ).count()
-            tecnico_dict['tickets_activos'] = tickets_activos
+            tecnico_dict['disponible'] = contador.activos == 0
+            tecnico_dict['tickets_activos'] = contador.activos
+            tecnico_dict['tickets_por_prioridad'] = contadores.carga_por_prioridad(contador)
             
             tecnicos_data.append(tecnico_dict)
         
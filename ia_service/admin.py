@@ -2,7 +2,14 @@
 Admin para el servicio de IA de MIGO
 """
 from django.contrib import admin
-from .models import IAConfiguracion, IAFeedback, IAMetricasTecnico, IAConsultasLog
+from .models import (
+    IAConfiguracion,
+    IAFeedback,
+    IAMetricasTecnico,
+    IAConsultasLog,
+    IAConsultasResumenHora,
+    IAInsightsSnapshot
+)
 
 
 @admin.register(IAConfiguracion)
@@ -49,4 +56,24 @@ class IAConsultasLogAdmin(admin.ModelAdmin):
     ]
     list_filter = ['tipo_consulta', 'fecha_consulta']
     search_fields = ['prompt_enviado', 'respuesta_ia']
-    readonly_fields = ['fecha_consulta']
\ No newline at end of file
+    readonly_fields = ['fecha_consulta']
+
+
+@admin.register(IAConsultasResumenHora)
+class IAConsultasResumenHoraAdmin(admin.ModelAdmin):
+    list_display = [
+        'hora',
+        'tipo_consulta',
+        'modelo',
+        'tramo_latencia_ms',
+        'llamadas',
+        'errores',
+        'tokens_usados'
+    ]
+    list_filter = ['tipo_consulta', 'modelo', 'hora']
+
+
+@admin.register(IAInsightsSnapshot)
+class IAInsightsSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['clave', 'fecha_generacion']
+    readonly_fields = ['fecha_generacion']
@@ -4,4 +4,7 @@ from django.apps import AppConfig
 class IaServiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'ia_service'
-    verbose_name = 'Servicio de Inteligencia Artificial'
\ No newline at end of file
+    verbose_name = 'Servicio de Inteligencia Artificial'
+
+    def ready(self):
+        from . import signals  # noqa: F401
\ No newline at end of file
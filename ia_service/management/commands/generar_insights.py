@@ -0,0 +1,35 @@
+"""
+Regenera el snapshot de insights de capacitación
+
+Uso:
+    python manage.py generar_insights                  (una vez, p. ej. desde cron)
+    python manage.py generar_insights --intervalo 15   (worker, cada 15 minutos)
+"""
+from django.core.management.base import BaseCommand
+
+from ia_service.services import InsightsCapacitacionService
+from migo_back.trabajos import repetir
+
+
+class Command(BaseCommand):
+    help = 'Regenera el snapshot de insights de capacitación'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=None,
+            help='Minutos entre regeneraciones (sin este parámetro se ejecuta una vez)'
+        )
+
+    def handle(self, *args, **options):
+        intervalo = options['intervalo']
+        if not intervalo:
+            self._pasada()
+            return
+
+        repetir(self._pasada, intervalo * 60, 'generar_insights')
+
+    def _pasada(self):
+        snapshot = InsightsCapacitacionService.generar_snapshot()
+        self.stdout.write(self.style.SUCCESS(f'Snapshot generado: {snapshot.fecha_generacion}'))
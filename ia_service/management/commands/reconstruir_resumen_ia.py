@@ -0,0 +1,41 @@
+"""
+Reconstruye el resumen horario de consultas a la IA desde ia_consultas_log
+
+Uso:
+    python manage.py reconstruir_resumen_ia
+    python manage.py reconstruir_resumen_ia --dias 30
+"""
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from ia_service.models import IAConfiguracion
+from ia_service.services import ResumenConsultasService
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye ia_consultas_resumen_hora a partir del log de consultas'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=None,
+            help='Solo reconstruir los últimos N días (default: todo el log)'
+        )
+        parser.add_argument(
+            '--modelo',
+            default=None,
+            help='Modelo a registrar (el log no lo guarda; default: modelo configurado)'
+        )
+
+    def handle(self, *args, **options):
+        modelo = options['modelo'] or IAConfiguracion.get_valor('modelo_openai', 'gpt-4o-mini')
+        desde = None
+        if options['dias']:
+            desde = timezone.now() - timedelta(days=options['dias'])
+
+        filas = ResumenConsultasService.reconstruir(modelo=modelo, desde=desde)
+
+        self.stdout.write(self.style.SUCCESS(f'Resumen reconstruido: {filas} filas'))
@@ -105,6 +105,16 @@ class IAMetricasTecnico(models.Model):
         blank=True,
         help_text='En horas'
     )
+    suma_horas_resolucion = models.DecimalField(
+        max_digits=14,
+        decimal_places=4,
+        default=0,
+        help_text='Suma de horas de resolución (para mantener el promedio por deltas)'
+    )
+    tickets_con_tiempo = models.IntegerField(
+        default=0,
+        help_text='Tickets con fecha de asignación y de resolución'
+    )
     tasa_resolucion = models.DecimalField(
         max_digits=5,
         decimal_places=2,
@@ -210,4 +220,63 @@ class IACache(models.Model):
     @property
     def esta_vigente(self):
         from django.utils import timezone
-        return timezone.now() < self.fecha_expiracion
\ No newline at end of file
+        return timezone.now() < self.fecha_expiracion
+
+class IAConsultasResumenHora(models.Model):
+    """
+    Resumen horario de consultas a la IA por tipo, modelo y tramo de latencia.
+    Se actualiza en cada consulta para no tener que recorrer ia_consultas_log.
+    """
+    # Límite superior (ms) de cada tramo del histograma de latencia
+    TRAMOS_LATENCIA_MS = [250, 500, 1000, 2000, 3000, 5000, 8000, 13000, 20000, 30000, 60000]
+    TRAMO_DESBORDE_MS = 999999999
+
+    id_resumen = models.AutoField(primary_key=True)
+    hora = models.DateTimeField(help_text='Inicio de la hora (UTC)')
+    tipo_consulta = models.CharField(max_length=20)
+    modelo = models.CharField(max_length=50)
+    tramo_latencia_ms = models.IntegerField(help_text='Límite superior del tramo de latencia')
+    llamadas = models.IntegerField(default=0)
+    errores = models.IntegerField(default=0)
+    tokens_usados = models.BigIntegerField(default=0)
+    tiempo_total_ms = models.BigIntegerField(default=0)
+    tiempo_max_ms = models.IntegerField(default=0)
+
+    class Meta:
+        managed = True  # Django manejará esta tabla
+        db_table = 'ia_consultas_resumen_hora'
+        verbose_name = 'Resumen horario IA'
+        verbose_name_plural = 'Resúmenes horarios IA'
+        unique_together = ['hora', 'tipo_consulta', 'modelo', 'tramo_latencia_ms']
+        ordering = ['-hora']
+
+    def __str__(self):
+        return f"{self.hora:%Y-%m-%d %H}h {self.tipo_consulta} ({self.modelo}) <= {self.tramo_latencia_ms} ms"
+
+    @classmethod
+    def tramo_para(cls, tiempo_ms):
+        """Retorna el límite superior del tramo que contiene tiempo_ms"""
+        for limite in cls.TRAMOS_LATENCIA_MS:
+            if tiempo_ms <= limite:
+                return limite
+        return cls.TRAMO_DESBORDE_MS
+
+
+class IAInsightsSnapshot(models.Model):
+    """
+    Resultado precalculado de un reporte de insights (JSON), regenerado
+    periódicamente por el comando generar_insights
+    """
+    id_snapshot = models.AutoField(primary_key=True)
+    clave = models.CharField(max_length=50, unique=True)
+    datos = models.TextField()
+    fecha_generacion = models.DateTimeField()
+
+    class Meta:
+        managed = True  # Django manejará esta tabla
+        db_table = 'ia_insights_snapshot'
+        verbose_name = 'Snapshot de insights'
+        verbose_name_plural = 'Snapshots de insights'
+
+    def __str__(self):
+        return f"Insights {self.clave} - {self.fecha_generacion}"
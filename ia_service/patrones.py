@@ -0,0 +1,141 @@
+"""
+Detección local de picos y tendencias en la creación de tickets (NumPy)
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from django.utils import timezone
+
+
+class AnalizadorPatrones:
+    """
+    Construye las series diarias de tickets creados (total, por categoría y
+    por prioridad) con una sola consulta y detecta, para todas a la vez:
+
+    - picos: días cuyo conteo supera en UMBRAL_Z desviaciones la media de
+      los VENTANA_DIAS días previos (z-score móvil)
+    - tendencias: pendiente de la recta ajustada a cada serie, expresada
+      como variación porcentual sobre la media diaria del periodo
+    """
+
+    VENTANA_DIAS = 7
+    UMBRAL_Z = 3.0
+    MINIMO_PICO = 3           # tickets en el día para considerarlo pico
+    UMBRAL_TENDENCIA = 25     # variación (%) a partir de la cual se reporta
+    MINIMO_TENDENCIA = 5      # tickets en el periodo para evaluar tendencia
+
+    DIMENSIONES = {
+        'categoria': ('categoria_id', 'categoria_id__nombre_categoria'),
+        'prioridad': ('prioridad_id', 'prioridad_id__nombre_prioridad'),
+    }
+
+    def __init__(self, tickets, fecha_inicio):
+        """
+        tickets: queryset de Ticket ya filtrado (incluido fecha_inicio)
+        fecha_inicio: inicio del periodo (datetime aware)
+        """
+        self.inicio = timezone.localtime(fecha_inicio).date()
+        self.dias = (timezone.localdate() - self.inicio).days + 1
+
+        campos = [campo for par in self.DIMENSIONES.values() for campo in par]
+        filas = list(tickets.order_by().values_list('fecha_creacion', *campos))
+        columnas = list(zip(*filas)) if filas else [()] * (len(campos) + 1)
+
+        dia = np.array(
+            [(timezone.localtime(f).date() - self.inicio).days for f in columnas[0]],
+            dtype=np.int64
+        )
+        dia = np.clip(dia, 0, self.dias - 1)
+
+        self.series = {'total': (['Total'], np.bincount(dia, minlength=self.dias).reshape(1, -1))}
+        for i, dimension in enumerate(self.DIMENSIONES):
+            ids = np.array(columnas[1 + 2 * i], dtype=np.int64)
+            nombres = dict(zip(columnas[1 + 2 * i], columnas[2 + 2 * i]))
+            self.series[dimension] = self._series(dia, ids, nombres)
+
+    def _series(self, dia, ids, nombres):
+        """Matriz (grupos x días) con los tickets creados por grupo y día"""
+        grupos, grupo = np.unique(ids, return_inverse=True)
+        matriz = np.bincount(
+            grupo.reshape(-1) * self.dias + dia,
+            minlength=len(grupos) * self.dias
+        ).reshape(len(grupos), self.dias)
+        return [nombres[g] for g in grupos.tolist()], matriz
+
+    def _picos(self, dimension, nombres, matriz) -> list:
+        v = self.VENTANA_DIAS
+        if self.dias <= v:
+            return []
+
+        # Ventana de los v días previos a cada día desde el día v
+        previos = sliding_window_view(matriz, v, axis=1)[:, :-1]
+        esperado = previos.mean(axis=2)
+        # Desviación mínima de 1 ticket: evita picos por series casi constantes
+        desviacion = np.maximum(previos.std(axis=2), 1.0)
+        actual = matriz[:, v:]
+        z = (actual - esperado) / desviacion
+
+        grupos, dias = np.nonzero((z >= self.UMBRAL_Z) & (actual >= self.MINIMO_PICO))
+        return [
+            {
+                'dimension': dimension,
+                'grupo': nombres[g],
+                'fecha': str(np.datetime64(self.inicio) + v + d),
+                'cantidad': int(actual[g, d]),
+                'esperado': round(float(esperado[g, d]), 1),
+                'z': round(float(z[g, d]), 2)
+            }
+            for g, d in zip(grupos.tolist(), dias.tolist())
+        ]
+
+    def _tendencias(self, dimension, nombres, matriz) -> list:
+        if self.dias < 2:
+            return []
+
+        pendiente = np.polyfit(np.arange(self.dias), matriz.T.astype(float), 1)[0]
+        totales = matriz.sum(axis=1)
+        media = totales / self.dias
+        variacion = np.divide(
+            pendiente * (self.dias - 1) * 100, media,
+            out=np.zeros(len(media)), where=media > 0
+        )
+
+        relevantes = np.nonzero(
+            (totales >= self.MINIMO_TENDENCIA) & (np.abs(variacion) >= self.UMBRAL_TENDENCIA)
+        )[0]
+        return [
+            {
+                'dimension': dimension,
+                'grupo': nombres[g],
+                'direccion': 'al alza' if variacion[g] > 0 else 'a la baja',
+                'pendiente_diaria': round(float(pendiente[g]), 3),
+                'variacion_pct': round(float(variacion[g]), 1),
+                'total': int(totales[g])
+            }
+            for g in relevantes.tolist()
+        ]
+
+    def hallazgos(self) -> dict:
+        """Picos, tendencias y series diarias del periodo"""
+        picos = []
+        tendencias = []
+        for dimension, (nombres, matriz) in self.series.items():
+            picos += self._picos(dimension, nombres, matriz)
+            tendencias += self._tendencias(dimension, nombres, matriz)
+
+        fechas = np.arange(np.datetime64(self.inicio), np.datetime64(self.inicio) + self.dias)
+        return {
+            'periodo': {
+                'desde': str(fechas[0]),
+                'hasta': str(fechas[-1]),
+                'dias': self.dias
+            },
+            'picos': sorted(picos, key=lambda p: -p['z']),
+            'tendencias': sorted(tendencias, key=lambda t: -abs(t['variacion_pct'])),
+            'series': {
+                'fechas': [str(f) for f in fechas],
+                **{
+                    dimension: dict(zip(nombres, matriz.tolist()))
+                    for dimension, (nombres, matriz) in self.series.items()
+                }
+            }
+        }
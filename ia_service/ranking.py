@@ -0,0 +1,147 @@
+"""
+Ranking determinístico de técnicos para un ticket (NumPy)
+"""
+import math
+
+import numpy as np
+
+from tickets import contadores
+from tickets.models import Ticket
+from tickets.analitica import DistribucionResolucion
+from .models import IAConfiguracion, IAMetricasTecnico
+
+
+class MotorRankingTecnicos:
+    """
+    Puntúa a todos los técnicos para una categoría en una sola pasada
+    vectorizada, combinando tasa de resolución, rapidez, feedback,
+    experiencia y carga actual (tickets activos según contador_tecnico).
+
+    Los pesos se ajustan desde ia_configuracion (claves PESOS_DEFAULT).
+    """
+
+    PESOS_DEFAULT = {
+        'peso_ranking_resolucion': 0.30,
+        'peso_ranking_rapidez': 0.20,
+        'peso_ranking_feedback': 0.15,
+        'peso_ranking_experiencia': 0.10,
+        'peso_ranking_carga': 0.25,
+    }
+
+    COMPONENTES = ['resolucion', 'rapidez', 'feedback', 'experiencia', 'carga']
+
+    def __init__(self):
+        configurados = dict(IAConfiguracion.objects.filter(
+            clave__in=self.PESOS_DEFAULT.keys()
+        ).values_list('clave', 'valor'))
+
+        pesos = []
+        for clave, default in self.PESOS_DEFAULT.items():
+            try:
+                peso = float(configurados.get(clave, default))
+            except ValueError:
+                peso = default
+            # 'nan' o 'inf' guardados antes de validarlos dejarían todos los puntajes en NaN
+            pesos.append(max(peso, 0.0) if math.isfinite(peso) else default)
+
+        self.pesos = np.array(pesos)
+        if self.pesos.sum() > 0:
+            self.pesos = self.pesos / self.pesos.sum()
+
+    def rankear(self, categoria_id: int) -> list:
+        """
+        Retorna los técnicos ordenados por puntaje (0-100) para la categoría,
+        con sus métricas y el aporte de cada componente
+        """
+        # Técnicos con su carga actual (contador_tecnico) en una consulta
+        tecnicos = contadores.tecnicos_con_carga()
+
+        if not tecnicos:
+            return []
+
+        ids = np.array([t.id_usuarios for t in tecnicos])
+        posicion = {tecnico_id: i for i, tecnico_id in enumerate(ids.tolist())}
+        n = len(ids)
+
+        resueltos = np.zeros(n)
+        totales = np.zeros(n)
+        feedback_positivo = np.zeros(n)
+        feedback_total = np.zeros(n)
+        tiempo = np.full(n, np.nan)
+        activos = np.array([t.contador_tickets.activos for t in tecnicos], dtype=float)
+
+        for m in IAMetricasTecnico.objects.filter(categoria_id=categoria_id).values(
+            'tecnico_id', 'tickets_resueltos', 'tickets_totales',
+            'feedback_positivo', 'feedback_total', 'tiempo_promedio_resolucion'
+        ):
+            i = posicion.get(m['tecnico_id'])
+            if i is None:
+                continue
+            resueltos[i] = m['tickets_resueltos']
+            totales[i] = m['tickets_totales']
+            feedback_positivo[i] = m['feedback_positivo']
+            feedback_total[i] = m['feedback_total']
+            if m['tiempo_promedio_resolucion'] is not None:
+                tiempo[i] = float(m['tiempo_promedio_resolucion'])
+
+        # La mediana es más robusta que el promedio cuando está disponible
+        distribucion = DistribucionResolucion(
+            Ticket.objects.filter(categoria_id=categoria_id, tecnico_asignado_id__in=ids.tolist()),
+            agrupar_por=['tecnico']
+        )
+        mediana = np.full(n, np.nan)
+        p90 = np.full(n, np.nan)
+        for (tecnico_id,), d in distribucion.por_grupo().items():
+            mediana[posicion[tecnico_id]] = d['mediana']
+            p90[posicion[tecnico_id]] = d['p90']
+        tiempo = np.where(np.isnan(mediana), tiempo, mediana)
+
+        componentes = self._componentes(resueltos, totales, feedback_positivo, feedback_total, tiempo, activos)
+        puntaje = self.pesos @ componentes * 100
+        orden = np.argsort(-puntaje, kind='stable')
+
+        return [
+            {
+                'posicion': posicion_ranking,
+                'tecnico_id': int(ids[i]),
+                'nombre': f"{tecnicos[i].personas_id_personas.primer_nombre} {tecnicos[i].personas_id_personas.primer_apellido}",
+                'puntaje': round(float(puntaje[i]), 2),
+                'tickets_activos': int(activos[i]),
+                'tickets_resueltos': int(resueltos[i]),
+                'tasa_resolucion': round(float(resueltos[i] / totales[i] * 100), 2) if totales[i] else 0,
+                'tiempo_promedio': None if np.isnan(tiempo[i]) else round(float(tiempo[i]), 2),
+                'tiempo_mediana': None if np.isnan(mediana[i]) else float(mediana[i]),
+                'tiempo_p90': None if np.isnan(p90[i]) else float(p90[i]),
+                'feedback_positivo': round(float(feedback_positivo[i] / feedback_total[i] * 100), 2) if feedback_total[i] else 0,
+                'componentes': {
+                    nombre: round(float(componentes[j, i]), 3)
+                    for j, nombre in enumerate(self.COMPONENTES)
+                }
+            }
+            for posicion_ranking, i in enumerate(orden.tolist(), start=1)
+        ]
+
+    @staticmethod
+    def _componentes(resueltos, totales, feedback_positivo, feedback_total, tiempo, activos):
+        """
+        Matriz (componentes x técnicos) con valores entre 0 y 1.
+        Las tasas se suavizan hacia 0.5 para no premiar muestras pequeñas.
+        """
+        resolucion = (resueltos + 1) / (totales + 2)
+        feedback = (feedback_positivo + 1) / (feedback_total + 2)
+
+        # Rapidez relativa a la mediana del grupo; sin datos = neutro (0.5)
+        conocidos = tiempo[~np.isnan(tiempo)]
+        referencia = np.median(conocidos) if len(conocidos) else 1.0
+        rapidez = np.where(
+            np.isnan(tiempo),
+            0.5,
+            referencia / (referencia + np.nan_to_num(tiempo))
+        ) if referencia > 0 else np.full(len(tiempo), 0.5)
+
+        maximo_resueltos = resueltos.max()
+        experiencia = np.log1p(resueltos) / np.log1p(maximo_resueltos) if maximo_resueltos > 0 else np.zeros(len(resueltos))
+
+        carga = 1 / (1 + activos)
+
+        return np.vstack([resolucion, rapidez, feedback, experiencia, carga])
@@ -102,6 +102,7 @@ class GuiaSolucionResponseSerializer(serializers.Serializer):
 class RecomendarTecnicoRequestSerializer(serializers.Serializer):
     """Serializer para solicitar recomendación de técnico"""
     ticket_id = serializers.IntegerField()
+    explicar = serializers.BooleanField(default=False)
 
 
 class RecomendarTecnicoResponseSerializer(serializers.Serializer):
@@ -109,12 +110,15 @@ class RecomendarTecnicoResponseSerializer(serializers.Serializer):
     success = serializers.BooleanField()
     respuesta = serializers.CharField(allow_null=True)
     error = serializers.CharField(required=False, allow_null=True)
+    tecnico_recomendado = serializers.DictField(required=False)
+    alternativa = serializers.DictField(required=False, allow_null=True)
     metricas_tecnicos = serializers.ListField(required=False)
 
 
 class AnalizarPatronesRequestSerializer(serializers.Serializer):
     """Serializer para solicitar análisis de patrones"""
     dias = serializers.IntegerField(default=30, min_value=1, max_value=365)
+    narrar = serializers.BooleanField(default=True)
 
 
 class AnalizarPatronesResponseSerializer(serializers.Serializer):
@@ -122,6 +126,8 @@ class AnalizarPatronesResponseSerializer(serializers.Serializer):
     success = serializers.BooleanField()
     respuesta = serializers.CharField(allow_null=True)
     error = serializers.CharField(required=False, allow_null=True)
+    error_narracion = serializers.CharField(required=False)
+    hallazgos = serializers.DictField(required=False)
     estadisticas = serializers.DictField(required=False)
 
 
@@ -3,16 +3,33 @@ Servicio de integración con OpenAI para MIGO
 """
 import time
 import hashlib
+from decimal import Decimal
 from datetime import timedelta
 from openai import OpenAI
 from django.conf import settings
-from django.db.models import Count
+from django.db import IntegrityError, connection, transaction
+from django.db.models import (
+    Count, Sum, Max, Q, F, Case, When, Value,
+    IntegerField, DecimalField, DurationField, FloatField, ExpressionWrapper
+)
+from django.db.models.functions import Cast, Greatest, Round, TruncHour
 from django.utils import timezone
 from datetime import timedelta
 
-from .models import IAConfiguracion, IAConsultasLog, IAMetricasTecnico, IAFeedback
+from .models import (
+    IAConfiguracion,
+    IAConsultasLog,
+    IAMetricasTecnico,
+    IAFeedback,
+    IAConsultasResumenHora,
+    IAInsightsSnapshot
+)
 from tickets.models import Ticket, CategoriaTicket
+from tickets import prioridades
+from migo_back.replicas import leer_primaria, usar_replica
 from authentication.models import Usuarios
+from .ranking import MotorRankingTecnicos
+from .patrones import AnalizadorPatrones
 
 
 class OpenAIService:
@@ -115,6 +132,12 @@ class OpenAIService:
                 tokens_usados=tokens,
                 tiempo_respuesta_ms=tiempo_ms
             )
+            ResumenConsultasService.registrar(
+                tipo_consulta=tipo_consulta,
+                modelo=self.modelo,
+                tiempo_ms=tiempo_ms,
+                tokens=tokens
+            )
             
             return {
                 'success': True,
@@ -135,6 +158,12 @@ class OpenAIService:
                 respuesta_ia=f"ERROR: {str(e)}",
                 tiempo_respuesta_ms=tiempo_ms
             )
+            ResumenConsultasService.registrar(
+                tipo_consulta=tipo_consulta,
+                modelo=self.modelo,
+                tiempo_ms=tiempo_ms,
+                error=True
+            )
             
             return {
                 'success': False,
@@ -143,6 +172,208 @@ class OpenAIService:
             }
 
 
+class ResumenConsultasService:
+    """
+    Servicio para mantener y consultar el resumen horario de consultas a la IA
+    (llamadas, errores, tokens y latencia) sin recorrer ia_consultas_log
+    """
+    
+    PERCENTILES = [50, 95, 99]
+    
+    @staticmethod
+    def registrar(tipo_consulta: str, modelo: str, tiempo_ms: int, tokens: int = None, error: bool = False, fecha=None):
+        """
+        Suma una consulta al resumen de su hora con un UPDATE atómico.
+        La fila se crea la primera vez que aparece la combinación.
+        """
+        fecha = fecha or timezone.now()
+        hora = fecha.replace(minute=0, second=0, microsecond=0)
+        tiempo_ms = tiempo_ms or 0
+        claves = {
+            'hora': hora,
+            'tipo_consulta': tipo_consulta,
+            'modelo': modelo,
+            'tramo_latencia_ms': IAConsultasResumenHora.tramo_para(tiempo_ms)
+        }
+        incrementos = {
+            'llamadas': F('llamadas') + 1,
+            'errores': F('errores') + (1 if error else 0),
+            'tokens_usados': F('tokens_usados') + (tokens or 0),
+            'tiempo_total_ms': F('tiempo_total_ms') + tiempo_ms,
+            'tiempo_max_ms': Greatest(F('tiempo_max_ms'), Value(tiempo_ms))
+        }
+        
+        if IAConsultasResumenHora.objects.filter(**claves).update(**incrementos):
+            return
+        
+        try:
+            with transaction.atomic():
+                IAConsultasResumenHora.objects.create(
+                    llamadas=1,
+                    errores=1 if error else 0,
+                    tokens_usados=tokens or 0,
+                    tiempo_total_ms=tiempo_ms,
+                    tiempo_max_ms=tiempo_ms,
+                    **claves
+                )
+        except IntegrityError:
+            # Otra consulta creó la fila en paralelo
+            IAConsultasResumenHora.objects.filter(**claves).update(**incrementos)
+    
+    @staticmethod
+    def reconstruir(modelo: str, desde=None) -> int:
+        """
+        Reconstruye el resumen a partir de ia_consultas_log con una sola
+        agregación. El log no guarda el modelo, se usa el indicado.
+        Retorna la cantidad de filas generadas.
+        """
+        consultas = IAConsultasLog.objects.all()
+        resumen = IAConsultasResumenHora.objects.all()
+        if desde:
+            desde = desde.replace(minute=0, second=0, microsecond=0)
+            consultas = consultas.filter(fecha_consulta__gte=desde)
+            resumen = resumen.filter(hora__gte=desde)
+        
+        tramo = Case(
+            *[
+                When(tiempo_respuesta_ms__lte=limite, then=Value(limite))
+                for limite in IAConsultasResumenHora.TRAMOS_LATENCIA_MS
+            ],
+            default=Value(IAConsultasResumenHora.TRAMO_DESBORDE_MS),
+            output_field=IntegerField()
+        )
+        
+        filas = consultas.order_by().annotate(
+            hora=TruncHour('fecha_consulta'),
+            tramo=tramo
+        ).values('hora', 'tipo_consulta', 'tramo').annotate(
+            llamadas=Count('id_consulta'),
+            errores=Count('id_consulta', filter=Q(respuesta_ia__startswith='ERROR:')),
+            tokens=Sum('tokens_usados'),
+            tiempo_total=Sum('tiempo_respuesta_ms'),
+            tiempo_max=Max('tiempo_respuesta_ms')
+        )
+        
+        nuevas = [
+            IAConsultasResumenHora(
+                hora=f['hora'],
+                tipo_consulta=f['tipo_consulta'],
+                modelo=modelo,
+                tramo_latencia_ms=f['tramo'],
+                llamadas=f['llamadas'],
+                errores=f['errores'],
+                tokens_usados=f['tokens'] or 0,
+                tiempo_total_ms=f['tiempo_total'] or 0,
+                tiempo_max_ms=f['tiempo_max'] or 0
+            ) for f in filas
+        ]
+        
+        with transaction.atomic():
+            resumen.delete()
+            IAConsultasResumenHora.objects.bulk_create(nuevas, batch_size=500)
+        
+        return len(nuevas)
+    
+    @staticmethod
+    def _percentil(tramos: list, p: float) -> float:
+        """
+        Estima el percentil p interpolando dentro del tramo que lo contiene.
+        tramos: lista ordenada de (limite_superior_ms, llamadas, tiempo_max_ms)
+        """
+        total = sum(llamadas for _, llamadas, _ in tramos)
+        if total == 0:
+            return None
+        
+        objetivo = total * p / 100
+        acumulado = 0
+        limite_inferior = 0
+        for limite, llamadas, tiempo_max in tramos:
+            # El máximo observado acota el tramo (y define el de desborde)
+            limite_superior = max(min(limite, tiempo_max), limite_inferior) if tiempo_max else limite
+            if llamadas and acumulado + llamadas >= objetivo:
+                fraccion = (objetivo - acumulado) / llamadas
+                return round(limite_inferior + fraccion * (limite_superior - limite_inferior), 1)
+            acumulado += llamadas
+            limite_inferior = limite
+        return float(limite_inferior)
+    
+    @classmethod
+    def _resumir(cls, filas: list) -> dict:
+        """Resume filas (ya agrupadas por tramo) de un mismo grupo"""
+        llamadas = sum(f['llamadas'] for f in filas)
+        errores = sum(f['errores'] for f in filas)
+        tokens = sum(f['tokens'] or 0 for f in filas)
+        tiempo_total = sum(f['tiempo_total'] or 0 for f in filas)
+        tramos = sorted(
+            (f['tramo_latencia_ms'], f['llamadas'], f['tiempo_max'] or 0) for f in filas
+        )
+        
+        return {
+            'llamadas': llamadas,
+            'errores': errores,
+            'tasa_error': round(errores / llamadas * 100, 2) if llamadas > 0 else 0,
+            'tokens_usados': tokens,
+            'tokens_promedio': round(tokens / llamadas, 1) if llamadas > 0 else 0,
+            'latencia_ms': {
+                'promedio': round(tiempo_total / llamadas, 1) if llamadas > 0 else None,
+                **{f'p{p}': cls._percentil(tramos, p) for p in cls.PERCENTILES},
+                'maximo': max((t[2] for t in tramos), default=None)
+            },
+            'histograma': [
+                {'hasta_ms': limite if limite != IAConsultasResumenHora.TRAMO_DESBORDE_MS else None, 'llamadas': n}
+                for limite, n, _ in tramos
+            ]
+        }
+    
+    @classmethod
+    def obtener_resumen(cls, desde, hasta, tipo_consulta: str = None, modelo: str = None) -> dict:
+        """
+        Calcula llamadas, errores, tokens y percentiles de latencia en la
+        ventana [desde, hasta) con una sola consulta agrupada
+        """
+        resumen = IAConsultasResumenHora.objects.filter(
+            hora__gte=desde.replace(minute=0, second=0, microsecond=0),
+            hora__lt=hasta
+        )
+        if tipo_consulta:
+            resumen = resumen.filter(tipo_consulta=tipo_consulta)
+        if modelo:
+            resumen = resumen.filter(modelo=modelo)
+        
+        filas = list(resumen.order_by().values(
+            'tipo_consulta', 'modelo', 'tramo_latencia_ms'
+        ).annotate(
+            llamadas=Sum('llamadas'),
+            errores=Sum('errores'),
+            tokens=Sum('tokens_usados'),
+            tiempo_total=Sum('tiempo_total_ms'),
+            tiempo_max=Max('tiempo_max_ms')
+        ))
+        
+        # Agrupar por tipo/modelo; el total combina los tramos de todos los grupos
+        grupos = {}
+        por_tramo = {}
+        for f in filas:
+            grupos.setdefault((f['tipo_consulta'], f['modelo']), []).append(f)
+            acumulado = por_tramo.setdefault(f['tramo_latencia_ms'], {
+                'tramo_latencia_ms': f['tramo_latencia_ms'],
+                'llamadas': 0, 'errores': 0, 'tokens': 0, 'tiempo_total': 0, 'tiempo_max': 0
+            })
+            acumulado['llamadas'] += f['llamadas']
+            acumulado['errores'] += f['errores']
+            acumulado['tokens'] += f['tokens'] or 0
+            acumulado['tiempo_total'] += f['tiempo_total'] or 0
+            acumulado['tiempo_max'] = max(acumulado['tiempo_max'], f['tiempo_max'] or 0)
+        
+        return {
+            'total': cls._resumir(list(por_tramo.values())),
+            'por_tipo': [
+                {'tipo_consulta': tipo, 'modelo': mod, **cls._resumir(filas_grupo)}
+                for (tipo, mod), filas_grupo in sorted(grupos.items())
+            ]
+        }
+
+
 class GuiaSolucionService(OpenAIService):
     """
     Servicio para generar guías de solución para técnicos
@@ -304,90 +535,75 @@ Sé específico y práctico en tus recomendaciones.
 
 class RecomendadorTecnicoService(OpenAIService):
     """
-    Servicio para recomendar el mejor técnico para un ticket
+    Servicio para recomendar el mejor técnico para un ticket.
+    El ranking es local (MotorRankingTecnicos); la IA solo se usa, si se
+    pide, para explicar la recomendación.
     """
     
-    def recomendar_tecnico(self, ticket_id: int, usuario_id: int) -> dict:
+    def recomendar_tecnico(self, ticket_id: int, usuario_id: int, explicar: bool = False) -> dict:
         try:
             ticket = Ticket.objects.select_related('categoria_id', 'prioridad_id').get(id_ticket=ticket_id)
         except Ticket.DoesNotExist:
             return {'success': False, 'error': 'Ticket no encontrado'}
         
-        metricas = self._obtener_metricas_tecnicos(ticket.categoria_id)
+        ranking = MotorRankingTecnicos().rankear(ticket.categoria_id_id)
         
-        if not metricas:
+        if not ranking:
             return {
                 'success': False,
-                'error': 'No hay métricas de técnicos disponibles para esta categoría'
+                'error': 'No hay técnicos disponibles para recomendar'
             }
         
-        prompt = self._construir_prompt_recomendacion(ticket, metricas)
-        
-        resultado = self._hacer_consulta(
-            prompt=prompt,
-            usuario_id=usuario_id,
-            tipo_consulta='recomendar_tecnico',
-            ticket_id=ticket_id
-        )
+        resultado = {
+            'success': True,
+            'tecnico_recomendado': ranking[0],
+            'alternativa': ranking[1] if len(ranking) > 1 else None,
+            'metricas_tecnicos': ranking,
+            'respuesta': None
+        }
         
-        if resultado['success']:
-            resultado['metricas_tecnicos'] = [
-                {
-                    'tecnico_id': m.tecnico_id,
-                    'nombre': f"{m.tecnico.personas_id_personas.primer_nombre} {m.tecnico.personas_id_personas.primer_apellido}",
-                    'tasa_resolucion': float(m.tasa_resolucion) if m.tasa_resolucion else 0,
-                    'tiempo_promedio': float(m.tiempo_promedio_resolucion) if m.tiempo_promedio_resolucion else 0,
-                    'feedback_positivo': float(m.tasa_feedback_positivo) if m.tasa_feedback_positivo else 0,
-                    'tickets_resueltos': m.tickets_resueltos
-                } for m in metricas
-            ]
+        if explicar:
+            prompt = self._construir_prompt_recomendacion(ticket, ranking[:3])
+            explicacion = self._hacer_consulta(
+                prompt=prompt,
+                usuario_id=usuario_id,
+                tipo_consulta='recomendar_tecnico',
+                ticket_id=ticket_id
+            )
+            if explicacion['success']:
+                resultado['respuesta'] = explicacion['respuesta']
+                resultado['tokens_usados'] = explicacion['tokens_usados']
+                resultado['tiempo_ms'] = explicacion['tiempo_ms']
+                resultado['consultas_restantes'] = explicacion['consultas_restantes']
+            else:
+                resultado['error_explicacion'] = explicacion['error']
         
         return resultado
     
-    def _obtener_metricas_tecnicos(self, categoria):
-        return IAMetricasTecnico.objects.filter(
-            categoria=categoria
-        ).select_related(
-            'tecnico',
-            'tecnico__personas_id_personas'
-        ).order_by('-tasa_resolucion', '-tasa_feedback_positivo')
-    
-    def _construir_prompt_recomendacion(self, ticket, metricas) -> str:
+    def _construir_prompt_recomendacion(self, ticket, candidatos) -> str:
         prompt = f"""
 TICKET A ASIGNAR:
 - ID: #{ticket.id_ticket}
 - Título: {ticket.titulo}
 - Categoría: {ticket.categoria_id.nombre_categoria}
 - Prioridad: {ticket.prioridad_id.nombre_prioridad}
-- Descripción: {ticket.descripcion[:300]}
 
-TÉCNICOS DISPONIBLES Y SUS MÉTRICAS EN ESTA CATEGORÍA:
+RANKING CALCULADO (mejores candidatos, puntaje 0-100):
 """
         
-        for m in metricas:
-            nombre = f"{m.tecnico.personas_id_personas.primer_nombre} {m.tecnico.personas_id_personas.primer_apellido}"
+        for c in candidatos:
             prompt += f"""
-- {nombre} (ID: {m.tecnico_id}):
-  * Tickets resueltos: {m.tickets_resueltos}
-  * Tasa de resolución: {m.tasa_resolucion or 0}%
-  * Tiempo promedio: {m.tiempo_promedio_resolucion or 0} horas
-  * Feedback positivo: {m.tasa_feedback_positivo or 0}%
+{c['posicion']}. {c['nombre']} (ID: {c['tecnico_id']}) - puntaje {c['puntaje']}
+  * Tickets resueltos: {c['tickets_resueltos']} (tasa {c['tasa_resolucion']}%)
+  * Tiempo mediano: {c['tiempo_mediana'] if c['tiempo_mediana'] is not None else 'sin datos'} horas
+  * Feedback positivo: {c['feedback_positivo']}%
+  * Tickets activos: {c['tickets_activos']}
 """
         
         prompt += """
 INSTRUCCIONES:
-Analiza las métricas de los técnicos y recomienda el mejor para este ticket.
-
-Considera:
-1. Experiencia en la categoría (tickets resueltos)
-2. Efectividad (tasa de resolución)
-3. Rapidez (tiempo promedio)
-4. Calidad (feedback positivo)
-
-Responde con:
-1. **TÉCNICO RECOMENDADO**: Nombre y ID del técnico
-2. **JUSTIFICACIÓN**: Por qué es la mejor opción
-3. **ALTERNATIVA**: Segundo mejor técnico en caso de no disponibilidad
+El ranking ya está decidido. En 3 a 5 líneas explica por qué el primer técnico
+es la mejor opción frente a los demás y cuándo convendría elegir la alternativa.
 """
         
         return prompt
@@ -395,33 +611,56 @@ Responde con:
 
 class DetectorPatronesService(OpenAIService):
     """
-    Servicio para detectar patrones y tendencias en tickets
+    Servicio para detectar patrones y tendencias en tickets.
+    Los picos y tendencias se calculan localmente (AnalizadorPatrones); la
+    IA solo redacta, si se pide, un resumen de esos hallazgos.
     """
     
-    def analizar_patrones(self, dias: int, usuario_id: int, categoria: str = None, prioridad: str = None) -> dict:
-        estadisticas = self._obtener_estadisticas(dias, categoria, prioridad)
-        prompt = self._construir_prompt_patrones(estadisticas, dias, categoria, prioridad)
+    def analizar_patrones(self, dias: int, usuario_id: int, categoria: str = None, prioridad: str = None, narrar: bool = True) -> dict:
+        fecha_inicio = timezone.now() - timedelta(days=dias)
         
-        resultado = self._hacer_consulta(
-            prompt=prompt,
-            usuario_id=usuario_id,
-            tipo_consulta='analizar_patrones'
-        )
+        # Solo lecturas: pueden ir a la réplica (la consulta a la IA queda fuera)
+        with usar_replica():
+            tickets = self._filtrar_tickets(fecha_inicio, categoria, prioridad)
+            estadisticas = self._obtener_estadisticas(tickets)
+            hallazgos = AnalizadorPatrones(tickets, fecha_inicio).hallazgos()
         
-        if resultado['success']:
-            resultado['estadisticas'] = estadisticas
-            resultado['filtros'] = {
+        resultado = {
+            'success': True,
+            'respuesta': None,
+            'hallazgos': hallazgos,
+            'estadisticas': estadisticas,
+            'filtros': {
                 'dias': dias,
                 'categoria': categoria,
                 'prioridad': prioridad
             }
+        }
+        
+        if not narrar:
+            return resultado
+        
+        if not hallazgos['picos'] and not hallazgos['tendencias']:
+            resultado['respuesta'] = 'No se detectaron picos ni tendencias relevantes en el periodo.'
+            return resultado
+        
+        prompt = self._construir_prompt_patrones(estadisticas, hallazgos, dias, categoria, prioridad)
+        narracion = self._hacer_consulta(
+            prompt=prompt,
+            usuario_id=usuario_id,
+            tipo_consulta='analizar_patrones'
+        )
+        if narracion['success']:
+            resultado['respuesta'] = narracion['respuesta']
+            resultado['tokens_usados'] = narracion['tokens_usados']
+            resultado['tiempo_ms'] = narracion['tiempo_ms']
+            resultado['consultas_restantes'] = narracion['consultas_restantes']
+        else:
+            resultado['error_narracion'] = narracion['error']
         
         return resultado
     
-    def _obtener_estadisticas(self, dias: int, categoria: str = None, prioridad: str = None) -> dict:
-        from datetime import timedelta
-        fecha_inicio = timezone.now() - timedelta(days=dias)
-        
+    def _filtrar_tickets(self, fecha_inicio, categoria: str = None, prioridad: str = None):
         tickets = Ticket.objects.filter(fecha_creacion__gte=fecha_inicio)
         
         # Aplicar filtro de categoría
@@ -432,6 +671,9 @@ class DetectorPatronesService(OpenAIService):
         if prioridad:
             tickets = tickets.filter(prioridad_id__nombre_prioridad=prioridad)
         
+        return tickets
+    
+    def _obtener_estadisticas(self, tickets) -> dict:
         total = tickets.count()
         
         por_categoria = tickets.values('categoria_id__nombre_categoria').annotate(
@@ -459,7 +701,7 @@ class DetectorPatronesService(OpenAIService):
             'por_prioridad': {item['prioridad_id__nombre_prioridad']: item['count'] for item in por_prioridad}
         }
     
-    def _construir_prompt_patrones(self, estadisticas: dict, dias: int, categoria: str = None, prioridad: str = None) -> str:
+    def _construir_prompt_patrones(self, estadisticas: dict, hallazgos: dict, dias: int, categoria: str = None, prioridad: str = None) -> str:
         filtros_texto = f"últimos {dias} días"
         if categoria:
             filtros_texto += f", categoría: {categoria}"
@@ -467,35 +709,26 @@ class DetectorPatronesService(OpenAIService):
             filtros_texto += f", prioridad: {prioridad}"
         
         prompt = f"""
-ANÁLISIS DE TICKETS ({filtros_texto}):
-
-ESTADÍSTICAS GENERALES:
-- Total de tickets: {estadisticas['total_tickets']}
-- Resueltos: {estadisticas['resueltos']}
-- Sin resolver: {estadisticas['sin_resolver']}
-- Tasa de resolución: {estadisticas['tasa_resolucion']}%
-
-POR CATEGORÍA:
-{estadisticas['por_categoria']}
-
-POR ESTADO:
-{estadisticas['por_estado']}
-
-POR PRIORIDAD:
-{estadisticas['por_prioridad']}
+HALLAZGOS DEL ANÁLISIS DE TICKETS ({filtros_texto}):
+- Total de tickets: {estadisticas['total_tickets']} (tasa de resolución {estadisticas['tasa_resolucion']}%)
 
+PICOS (día, grupo, tickets frente a lo esperado):
+"""
+        for p in hallazgos['picos'][:10]:
+            prompt += f"- {p['fecha']} · {p['dimension']} {p['grupo']}: {p['cantidad']} (esperado {p['esperado']}, z={p['z']})\n"
+        if not hallazgos['picos']:
+            prompt += "- Ninguno\n"
+        
+        prompt += "\nTENDENCIAS (variación estimada en el periodo):\n"
+        for t in hallazgos['tendencias'][:10]:
+            prompt += f"- {t['dimension']} {t['grupo']}: {t['direccion']}, {t['variacion_pct']:+}% ({t['total']} tickets)\n"
+        if not hallazgos['tendencias']:
+            prompt += "- Ninguna\n"
+        
+        prompt += """
 INSTRUCCIONES:
-Analiza estos datos y proporciona:
-
-1. **PATRONES DETECTADOS**: ¿Qué tendencias o patrones observas en los datos?
-
-2. **ÁREAS DE PREOCUPACIÓN**: ¿Hay categorías o prioridades con problemas evidentes?
-
-3. **RECOMENDACIONES**: ¿Qué acciones sugieres para mejorar la gestión de tickets?
-
-4. **PREDICCIÓN**: Basándote en los datos, ¿qué podría pasar si no se toman medidas?
-
-Sé específico y basa tus conclusiones en los números proporcionados.
+Los hallazgos ya están calculados. En 5 a 8 líneas explica qué significan,
+posibles causas y acciones recomendadas. No agregues datos que no estén arriba.
 """
         return prompt
 
@@ -505,71 +738,313 @@ class CalculadorMetricasService:
     Servicio para calcular y actualizar métricas de técnicos
     """
     
+    CAMPOS_METRICAS = [
+        'tickets_resueltos',
+        'tickets_totales',
+        'tiempo_promedio_resolucion',
+        'suma_horas_resolucion',
+        'tickets_con_tiempo',
+        'tasa_resolucion',
+        'feedback_positivo',
+        'feedback_total',
+        'tasa_feedback_positivo',
+        'fecha_calculo'
+    ]
+    
     @staticmethod
-    def actualizar_metricas_tecnico(tecnico_id: int, categoria_id: int):
-        tickets = Ticket.objects.filter(
-            tecnico_asignado_id=tecnico_id,
-            categoria_id=categoria_id
+    def _calcular_metricas(tickets, feedbacks) -> dict:
+        """
+        Calcula las métricas por (técnico, categoría) con una agregación
+        agrupada sobre tickets y otra sobre ia_feedback. El tiempo de
+        resolución se calcula en SQL.
+        Retorna {(tecnico_id, categoria_id): valores}
+        """
+        duracion = ExpressionWrapper(
+            F('fecha_resolucion') - F('fecha_asignacion'),
+            output_field=DurationField()
         )
         
-        total = tickets.count()
-        resueltos = tickets.filter(estado_id__in=[3, 4]).count()
+        filas_tickets = tickets.order_by().values(
+            'tecnico_asignado_id', 'categoria_id'
+        ).annotate(
+            total=Count('id_ticket'),
+            resueltos=Count('id_ticket', filter=Q(estado_id__in=[3, 4])),
+            tiempo_total=Sum(duracion),
+            con_tiempo=Count('id_ticket', filter=Q(
+                fecha_resolucion__isnull=False,
+                fecha_asignacion__isnull=False
+            ))
+        )
         
-        tickets_con_tiempo = tickets.filter(
-            fecha_resolucion__isnull=False,
-            fecha_asignacion__isnull=False
+        filas_feedback = feedbacks.order_by().values(
+            'tecnico_id', 'ticket__categoria_id'
+        ).annotate(
+            total=Count('id_feedback'),
+            positivos=Count('id_feedback', filter=Q(fue_util=True))
         )
+        feedback_por_par = {
+            (f['tecnico_id'], f['ticket__categoria_id']): f for f in filas_feedback
+        }
         
-        tiempo_promedio = None
-        if tickets_con_tiempo.exists():
-            tiempos = []
-            for t in tickets_con_tiempo:
-                diff = (t.fecha_resolucion - t.fecha_asignacion).total_seconds() / 3600
-                tiempos.append(diff)
-            tiempo_promedio = sum(tiempos) / len(tiempos) if tiempos else None
+        metricas = {}
+        for fila in filas_tickets:
+            par = (fila['tecnico_asignado_id'], fila['categoria_id'])
+            total = fila['total']
+            resueltos = fila['resueltos']
+            con_tiempo = fila['con_tiempo']
+            horas = fila['tiempo_total'].total_seconds() / 3600 if fila['tiempo_total'] is not None else 0
+            feedback = feedback_por_par.get(par, {'total': 0, 'positivos': 0})
+            
+            metricas[par] = {
+                'tickets_resueltos': resueltos,
+                'tickets_totales': total,
+                'tiempo_promedio_resolucion': round(horas / con_tiempo, 2) if con_tiempo > 0 else None,
+                'suma_horas_resolucion': round(Decimal(horas), 4),
+                'tickets_con_tiempo': con_tiempo,
+                'tasa_resolucion': round(resueltos / total * 100, 2) if total > 0 else None,
+                'feedback_positivo': feedback['positivos'],
+                'feedback_total': feedback['total'],
+                'tasa_feedback_positivo': round(feedback['positivos'] / feedback['total'] * 100, 2) if feedback['total'] > 0 else None
+            }
         
-        feedbacks = IAFeedback.objects.filter(
-            tecnico_id=tecnico_id,
-            ticket__categoria_id=categoria_id
+        return metricas
+    
+    @staticmethod
+    def actualizar_metricas_tecnico(tecnico_id: int, categoria_id: int):
+        metricas = CalculadorMetricasService._calcular_metricas(
+            Ticket.objects.filter(tecnico_asignado_id=tecnico_id, categoria_id=categoria_id),
+            IAFeedback.objects.filter(tecnico_id=tecnico_id, ticket__categoria_id=categoria_id)
         )
-        feedback_total = feedbacks.count()
-        feedback_positivo = feedbacks.filter(fue_util=True).count()
+        
+        valores = metricas.get((tecnico_id, categoria_id), {
+            'tickets_resueltos': 0,
+            'tickets_totales': 0,
+            'tiempo_promedio_resolucion': None,
+            'suma_horas_resolucion': 0,
+            'tickets_con_tiempo': 0,
+            'tasa_resolucion': None,
+            'feedback_positivo': 0,
+            'feedback_total': 0,
+            'tasa_feedback_positivo': None
+        })
         
         metrica, created = IAMetricasTecnico.objects.update_or_create(
             tecnico_id=tecnico_id,
             categoria_id=categoria_id,
-            defaults={
-                'tickets_resueltos': resueltos,
-                'tickets_totales': total,
-                'tiempo_promedio_resolucion': tiempo_promedio,
-                'tasa_resolucion': (resueltos / total * 100) if total > 0 else None,
-                'feedback_positivo': feedback_positivo,
-                'feedback_total': feedback_total,
-                'tasa_feedback_positivo': (feedback_positivo / feedback_total * 100) if feedback_total > 0 else None
-            }
+            defaults=valores
         )
         
         return metrica
     
+    @staticmethod
+    def _aporte_ticket(foto):
+        """
+        Aporte de un ticket a la métrica de su técnico y categoría.
+        Retorna ((tecnico_id, categoria_id), {campo: valor}) o (None, {})
+        """
+        if foto is None or foto.tecnico_id is None:
+            return None, {}
+        
+        aporte = {'tickets_totales': 1}
+        if foto.estado_id in (3, 4):
+            aporte['tickets_resueltos'] = 1
+        if foto.fecha_resolucion and foto.fecha_asignacion:
+            horas = (foto.fecha_resolucion - foto.fecha_asignacion).total_seconds() / 3600
+            aporte['tickets_con_tiempo'] = 1
+            aporte['suma_horas_resolucion'] = round(Decimal(horas), 4)
+        
+        return (foto.tecnico_id, foto.categoria_id), aporte
+    
+    @classmethod
+    def aplicar_cambios_tickets(cls, cambios):
+        """
+        Actualiza las métricas con la diferencia de aportes antes/después de
+        cada cambio (asignación, resolución, eliminación...), sin recalcular
+        cambios: lista de (antes, despues) con tickets.signals.FotoTicket
+        """
+        deltas = {}
+        for antes, despues in cambios:
+            for foto, signo in ((antes, -1), (despues, 1)):
+                par, aporte = cls._aporte_ticket(foto)
+                if par is None:
+                    continue
+                delta = deltas.setdefault(par, {})
+                for campo, valor in aporte.items():
+                    delta[campo] = delta.get(campo, 0) + signo * valor
+        
+        for (tecnico_id, categoria_id), delta in deltas.items():
+            delta = {campo: valor for campo, valor in delta.items() if valor}
+            if delta:
+                cls._aplicar_delta(tecnico_id, categoria_id, delta)
+    
+    @classmethod
+    def registrar_feedback(cls, tecnico_id: int, categoria_id: int, fue_util: bool):
+        """Suma un feedback a la métrica del técnico en la categoría"""
+        delta = {'feedback_total': 1}
+        if fue_util:
+            delta['feedback_positivo'] = 1
+        cls._aplicar_delta(tecnico_id, categoria_id, delta)
+    
+    @classmethod
+    def _aplicar_delta(cls, tecnico_id: int, categoria_id: int, delta: dict):
+        """
+        Suma el delta a los contadores con F() y recalcula promedio y tasas
+        en la misma fila. Si el par aún no tiene métrica, la calcula completa.
+        """
+        metrica = IAMetricasTecnico.objects.filter(tecnico_id=tecnico_id, categoria_id=categoria_id)
+        
+        with transaction.atomic():
+            actualizadas = metrica.update(
+                fecha_calculo=timezone.now(),
+                **{campo: F(campo) + valor for campo, valor in delta.items()}
+            )
+            if not actualizadas:
+                cls.actualizar_metricas_tecnico(tecnico_id, categoria_id)
+                return
+            
+            # Segundo UPDATE: lee los contadores ya actualizados en cualquier motor
+            metrica.update(
+                tiempo_promedio_resolucion=cls._cociente('suma_horas_resolucion', 'tickets_con_tiempo'),
+                tasa_resolucion=cls._cociente('tickets_resueltos', 'tickets_totales', por=100),
+                tasa_feedback_positivo=cls._cociente('feedback_positivo', 'feedback_total', por=100)
+            )
+    
+    @staticmethod
+    def _cociente(numerador: str, denominador: str, por: int = 1):
+        """Expresión SQL numerador * por / denominador (NULL si no hay datos)"""
+        return Case(
+            When(**{f'{denominador}__gt': 0}, then=Round(
+                Cast(F(numerador), FloatField()) * por / F(denominador),
+                2
+            )),
+            default=None,
+            output_field=DecimalField(max_digits=10, decimal_places=2)
+        )
+    
     @staticmethod
     def actualizar_todas_metricas():
-        tecnicos = Usuarios.objects.filter(roles_id_roles=1)
-        categorias = CategoriaTicket.objects.all()
-        
-        actualizadas = 0
-        for tecnico in tecnicos:
-            for categoria in categorias:
-                if Ticket.objects.filter(
-                    tecnico_asignado_id=tecnico.id_usuarios,
-                    categoria_id=categoria.id_categoria_ticket
-                ).exists():
-                    CalculadorMetricasService.actualizar_metricas_tecnico(
-                        tecnico.id_usuarios,
-                        categoria.id_categoria_ticket
-                    )
-                    actualizadas += 1
-        
-        return actualizadas
+        """
+        Recalcula las métricas de todos los pares técnico/categoría con tickets
+        y las guarda con un solo upsert masivo
+        """
+        metricas = CalculadorMetricasService._calcular_metricas(
+            Ticket.objects.filter(tecnico_asignado_id__roles_id_roles=1),
+            IAFeedback.objects.filter(tecnico__roles_id_roles=1)
+        )
+        
+        IAMetricasTecnico.objects.bulk_create(
+            [
+                IAMetricasTecnico(tecnico_id=tecnico_id, categoria_id=categoria_id, **valores)
+                for (tecnico_id, categoria_id), valores in metricas.items()
+            ],
+            batch_size=500,
+            update_conflicts=True,
+            # MySQL no acepta unique_fields: usa ON DUPLICATE KEY sobre el UNIQUE (tecnico_id, categoria_id)
+            unique_fields=(
+                ['tecnico', 'categoria'] if connection.features.supports_update_conflicts_with_target else None
+            ),
+            update_fields=CalculadorMetricasService.CAMPOS_METRICAS
+        )
+        
+        return len(metricas)
+
+class InsightsCapacitacionService:
+    """
+    Servicio para generar y servir el snapshot de insights de capacitación
+    """
+    
+    CLAVE = 'capacitacion'
+    
+    @staticmethod
+    def calcular() -> dict:
+        metricas_bajas = IAMetricasTecnico.objects.filter(
+            tasa_resolucion__lt=70,
+            tickets_totales__gte=3
+        ).select_related(
+            'tecnico__personas_id_personas',
+            'categoria'
+        )
+        
+        capacitaciones_sugeridas = []
+        for m in metricas_bajas:
+            nombre = f"{m.tecnico.personas_id_personas.primer_nombre} {m.tecnico.personas_id_personas.primer_apellido}"
+            capacitaciones_sugeridas.append({
+                'tecnico_id': m.tecnico_id,
+                'tecnico_nombre': nombre,
+                'categoria': m.categoria.nombre_categoria,
+                'tasa_resolucion': float(m.tasa_resolucion) if m.tasa_resolucion else 0,
+                'tickets_totales': m.tickets_totales,
+                'sugerencia': f"Capacitar en {m.categoria.nombre_categoria}"
+            })
+        
+        categorias_problematicas = Ticket.objects.filter(
+            estado_id__in=[1, 2]
+        ).values(
+            'categoria_id__nombre_categoria'
+        ).annotate(
+            sin_resolver=Count('id_ticket')
+        ).order_by('-sin_resolver')[:5]
+        
+        feedback_negativo = IAFeedback.objects.filter(
+            fue_util=False
+        ).values(
+            'tecnico_id',
+            'tecnico__personas_id_personas__primer_nombre',
+            'tecnico__personas_id_personas__primer_apellido'
+        ).annotate(
+            total_negativo=Count('id_feedback')
+        ).order_by('-total_negativo')[:5]
+        
+        return {
+            'capacitaciones_sugeridas': capacitaciones_sugeridas,
+            'categorias_problematicas': list(categorias_problematicas),
+            'tecnicos_con_feedback_negativo': [
+                {
+                    'tecnico_id': f['tecnico_id'],
+                    'tecnico_nombre': f"{f['tecnico__personas_id_personas__primer_nombre']} {f['tecnico__personas_id_personas__primer_apellido']}",
+                    'total_negativo': f['total_negativo']
+                } for f in feedback_negativo
+            ]
+        }
+    
+    @classmethod
+    def generar_snapshot(cls):
+        """Recalcula los insights y reemplaza el snapshot guardado"""
+        import json
+        
+        # El snapshot se sirve por insights_max_edad_minutos: se calcula desde la base principal
+        with leer_primaria():
+            datos = cls.calcular()
+        
+        snapshot, _ = IAInsightsSnapshot.objects.update_or_create(
+            clave=cls.CLAVE,
+            defaults={
+                'datos': json.dumps(datos),
+                'fecha_generacion': timezone.now()
+            }
+        )
+        return snapshot
+    
+    @classmethod
+    def obtener(cls, forzar: bool = False) -> dict:
+        """
+        Retorna el snapshot vigente. Se regenera si se fuerza, si no existe
+        o si es más antiguo que insights_max_edad_minutos.
+        """
+        import json
+        
+        max_edad = timedelta(minutes=int(IAConfiguracion.get_valor('insights_max_edad_minutos', '60')))
+        snapshot = None if forzar else IAInsightsSnapshot.objects.filter(clave=cls.CLAVE).first()
+        
+        if snapshot is None or timezone.now() - snapshot.fecha_generacion > max_edad:
+            snapshot = cls.generar_snapshot()
+        
+        return {
+            **json.loads(snapshot.datos),
+            'generado_en': snapshot.fecha_generacion,
+            'edad_segundos': int((timezone.now() - snapshot.fecha_generacion).total_seconds())
+        }
+
 
 class PriorizadorTicketService(OpenAIService):
     """
@@ -588,22 +1063,13 @@ class PriorizadorTicketService(OpenAIService):
         
         # Obtener datos del cargo del usuario creador
         cargo = ticket.usuario_creador_id.cargos_id_cargos
-        categoria = ticket.categoria_id
-        
-        # Calcular prioridad automática (según tu lógica existente)
-        peso_cargo = float(cargo.peso_prioridad) if cargo else 1.0
-        multiplicador = float(categoria.multiplicador_prioridad) if categoria else 1.0
-        puntaje_calculado = peso_cargo * multiplicador
-        
-        # Mapear puntaje a prioridad
-        if puntaje_calculado >= 3.5:
-            prioridad_sugerida = 4  # Urgente
-        elif puntaje_calculado >= 2.5:
-            prioridad_sugerida = 3  # Alta
-        elif puntaje_calculado >= 1.5:
-            prioridad_sugerida = 2  # Media
-        else:
-            prioridad_sugerida = 1  # Baja
+        
+        # Misma regla que la creación de tickets (matriz cargo x categoría)
+        calculo = prioridades.obtener_matriz(
+            [cargo.id_cargos], [ticket.categoria_id_id]
+        ).calcular(cargo.id_cargos, ticket.categoria_id_id)
+        puntaje_calculado = calculo['puntaje']
+        prioridad_sugerida = calculo['prioridad_id']
         
         prompt = self._construir_prompt_prioridad(ticket, cargo, puntaje_calculado, prioridad_sugerida)
         
@@ -615,12 +1081,7 @@ class PriorizadorTicketService(OpenAIService):
         )
         
         if resultado['success']:
-            resultado['prioridad_calculada'] = {
-                'puntaje': puntaje_calculado,
-                'prioridad_id': prioridad_sugerida,
-                'peso_cargo': peso_cargo,
-                'multiplicador_categoria': multiplicador
-            }
+            resultado['prioridad_calculada'] = calculo
         
         return resultado
     
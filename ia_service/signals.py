@@ -0,0 +1,17 @@
+"""
+Consumidores de eventos del servicio de IA
+"""
+from tickets import eventos
+from tickets.signals import cambios_tickets
+from .services import CalculadorMetricasService
+
+
+def recalcular_metricas(lote):
+    """Un evento tardío puede afectar cualquier par técnico/categoría: recálculo completo"""
+    CalculadorMetricasService.actualizar_todas_metricas()
+
+
+@eventos.consumidor('metricas_tecnico', tipos=['ticket'], reparar=recalcular_metricas)
+def actualizar_metricas_por_cambios(lote):
+    """Aplica a ia_metricas_tecnico la diferencia que produjeron los cambios"""
+    CalculadorMetricasService.aplicar_cambios_tickets(cambios_tickets(lote))
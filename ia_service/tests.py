@@ -1,3 +1,120 @@
-from django.test import TestCase
+import math
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.test import SimpleTestCase
+from django.utils import timezone
+
+from ia_service.models import IAConfiguracion, IAMetricasTecnico
+from ia_service.patrones import AnalizadorPatrones
+from ia_service.ranking import MotorRankingTecnicos
+from ia_service.services import CalculadorMetricasService
+from migo_back import pruebas
+from tickets import sinteticos
+
+
+class PresupuestoConsultasIAServiceTest(pruebas.PresupuestoConsultasTestCase):
+    APP = 'ia_service'
+    # Cada servicio lee su configuración de ia_configuracion clave por clave
+    PRESUPUESTOS = {
+        'ia_service:recomendar_tecnico': 13,
+        'ia_service:analizar_patrones': 15,
+    }
+
+
+class MetricasTest(pruebas.DatosSinteticosTestCase):
+    TICKETS = 40
+
+    def test_recalculo_sin_upsert_con_destino(self):
+        """En MySQL (sin ON CONFLICT(...)) el recálculo completo inserta las métricas"""
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            total = CalculadorMetricasService.actualizar_todas_metricas()
+
+        self.assertGreater(total, 0)
+        self.assertEqual(IAMetricasTecnico.objects.count(), total)
+
+
+class PesosRankingTest(pruebas.DatosSinteticosTestCase):
+    TICKETS = 10
+
+    def test_rechaza_pesos_no_finitos_o_negativos(self):
+        for valor in ['nan', 'inf', '-1', 'abc']:
+            with self.subTest(valor=valor):
+                respuesta, _, _ = sinteticos.llamar_endpoint(
+                    'PUT', '/api/ia/configuracion/', {'clave': 'peso_ranking_carga', 'valor': valor}, usuario=1
+                )
+                self.assertEqual(respuesta.status_code, 400)
+
+        respuesta, _, _ = sinteticos.llamar_endpoint(
+            'PUT', '/api/ia/configuracion/', {'clave': 'peso_ranking_carga', 'valor': '0.5'}, usuario=1
+        )
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_peso_guardado_no_finito_usa_el_default(self):
+        IAConfiguracion.objects.create(clave='peso_ranking_carga', valor='nan')
+
+        pesos = MotorRankingTecnicos().pesos
+
+        self.assertTrue(all(math.isfinite(p) for p in pesos))
+        self.assertAlmostEqual(pesos.sum(), 1.0)
+
+
+class TicketsPorDia:
+    """Sustituto del queryset: conteos[d] tickets creados el día d del periodo"""
+
+    def __init__(self, conteos):
+        self.inicio = timezone.localtime().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=len(conteos) - 1)
+        self.filas = [
+            (self.inicio + timedelta(days=dia), 1, 'Hardware', 2, 'Media')
+            for dia, cantidad in enumerate(conteos)
+            for _ in range(cantidad)
+        ]
+
+    def order_by(self):
+        return self
+
+    def values_list(self, *campos):
+        return self.filas
+
+    def hallazgos(self):
+        return AnalizadorPatrones(self, self.inicio).hallazgos()
+
+
+class PatronesTest(SimpleTestCase):
+    def test_pico_en_serie_plana(self):
+        conteos = [2] * 20
+        conteos[15] = 12
+        tickets = TicketsPorDia(conteos)
+
+        picos = [p for p in tickets.hallazgos()['picos'] if p['dimension'] == 'total']
+
+        self.assertEqual(picos, [{
+            'dimension': 'total',
+            'grupo': 'Total',
+            'fecha': str((tickets.inicio + timedelta(days=15)).date()),
+            'cantidad': 12,
+            'esperado': 2.0,
+            'z': 10.0,
+        }])
+
+    def test_tendencia_de_serie_creciente(self):
+        hallazgos = TicketsPorDia(list(range(1, 11))).hallazgos()
+
+        total = next(t for t in hallazgos['tendencias'] if t['dimension'] == 'total')
+        # Pendiente 1 ticket/día sobre una media de 5.5: 9 * 100 / 5.5
+        self.assertEqual(
+            (total['direccion'], total['pendiente_diaria'], total['variacion_pct'], total['total']),
+            ('al alza', 1.0, 163.6, 55)
+        )
+        self.assertEqual(hallazgos['picos'], [])
+
+    def test_periodo_sin_tickets(self):
+        for dias in (1, 30):
+            with self.subTest(dias=dias):
+                hallazgos = TicketsPorDia([0] * dias).hallazgos()
+
+                self.assertEqual((hallazgos['picos'], hallazgos['tendencias']), ([], []))
+                self.assertEqual(hallazgos['periodo']['dias'], dias)
+                self.assertEqual(hallazgos['series']['total'], {'Total': [0] * dias})
+                self.assertEqual(hallazgos['series']['categoria'], {})
@@ -37,7 +37,7 @@ urlpatterns = [
     
     # Recomendar mejor técnico para un ticket
     # POST /api/ia/recomendar-tecnico/
-    # Body: {"ticket_id": 123, "usuario_id": 1}
+    # Body: {"ticket_id": 123, "explicar": false}
     path('recomendar-tecnico/', views.RecomendarTecnicoView.as_view(), name='recomendar_tecnico'),
     
     # Analizar patrones en tickets
@@ -51,7 +51,7 @@ urlpatterns = [
     path('metricas-tecnicos/', views.MetricasTecnicosView.as_view(), name='metricas_tecnicos'),
     
     # Insights para capacitación
-    # GET /api/ia/insights-capacitacion/
+    # GET /api/ia/insights-capacitacion/?forzar=1
     path('insights-capacitacion/', views.InsightsCapacitacionView.as_view(), name='insights_capacitacion'),
     
     # ==========================================================================
@@ -66,6 +66,10 @@ urlpatterns = [
     # Historial de consultas
     # GET /api/ia/historial/?limite=50&tipo=guia_solucion
     path('historial/', views.HistorialConsultasView.as_view(), name='historial'),
+
+    # Latencia, errores y tokens de las consultas (resumen horario)
+    # GET /api/ia/metricas-consultas/?desde=2025-01-01&hasta=2025-01-31&tipo=guia_solucion
+    path('metricas-consultas/', views.MetricasConsultasIAView.as_view(), name='metricas_consultas'),
     
 
     # Consultas restantes del usuario
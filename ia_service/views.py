@@ -1,19 +1,31 @@
 """
 Views para el servicio de IA de MIGO
 """
+import math
+
 from rest_framework import status
 from rest_framework.decorators import api_view
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.db.models import Count
+from django.db.models import Count, Sum
+
+from migo_back.replicas import usar_replica
 
-from .models import IAFeedback, IAMetricasTecnico, IAConsultasLog, IAConfiguracion
+from .models import (
+    IAFeedback,
+    IAMetricasTecnico,
+    IAConsultasLog,
+    IAConfiguracion,
+    IAConsultasResumenHora
+)
 from .services import (
     GuiaSolucionService,
     RecomendadorTecnicoService,
     DetectorPatronesService,
     CalculadorMetricasService,
-    PriorizadorTicketService
+    PriorizadorTicketService,
+    ResumenConsultasService,
+    InsightsCapacitacionService
 )
 from .serializers import (
     IAFeedbackSerializer,
@@ -26,6 +38,7 @@ from .serializers import (
     AnalizarPatronesRequestSerializer
 )
 from .authentication import AuthMixin, get_usuario_from_token
+from .ranking import MotorRankingTecnicos
 
 
 # =============================================================================
@@ -127,10 +140,13 @@ class FeedbackIAView(AuthMixin, APIView):
         
         from tickets.models import Ticket
         try:
-            ticket = Ticket.objects.get(id_ticket=serializer.validated_data['ticket_id'])
-            CalculadorMetricasService.actualizar_metricas_tecnico(
+            categoria_id = Ticket.objects.values_list('categoria_id', flat=True).get(
+                id_ticket=serializer.validated_data['ticket_id']
+            )
+            CalculadorMetricasService.registrar_feedback(
                 usuario.id_usuarios,
-                ticket.categoria_id.id_categoria_ticket
+                categoria_id,
+                feedback.fue_util
             )
         except Ticket.DoesNotExist:
             pass
@@ -187,7 +203,8 @@ class PriorizarTicketView(AuthMixin, APIView):
 
 class RecomendarTecnicoView(AuthMixin, APIView):
     """
-    POST: Recomienda el mejor técnico para un ticket
+    POST: Recomienda el mejor técnico para un ticket (ranking local)
+    Body opcional: {"explicar": true} agrega una explicación generada por IA
     Requiere: Administrador
     """
     
@@ -201,9 +218,10 @@ class RecomendarTecnicoView(AuthMixin, APIView):
             return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         
         ticket_id = serializer.validated_data['ticket_id']
+        explicar = serializer.validated_data['explicar']
         
         service = RecomendadorTecnicoService()
-        resultado = service.recomendar_tecnico(ticket_id, usuario.id_usuarios)
+        resultado = service.recomendar_tecnico(ticket_id, usuario.id_usuarios, explicar=explicar)
         
         if resultado['success']:
             return Response(resultado, status=status.HTTP_200_OK)
@@ -213,7 +231,9 @@ class RecomendarTecnicoView(AuthMixin, APIView):
 
 class AnalizarPatronesView(AuthMixin, APIView):
     """
-    POST: Analiza patrones en los tickets
+    POST: Analiza patrones en los tickets (picos y tendencias locales)
+    Parámetros opcionales:
+    - narrar=false: solo hallazgos, sin resumen de la IA
     Requiere: Administrador
     """
     
@@ -225,13 +245,15 @@ class AnalizarPatronesView(AuthMixin, APIView):
         dias = request.data.get('dias', 30)
         categoria = request.data.get('categoria', '')
         prioridad = request.data.get('prioridad', '')
+        narrar = str(request.data.get('narrar', True)).lower() not in ['false', '0']
         
         service = DetectorPatronesService()
         resultado = service.analizar_patrones(
-            dias=dias, 
+            dias=int(dias), 
             usuario_id=usuario.id_usuarios,
             categoria=categoria if categoria else None,
-            prioridad=prioridad if prioridad else None
+            prioridad=prioridad if prioridad else None,
+            narrar=narrar
         )
         
         if resultado['success']:
@@ -286,60 +308,21 @@ class MetricasTecnicosView(AuthMixin, APIView):
 
 class InsightsCapacitacionView(AuthMixin, APIView):
     """
-    GET: Obtener insights para capacitación de técnicos
+    GET: Obtener insights para capacitación de técnicos (snapshot precalculado)
+    Parámetros opcionales:
+    - forzar=1: regenerar el snapshot antes de responder
     Requiere: Administrador
     """
     
+    @usar_replica
     def get(self, request):
         usuario, error = self.requiere_admin(request)
         if error:
             return error
         
-        from tickets.models import Ticket, CategoriaTicket
-        from authentication.models import Usuarios
-        from django.db.models import Count
-        
-        metricas_bajas = IAMetricasTecnico.objects.filter(
-            tasa_resolucion__lt=70,
-            tickets_totales__gte=3
-        ).select_related(
-            'tecnico__personas_id_personas',
-            'categoria'
-        )
-        
-        capacitaciones_sugeridas = []
-        for m in metricas_bajas:
-            nombre = f"{m.tecnico.personas_id_personas.primer_nombre} {m.tecnico.personas_id_personas.primer_apellido}"
-            capacitaciones_sugeridas.append({
-                'tecnico_id': m.tecnico_id,
-                'tecnico_nombre': nombre,
-                'categoria': m.categoria.nombre_categoria,
-                'tasa_resolucion': float(m.tasa_resolucion) if m.tasa_resolucion else 0,
-                'tickets_totales': m.tickets_totales,
-                'sugerencia': f"Capacitar en {m.categoria.nombre_categoria}"
-            })
-        
-        categorias_problematicas = Ticket.objects.filter(
-            estado_id__in=[1, 2]
-        ).values(
-            'categoria_id__nombre_categoria'
-        ).annotate(
-            sin_resolver=Count('id_ticket')
-        ).order_by('-sin_resolver')[:5]
-        
-        feedback_negativo = IAFeedback.objects.filter(
-            fue_util=False
-        ).values(
-            'tecnico_id'
-        ).annotate(
-            total_negativo=Count('id_feedback')
-        ).order_by('-total_negativo')[:5]
+        forzar = request.query_params.get('forzar', '').lower() in ['1', 'true']
         
-        return Response({
-            'capacitaciones_sugeridas': capacitaciones_sugeridas,
-            'categorias_problematicas': list(categorias_problematicas),
-            'tecnicos_con_feedback_negativo': list(feedback_negativo)
-        })
+        return Response(InsightsCapacitacionService.obtener(forzar=forzar))
 
 
 # =============================================================================
@@ -375,6 +358,23 @@ class ConfiguracionIAView(AuthMixin, APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
+        if clave in MotorRankingTecnicos.PESOS_DEFAULT:
+            try:
+                peso = float(valor)
+            except (TypeError, ValueError):
+                peso = None
+            if peso is None or not math.isfinite(peso) or peso < 0:
+                return Response(
+                    {'error': f'"{clave}" debe ser un número mayor o igual a 0'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # Los pesos del ranking tienen default en código: se crean al ajustarlos
+            config, _ = IAConfiguracion.objects.update_or_create(
+                clave=clave,
+                defaults={'valor': valor, 'descripcion': 'Peso del ranking de técnicos'}
+            )
+            return Response(IAConfiguracionSerializer(config).data)
+        
         try:
             config = IAConfiguracion.objects.get(clave=clave)
             config.valor = valor
@@ -411,6 +411,64 @@ class HistorialConsultasView(AuthMixin, APIView):
         return Response(IAConsultasLogSerializer(consultas, many=True).data)
 
 
+class MetricasConsultasIAView(AuthMixin, APIView):
+    """
+    GET: Latencia (p50/p95/p99), errores y tokens de las consultas a la IA
+    en una ventana de tiempo, leídos desde el resumen horario
+    Parámetros opcionales:
+    - desde / hasta: YYYY-MM-DD o fecha-hora ISO (default: últimas 24 horas)
+    - tipo: tipo de consulta
+    - modelo: modelo de OpenAI
+    Requiere: Administrador
+    """
+    
+    def get(self, request):
+        usuario, error = self.requiere_admin(request)
+        if error:
+            return error
+        
+        from django.utils import timezone
+        from django.utils.dateparse import parse_date, parse_datetime
+        from datetime import datetime, time, timedelta
+        
+        def _parsear(valor, fin_de_dia=False):
+            fecha = parse_datetime(valor)
+            if fecha is None:
+                dia = parse_date(valor)
+                if dia is None:
+                    raise ValueError(f'Fecha inválida: {valor}')
+                fecha = datetime.combine(dia, time.max if fin_de_dia else time.min)
+            if timezone.is_naive(fecha):
+                fecha = timezone.make_aware(fecha)
+            return fecha
+        
+        try:
+            hasta_param = request.query_params.get('hasta')
+            desde_param = request.query_params.get('desde')
+            hasta = _parsear(hasta_param, fin_de_dia=True) if hasta_param else timezone.now()
+            desde = _parsear(desde_param) if desde_param else hasta - timedelta(hours=24)
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        resumen = ResumenConsultasService.obtener_resumen(
+            desde,
+            hasta,
+            tipo_consulta=request.query_params.get('tipo'),
+            modelo=request.query_params.get('modelo')
+        )
+        
+        return Response({
+            'periodo': {
+                'desde': desde.isoformat(),
+                'hasta': hasta.isoformat()
+            },
+            **resumen
+        })
+
+
 # =============================================================================
 # VISTA DE ESTADO (Público)
 # =============================================================================
@@ -461,10 +519,15 @@ def ia_status(request):
     activo = IAConfiguracion.get_valor('activo', '0') == '1'
     modelo = IAConfiguracion.get_valor('modelo_openai', 'no configurado')
     
-    total_consultas = IAConsultasLog.objects.count()
-    consultas_hoy = IAConsultasLog.objects.filter(
-        fecha_consulta__date=timezone.now().date()
-    ).count()
+    # Conteos desde el resumen horario (no recorre ia_consultas_log)
+    ahora_local = timezone.localtime(timezone.now())
+    inicio_dia_local = ahora_local.replace(hour=0, minute=0, second=0, microsecond=0)
+    consultas = IAConsultasResumenHora.objects.aggregate(
+        total=Sum('llamadas'),
+        hoy=Sum('llamadas', filter=Q(hora__gte=inicio_dia_local))
+    )
+    total_consultas = consultas['total'] or 0
+    consultas_hoy = consultas['hoy'] or 0
     
     feedback_stats = IAFeedback.objects.aggregate(
         total=Count('id_feedback'),
@@ -0,0 +1,123 @@
+"""
+Instrumentación por request: consultas SQL y tiempo
+
+InstrumentacionMiddleware cuenta las consultas y el tiempo en la base de datos
+de cada request con connection.execute_wrapper (no depende de DEBUG) y lo
+informa en la cabecera Server-Timing, visible en las herramientas de
+desarrollo del navegador.
+
+Los requests que tardan más de INSTRUMENTACION_LENTO_MS o ejecutan más de
+INSTRUMENTACION_MAX_CONSULTAS consultas se registran (logger
+migo_back.instrumentacion, nivel WARNING) en una línea JSON con las formas de
+SQL más repetidas: la misma forma ejecutada muchas veces en un request es un
+N+1.
+"""
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+# Formas de SQL repetidas que se incluyen en el registro
+MAXIMO_FORMAS = 5
+
+_LISTA_IN = re.compile(r'\bIN \((?:%s, )*%s\)')
+_NUMERO = re.compile(r'\b\d+\b')
+_TEXTO = re.compile(r"'(?:[^']|'')*'")
+
+
+def forma_sql(sql):
+    """SQL sin los valores que cambian entre ejecuciones de la misma consulta"""
+    sql = _TEXTO.sub('?', sql)
+    sql = _NUMERO.sub('?', sql)
+    return _LISTA_IN.sub('IN (...)', sql)
+
+
+class MedicionConsultas:
+    """Wrapper de ejecución: acumula consultas, tiempo y SQL del request"""
+
+    __slots__ = ('consultas', 'segundos', 'sentencias')
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+        self.sentencias = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+            # La normalización se hace solo si el request se registra
+            self.sentencias[sql] += 1
+
+    def repetidas(self):
+        formas = Counter()
+        for sql, veces in self.sentencias.items():
+            formas[forma_sql(sql)] += veces
+        return [
+            {'sql': sql, 'veces': veces}
+            for sql, veces in formas.most_common(MAXIMO_FORMAS)
+            if veces > 1
+        ]
+
+
+class InstrumentacionMiddleware:
+    """
+    Server-Timing (db, app, total) en cada respuesta y registro de los
+    requests lentos o con demasiadas consultas
+    """
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTACION', True):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.lento_ms = getattr(settings, 'INSTRUMENTACION_LENTO_MS', 500)
+        self.max_consultas = getattr(settings, 'INSTRUMENTACION_MAX_CONSULTAS', 50)
+
+    def __call__(self, request):
+        medicion = MedicionConsultas()
+        inicio = time.perf_counter()
+
+        with ExitStack() as pila:
+            for conexion in connections.all():
+                pila.enter_context(conexion.execute_wrapper(medicion))
+            response = self.get_response(request)
+
+        total_ms = (time.perf_counter() - inicio) * 1000
+        db_ms = medicion.segundos * 1000
+
+        tiempos = (
+            f'db;dur={db_ms:.1f};desc="{medicion.consultas} consultas", '
+            f'app;dur={total_ms - db_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+        if response.has_header('Server-Timing'):
+            tiempos = f"{response['Server-Timing']}, {tiempos}"
+        response['Server-Timing'] = tiempos
+
+        if total_ms >= self.lento_ms or medicion.consultas >= self.max_consultas:
+            self._registrar(request, response, medicion, total_ms, db_ms)
+
+        return response
+
+    def _registrar(self, request, response, medicion, total_ms, db_ms):
+        logger.warning(json.dumps({
+            'evento': 'request_lento',
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+            'total_ms': round(total_ms, 1),
+            'db_ms': round(db_ms, 1),
+            'consultas': medicion.consultas,
+            'repetidas': medicion.repetidas(),
+        }, ensure_ascii=False))
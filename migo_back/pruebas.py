@@ -0,0 +1,162 @@
+"""
+Soporte para las pruebas del proyecto
+
+RunnerPruebas crea, además de las tablas que maneja Django, las de los modelos
+managed = False (en producción existen en la base MySQL), así las pruebas
+corren sobre SQLite:
+
+    DB_ENGINE=django.db.backends.sqlite3 python manage.py test
+
+PresupuestoConsultasTestCase llama a los endpoints de una app (catálogo de
+tickets/sinteticos.py) con datos sintéticos de dos tamaños y falla si la
+cantidad de consultas crece con los datos o supera el presupuesto declarado.
+Las escrituras se miden además con el despacho de los eventos que publican.
+
+DatosSinteticosTestCase genera una vez por clase los datos sintéticos chicos
+que usan las pruebas unitarias de las apps.
+"""
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, override_settings
+from django.test.runner import DiscoverRunner
+
+from migo_back.instrumentacion import forma_sql
+
+
+class RunnerPruebas(DiscoverRunner):
+    """DiscoverRunner que también crea las tablas de los modelos no manejados"""
+
+    def setup_databases(self, **kwargs):
+        from tickets.sinteticos import crear_esquema
+
+        configuracion = super().setup_databases(**kwargs)
+        for alias in kwargs.get('aliases') or connections:
+            if not connections[alias].settings_dict['TEST'].get('MIRROR'):
+                crear_esquema(alias)
+        return configuracion
+
+
+@override_settings(INSTRUMENTACION=False)
+class PresupuestoConsultasTestCase(TestCase):
+    """
+    Cada endpoint de APP debe ejecutar la misma cantidad de consultas con
+    TICKETS_INICIALES y con TICKETS_INICIALES + TICKETS_AGREGADOS tickets, y
+    no más que su presupuesto (PRESUPUESTOS, o PRESUPUESTO_POR_DEFECTO)
+    """
+
+    APP = None
+    PRESUPUESTOS = {}
+    PRESUPUESTO_POR_DEFECTO = 10
+
+    # Consultas de eventos.despachar() tras cada escritura: los consumidores
+    # corren al confirmar, fuera de los PRESUPUESTOS del endpoint
+    PRESUPUESTOS_DESPACHO = {}
+    PRESUPUESTO_DESPACHO_POR_DEFECTO = 17
+
+    TICKETS_INICIALES = 60
+    TICKETS_AGREGADOS = 240
+    # Con esta semilla los datos iniciales ya tienen tickets urgentes activos asignados
+    SEMILLA = 1
+
+    @classmethod
+    def setUpTestData(cls):
+        from tickets import sinteticos
+
+        cls.generador = sinteticos.GeneradorDatos(
+            tickets=cls.TICKETS_INICIALES,
+            tecnicos=4,
+            trabajadores=8,
+            dias=30,
+            semilla=cls.SEMILLA
+        )
+        cls.generador.generar()
+        sinteticos.reconstruir_derivados()
+        cls.parametros = sinteticos.parametros_endpoints()
+
+    def _catalogo(self):
+        from tickets.sinteticos import endpoints
+
+        return [e for e in endpoints(self.parametros) if e[0].startswith(f'{self.APP}:')]
+
+    def _medir(self, metodo, ruta, datos, usuario):
+        from tickets.sinteticos import llamar_endpoint
+
+        # Sin caché: se mide el camino que consulta la base
+        cache.clear()
+        respuesta, medicion, _ = llamar_endpoint(metodo, ruta, datos, usuario)
+        return respuesta, medicion
+
+    def test_presupuesto_consultas(self):
+        from tickets import sinteticos
+
+        catalogo = self._catalogo()
+        iniciales = {}
+        for nombre, *llamada in catalogo:
+            # La primera llamada carga las cachés del proceso (p. ej. la matriz de prioridades)
+            self._medir(*llamada)
+            iniciales[nombre] = self._medir(*llamada)[1].consultas
+
+        self.generador.agregar_tickets(self.TICKETS_AGREGADOS)
+        sinteticos.reconstruir_derivados()
+
+        for nombre, metodo, ruta, datos, usuario in catalogo:
+            with self.subTest(endpoint=nombre):
+                respuesta, medicion = self._medir(metodo, ruta, datos, usuario)
+                self.assertLess(respuesta.status_code, 400, f'{metodo} {ruta}: {respuesta.content[:300]}')
+
+                presupuesto = self.PRESUPUESTOS.get(nombre, self.PRESUPUESTO_POR_DEFECTO)
+                if medicion.consultas != iniciales[nombre] or medicion.consultas > presupuesto:
+                    self.fail(self._detalle(nombre, iniciales[nombre], medicion, presupuesto))
+
+    def test_presupuesto_despacho(self):
+        from tickets.sinteticos import medir_despacho
+
+        for nombre, metodo, ruta, datos, usuario in self._catalogo():
+            if metodo == 'GET':
+                continue
+            with self.subTest(endpoint=nombre):
+                cache.clear()
+                respuesta, medicion = medir_despacho(metodo, ruta, datos, usuario)
+                self.assertLess(respuesta.status_code, 400, f'{metodo} {ruta}: {respuesta.content[:300]}')
+
+                presupuesto = self.PRESUPUESTOS_DESPACHO.get(nombre, self.PRESUPUESTO_DESPACHO_POR_DEFECTO)
+                if medicion.consultas > presupuesto:
+                    self.fail('\n'.join([
+                        f'{nombre}: {medicion.consultas} consultas al despachar sus eventos '
+                        f'(presupuesto {presupuesto})',
+                        *self._sql(medicion)
+                    ]))
+
+    def test_catalogo_completo(self):
+        """Toda url de la app se mide o está en ENDPOINTS_EXCLUIDOS"""
+        from tickets.sinteticos import ENDPOINTS_EXCLUIDOS, urls_endpoints
+
+        urls = {nombre for nombre in urls_endpoints() if nombre.startswith(f'{self.APP}:')}
+        cubiertas = {e[0] for e in self._catalogo()} | set(ENDPOINTS_EXCLUIDOS)
+        self.assertEqual(urls - cubiertas, set(), 'Endpoints sin presupuesto de consultas')
+
+    def _detalle(self, nombre, iniciales, medicion, presupuesto):
+        lineas = [
+            f'{nombre}: {iniciales} consultas con {self.TICKETS_INICIALES} tickets, '
+            f'{medicion.consultas} con {self.TICKETS_INICIALES + self.TICKETS_AGREGADOS} '
+            f'(presupuesto {presupuesto})'
+        ]
+        return '\n'.join(lineas + self._sql(medicion))
+
+    def _sql(self, medicion):
+        repetidas = medicion.repetidas()
+        if repetidas:
+            return ['SQL repetido:'] + [f"  {r['veces']}x {r['sql']}" for r in repetidas]
+        return ['SQL ejecutado:'] + [f'  {forma_sql(sql)}' for sql in medicion.sentencias]
+
+
+class DatosSinteticosTestCase(TestCase):
+    """TestCase con datos sintéticos chicos: admins 1-2, técnicos 3-4, trabajadores 5-6"""
+
+    TICKETS = 20
+
+    @classmethod
+    def setUpTestData(cls):
+        from tickets import sinteticos
+
+        sinteticos.GeneradorDatos(tickets=cls.TICKETS, tecnicos=2, trabajadores=2, dias=10).generar()
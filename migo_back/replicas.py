@@ -0,0 +1,129 @@
+"""
+Lecturas en la réplica de la base de datos
+
+Las vistas de lectura pesada (estadísticas, insights, patrones) se marcan con
+@usar_replica y sus consultas de lectura van al alias 'replica' cuando está
+configurado (settings.DATABASES). Todo lo demás, y toda escritura, usa
+'default'.
+
+Lectura de lo propio: tras una escritura, el resto del request lee de
+'default', y ReplicaMiddleware deja una cookie con la que los requests del
+mismo cliente durante REPLICA_PEGADA_SEGUNDOS también leen de 'default'
+(cubre el retraso de la replicación).
+
+Lo que se guarda para otros requests (cachés invalidadas por eventos,
+snapshots) se calcula dentro de leer_primaria(): calculado desde la réplica
+justo después de una invalidación, quedaría guardado con datos anteriores a
+la escritura por todo su TTL.
+"""
+import functools
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+
+ALIAS_REPLICA = 'replica'
+COOKIE_ESCRITURA = 'migo_escritura'
+METODOS_ESCRITURA = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+_en_replica = ContextVar('en_replica', default=False)
+_leer_primaria = ContextVar('leer_primaria', default=False)
+_forzar_primaria = ContextVar('forzar_primaria', default=False)
+
+
+def replica_configurada() -> bool:
+    return ALIAS_REPLICA in settings.DATABASES
+
+
+@contextmanager
+def _bloque_replica():
+    token = _en_replica.set(True)
+    try:
+        yield
+    finally:
+        _en_replica.reset(token)
+
+
+@contextmanager
+def leer_primaria():
+    """Las lecturas del bloque van a 'default' aunque esté dentro de usar_replica"""
+    token = _forzar_primaria.set(True)
+    try:
+        yield
+    finally:
+        _forzar_primaria.reset(token)
+
+
+def usar_replica(vista=None):
+    """
+    Decorador de vistas (o métodos) cuyas lecturas pueden ir a la réplica.
+    Sin argumentos es un context manager: with usar_replica(): ...
+    """
+    if vista is None:
+        return _bloque_replica()
+
+    @functools.wraps(vista)
+    def envoltura(*args, **kwargs):
+        with _bloque_replica():
+            return vista(*args, **kwargs)
+    return envoltura
+
+
+class RouterReplica:
+    """Envía a la réplica las lecturas marcadas con usar_replica"""
+
+    def db_for_read(self, model, **hints):
+        if (
+            _en_replica.get()
+            and not _leer_primaria.get()
+            and not _forzar_primaria.get()
+            and replica_configurada()
+        ):
+            return ALIAS_REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        # Lo que se lea después en este request debe ver la escritura
+        _leer_primaria.set(True)
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplica recibe los cambios por replicación, no por migraciones
+        return db != ALIAS_REPLICA
+
+
+class ReplicaMiddleware:
+    """
+    Lectura de lo propio entre requests: un cliente que acaba de escribir
+    lee de 'default' durante REPLICA_PEGADA_SEGUNDOS
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pegada = getattr(settings, 'REPLICA_PEGADA_SEGUNDOS', 10)
+        ultima_escritura = request.COOKIES.get(COOKIE_ESCRITURA, '')
+        reciente = ultima_escritura.isdigit() and time.time() - int(ultima_escritura) < pegada
+
+        token = _leer_primaria.set(bool(reciente))
+        try:
+            response = self.get_response(request)
+        finally:
+            _leer_primaria.reset(token)
+
+        if request.method in METODOS_ESCRITURA and response.status_code < 400 and replica_configurada():
+            response.set_cookie(
+                COOKIE_ESCRITURA,
+                str(int(time.time())),
+                max_age=pegada,
+                httponly=True,
+                samesite='Lax'
+            )
+
+        return response
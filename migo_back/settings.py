@@ -5,10 +5,14 @@ Con mucho amor :) Adrian.
 from pathlib import Path
 import os
 from dotenv import load_dotenv
+from django.core.exceptions import ImproperlyConfigured
 
 # Cargar variables de entorno
 load_dotenv()
 
+def _env_bool(nombre, default):
+    return os.getenv(nombre, str(default)).lower() in ('1', 'true', 'si', 'yes')
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -16,7 +20,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 SECRET_KEY = 'django-insecure-tu-clave-secreta-aqui-cambiar-en-produccion'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+# (con DEBUG cada consulta SQL queda guardada en memoria; para medir consultas
+# en producción está InstrumentacionMiddleware)
+DEBUG = _env_bool('DJANGO_DEBUG', True)
 
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 
@@ -40,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'migo_back.instrumentacion.InstrumentacionMiddleware',  # Primero: mide el request completo
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',  # Debe ir antes de CommonMiddleware
@@ -48,6 +55,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'migo_back.replicas.ReplicaMiddleware',
 ]
 
 
@@ -73,21 +81,120 @@ TEMPLATES = [
 WSGI_APPLICATION = 'migo_back.wsgi.application'
 
 # Database
+# Cada entorno ajusta la conexión con variables DB_* (entorno o .env)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'migo',
-        'USER': 'root',  # Cambia según tu configuración
-        'PASSWORD': 'Adrian12!',  # Cambia según tu configuración
-        'HOST': 'localhost',
-        'PORT': '3306',
+        'ENGINE': os.getenv('DB_ENGINE', 'django.db.backends.mysql'),
+        'NAME': os.getenv('DB_NAME', 'migo'),
+        'USER': os.getenv('DB_USER', 'root'),  # Cambia según tu configuración
+        'PASSWORD': os.getenv('DB_PASSWORD', 'Adrian12!'),  # Cambia según tu configuración
+        'HOST': os.getenv('DB_HOST', 'localhost'),
+        'PORT': os.getenv('DB_PORT', '3306'),
+        # Conexiones persistentes: se reutilizan entre requests del mismo
+        # hilo durante CONN_MAX_AGE segundos (0 = una conexión por request)
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '60')),
+        # Verifica una conexión reutilizada antes del primer uso en cada request
+        'CONN_HEALTH_CHECKS': _env_bool('DB_CONN_HEALTH_CHECKS', True),
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES'",
             'charset': 'utf8mb4',
+            'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', '5')),
         }
     }
 }
 
+# Pruebas locales con SQLite (DB_ENGINE=django.db.backends.sqlite3): DB_NAME
+# y DB_REPLICA_NAME son rutas de archivo y no aplican las opciones de MySQL
+if DATABASES['default']['ENGINE'].endswith('sqlite3'):
+    DATABASES['default']['OPTIONS'] = {}
+
+# Pool de conexiones para el despliegue ASGI (DB_POOL=1). Bajo ASGI las
+# conexiones persistentes no se comparten entre requests, así que se usa el
+# backend MySQL de django-db-connection-pool y CONN_MAX_AGE queda en 0: el
+# pool es el que reutiliza las conexiones.
+if _env_bool('DB_POOL', False):
+    if not DATABASES['default']['ENGINE'].endswith('mysql'):
+        raise ImproperlyConfigured('DB_POOL=1 solo está disponible con DB_ENGINE=django.db.backends.mysql')
+    try:
+        import dj_db_conn_pool  # noqa: F401
+    except ImportError:
+        raise ImproperlyConfigured(
+            'DB_POOL=1 requiere el paquete django-db-connection-pool[mysql] (pip install "django-db-connection-pool[mysql]")'
+        )
+    DATABASES['default'].update({
+        'ENGINE': 'dj_db_conn_pool.backends.mysql',
+        'CONN_MAX_AGE': 0,
+        'POOL_OPTIONS': {
+            'POOL_SIZE': int(os.getenv('DB_POOL_SIZE', '10')),
+            'MAX_OVERFLOW': int(os.getenv('DB_POOL_MAX_OVERFLOW', '10')),
+            'RECYCLE': int(os.getenv('DB_POOL_RECYCLE', '1800')),
+            'PRE_PING': True,
+        },
+    })
+
+# Réplica de lectura para las vistas marcadas con @usar_replica (ver
+# migo_back/replicas.py). Se activa con DB_REPLICA_HOST o DB_REPLICA_NAME;
+# lo no indicado se toma de la conexión principal.
+if os.getenv('DB_REPLICA_HOST') or os.getenv('DB_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': os.getenv('DB_REPLICA_NAME', DATABASES['default']['NAME']),
+        'USER': os.getenv('DB_REPLICA_USER', DATABASES['default']['USER']),
+        'PASSWORD': os.getenv('DB_REPLICA_PASSWORD', DATABASES['default']['PASSWORD']),
+        'HOST': os.getenv('DB_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': os.getenv('DB_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['migo_back.replicas.RouterReplica']
+
+# Crea también las tablas de los modelos managed = False (ver migo_back/pruebas.py)
+TEST_RUNNER = 'migo_back.pruebas.RunnerPruebas'
+
+# Segundos que un cliente lee de la base principal tras escribir
+REPLICA_PEGADA_SEGUNDOS = int(os.getenv('DB_REPLICA_PEGADA', '10'))
+
+# Instrumentación por request (migo_back/instrumentacion.py): cabecera
+# Server-Timing y registro de requests lentos o con demasiadas consultas
+INSTRUMENTACION = _env_bool('INSTRUMENTACION', True)
+INSTRUMENTACION_LENTO_MS = int(os.getenv('INSTRUMENTACION_LENTO_MS', '500'))
+INSTRUMENTACION_MAX_CONSULTAS = int(os.getenv('INSTRUMENTACION_MAX_CONSULTAS', '50'))
+
+# Caché compartida entre procesos con CACHE_REDIS_URL (requiere el paquete
+# redis); sin ella, memoria del proceso. Ver la sección Caché del README.
+if os.getenv('CACHE_REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('CACHE_REDIS_URL'),
+            'KEY_PREFIX': 'migo',
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+CACHE_COMPARTIDA = bool(os.getenv('CACHE_REDIS_URL'))
+
+# Segundos máximos en caché de lo que invalida el outbox sin caché compartida
+CACHE_TTL_LOCAL = int(os.getenv('CACHE_TTL_LOCAL', '30'))
+
+# Errores de los workers y del despacho de eventos (logging.getLogger(__name__)) a la consola
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        app: {'handlers': ['consola'], 'level': os.getenv('LOG_LEVEL', 'INFO'), 'propagate': False}
+        for app in ('tickets', 'ia_service', 'authentication', 'migo_back')
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
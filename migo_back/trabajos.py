@@ -0,0 +1,26 @@
+"""
+Bucle de los comandos que corren como worker (--intervalo)
+
+despachar_eventos, autoasignar_tickets y generar_insights repiten su pasada
+con repetir(): antes de cada una se descartan las conexiones cortadas por el
+servidor o vencidas (CONN_MAX_AGE) y un error se registra y se reintenta en
+la siguiente, así un fallo transitorio de la base no detiene el worker.
+"""
+import logging
+import time
+
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+
+def repetir(pasada, segundos, nombre):
+    """Ejecuta pasada() cada segundos hasta que se detenga el proceso"""
+    while True:
+        close_old_connections()
+        try:
+            pasada()
+        except Exception:
+            logger.exception('Error en la pasada de %s', nombre)
+        time.sleep(segundos)
@@ -0,0 +1,26 @@
+-- Cambios de esquema de las tablas no gestionadas por Django (managed = False)
+--
+-- Django no crea ni altera estas tablas: cada columna o restricción nueva
+-- que usan los modelos se agrega aquí y se aplica a mano en MySQL, en orden,
+-- antes de desplegar el código que la usa. Las tablas gestionadas (managed =
+-- True) se crean con: python manage.py migrate --run-syncdb
+-- Los índices compuestos se revisan y crean con: python manage.py gestionar_indices
+
+
+-- Métricas de técnicos mantenidas por deltas (IAMetricasTecnico)
+ALTER TABLE ia_metricas_tecnico
+    ADD COLUMN suma_horas_resolucion DECIMAL(14,4) NOT NULL DEFAULT 0,
+    ADD COLUMN tickets_con_tiempo INT NOT NULL DEFAULT 0;
+
+-- Los upserts de métricas (INSERT ... ON DUPLICATE KEY UPDATE) necesitan la
+-- clave única; omitir si la tabla ya la tiene
+ALTER TABLE ia_metricas_tecnico
+    ADD UNIQUE KEY uq_ia_metricas_tecnico_categoria (tecnico_id, categoria_id);
+
+-- Después de agregar las columnas, recalcular las sumas con un administrador:
+-- POST /api/ia/metricas-tecnicos/
+
+
+-- Control optimista de versiones de tickets (Ticket.version, tickets/transiciones.py)
+ALTER TABLE tickets
+    ADD COLUMN version INT NOT NULL DEFAULT 0;
@@ -2,6 +2,8 @@
 Configuración del panel de administración para tickets
 """
 from django.contrib import admin
+from django.db import transaction
+
 from .models import (
     CategoriaTicket,
     EstadoTicket,
@@ -9,6 +11,7 @@ from .models import (
     Ticket,
     HistorialTicket
 )
+from .signals import foto_ticket, tickets_cambiados
 
 
 @admin.register(CategoriaTicket)
@@ -100,6 +103,33 @@ class TicketAdmin(admin.ModelAdmin):
         }),
     )
     
+    # Los cambios hechos aquí también pasan por el outbox (tickets_cambiados),
+    # en la misma transacción, para que contadores, métricas, alertas y
+    # cachés no queden desfasados. Al editar aumenta la versión, así los
+    # clientes con la versión anterior reciben 409 (control optimista).
+    
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            antes = None
+            if change:
+                actual = Ticket.objects.select_for_update().get(id_ticket=obj.id_ticket)
+                antes = foto_ticket(actual)
+                obj.version = actual.version + 1
+            super().save_model(request, obj, form, change)
+            tickets_cambiados.send(sender=Ticket, cambios=[(antes, foto_ticket(obj))])
+    
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            antes = foto_ticket(obj)
+            super().delete_model(request, obj)
+            tickets_cambiados.send(sender=Ticket, cambios=[(antes, None)])
+    
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            fotos = [foto_ticket(t) for t in queryset.select_for_update()]
+            super().delete_queryset(request, queryset)
+            tickets_cambiados.send(sender=Ticket, cambios=[(antes, None) for antes in fotos])
+    
     def get_usuario_creador(self, obj):
         return obj.usuario_creador_id.personas_id_personas.nombre_completo
     get_usuario_creador.short_description = 'Usuario Creador'
@@ -0,0 +1,126 @@
+"""
+Analítica de tiempos de resolución de tickets (NumPy)
+"""
+import numpy as np
+
+
+class DistribucionResolucion:
+    """
+    Distribución de tiempos de resolución (fecha_asignacion → fecha_resolucion)
+    por grupo (técnico, categoría y/o prioridad).
+
+    Trae los pares de fechas en una sola consulta y calcula media, mediana,
+    p90 e histograma de todos los grupos en una pasada vectorizada.
+    """
+
+    # Límites superiores (en horas) de los tramos del histograma
+    TRAMOS_HORAS = [1, 4, 8, 24, 48, 72, 168]
+
+    CAMPOS_AGRUPACION = {
+        'tecnico': 'tecnico_asignado_id',
+        'categoria': 'categoria_id',
+        'prioridad': 'prioridad_id',
+    }
+
+    def __init__(self, tickets, agrupar_por=()):
+        """
+        tickets: queryset de Ticket ya filtrado
+        agrupar_por: claves de CAMPOS_AGRUPACION (vacío = un solo grupo)
+        """
+        self.agrupar_por = list(agrupar_por)
+        campos = [self.CAMPOS_AGRUPACION[clave] for clave in self.agrupar_por]
+
+        filtros = {f'{campo}__isnull': False for campo in campos}
+        filas = list(tickets.filter(
+            fecha_asignacion__isnull=False,
+            fecha_resolucion__isnull=False,
+            **filtros
+        ).order_by().values_list(*campos, 'fecha_asignacion', 'fecha_resolucion'))
+
+        n_campos = len(campos)
+        if filas:
+            columnas = list(zip(*filas))
+            asignacion = self._a_datetime64(columnas[n_campos])
+            resolucion = self._a_datetime64(columnas[n_campos + 1])
+            horas = (resolucion - asignacion) / np.timedelta64(1, 'h')
+            claves = np.array(columnas[:n_campos], dtype=np.int64).T.reshape(len(filas), n_campos)
+        else:
+            horas = np.empty(0)
+            claves = np.empty((0, n_campos), dtype=np.int64)
+
+        self._calcular(claves, horas)
+
+    @staticmethod
+    def _a_datetime64(fechas):
+        """Convierte fechas (aware, en UTC) a datetime64 sin zona horaria"""
+        return np.array([f.replace(tzinfo=None) for f in fechas], dtype='datetime64[us]')
+
+    def _calcular(self, claves, horas):
+        if len(horas) == 0:
+            self.grupos = np.empty((0, claves.shape[1]), dtype=np.int64)
+            self.cantidad = np.empty(0, dtype=np.int64)
+            self.media = self.mediana = self.p90 = np.empty(0)
+            self.histograma = np.empty((0, len(self.TRAMOS_HORAS) + 1), dtype=np.int64)
+            return
+
+        if claves.shape[1]:
+            self.grupos, grupo = np.unique(claves, axis=0, return_inverse=True)
+            grupo = grupo.reshape(-1)
+        else:
+            self.grupos = np.empty((1, 0), dtype=np.int64)
+            grupo = np.zeros(len(horas), dtype=np.int64)
+
+        n_grupos = len(self.grupos)
+        self.cantidad = np.bincount(grupo, minlength=n_grupos)
+        self.media = np.bincount(grupo, weights=horas, minlength=n_grupos) / self.cantidad
+
+        # Ordenar por grupo y luego por horas: cada grupo queda contiguo y ordenado
+        orden = np.lexsort((horas, grupo))
+        ordenadas = horas[orden]
+        inicio = np.concatenate(([0], np.cumsum(self.cantidad)[:-1]))
+        self.mediana = self._percentil(ordenadas, inicio, 0.5)
+        self.p90 = self._percentil(ordenadas, inicio, 0.9)
+
+        n_tramos = len(self.TRAMOS_HORAS) + 1
+        tramo = np.searchsorted(self.TRAMOS_HORAS, horas, side='left')
+        self.histograma = np.bincount(
+            grupo * n_tramos + tramo,
+            minlength=n_grupos * n_tramos
+        ).reshape(n_grupos, n_tramos)
+
+    def _percentil(self, ordenadas, inicio, q):
+        """Percentil q de cada grupo con interpolación lineal"""
+        posicion = inicio + q * (self.cantidad - 1)
+        abajo = np.floor(posicion).astype(np.int64)
+        arriba = np.ceil(posicion).astype(np.int64)
+        return ordenadas[abajo] + (ordenadas[arriba] - ordenadas[abajo]) * (posicion - abajo)
+
+    def resultados(self) -> list:
+        """Lista de grupos con sus estadísticas (horas, redondeadas)"""
+        limites = self.TRAMOS_HORAS + [None]
+        return [
+            {
+                **{clave: int(self.grupos[i, j]) for j, clave in enumerate(self.agrupar_por)},
+                'cantidad': int(self.cantidad[i]),
+                'media': round(float(self.media[i]), 1),
+                'mediana': round(float(self.mediana[i]), 1),
+                'p90': round(float(self.p90[i]), 1),
+                'histograma': [
+                    {'hasta_horas': limite, 'cantidad': int(cantidad)}
+                    for limite, cantidad in zip(limites, self.histograma[i])
+                ]
+            }
+            for i in range(len(self.grupos))
+        ]
+
+    def por_grupo(self) -> dict:
+        """Resultados indexados por la tupla de claves del grupo"""
+        return {
+            tuple(resultado[clave] for clave in self.agrupar_por): resultado
+            for resultado in self.resultados()
+        }
+
+    def total(self) -> dict:
+        """Resultado del único grupo (sin agrupar) o None si no hay datos"""
+        resultados = self.resultados()
+        return resultados[0] if resultados else None
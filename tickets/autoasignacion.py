@@ -0,0 +1,292 @@
+"""
+Asignación automática de tickets abiertos sin técnico
+
+Los tickets pendientes se recorren por prioridad (Urgente primero) y
+antigüedad. Cada uno va al técnico de menor costo para su categoría:
+
+    costo = (tickets activos + 1) / competencia en la categoría
+
+donde la competencia es la tasa de resolución de IAMetricasTecnico suavizada
+hacia 0.5 (igual que MotorRankingTecnicos). Cada categoría tiene un heap de
+técnicos por costo; al asignar un ticket solo cambia la carga de un técnico,
+así que sus entradas en los demás heaps quedan vencidas y se recalculan al
+salir del heap (invalidación perezosa) en vez de reconstruir los heaps.
+
+PlanificadorOptimo resuelve la misma cola como un problema de asignación
+(algoritmo húngaro) para obtener el mejor reparto global de un lote.
+"""
+import heapq
+
+import numpy as np
+
+from authentication.models import Usuarios
+from ia_service.models import IAMetricasTecnico
+from . import contadores, transiciones
+from .models import Ticket
+
+
+# Tickets activos a partir de los cuales un técnico no recibe más
+MAXIMO_ACTIVOS = 10
+
+
+class PlanificadorAsignacion:
+    """Planifica (y opcionalmente aplica) la asignación de la cola pendiente"""
+
+    def __init__(self, maximo_activos=MAXIMO_ACTIVOS, limite=None):
+        self.maximo_activos = maximo_activos
+        self.limite = limite
+
+        tecnicos = contadores.tecnicos_con_carga()
+        self.nombres = {
+            t.id_usuarios: t.personas_id_personas.nombre_completo
+            for t in tecnicos
+        }
+        self.carga = {t.id_usuarios: t.contador_tickets.activos for t in tecnicos}
+        # Versión de la carga de cada técnico: invalida sus entradas en los heaps
+        self.version = dict.fromkeys(self.carga, 0)
+
+        self.competencia = {}
+        self.tiempo = {}
+        for tecnico_id, categoria_id, resueltos, totales, tiempo in IAMetricasTecnico.objects.filter(
+            tecnico_id__in=list(self.carga)
+        ).values_list(
+            'tecnico_id', 'categoria_id', 'tickets_resueltos', 'tickets_totales', 'tiempo_promedio_resolucion'
+        ):
+            self.competencia[(tecnico_id, categoria_id)] = (resueltos + 1) / (totales + 2)
+            if tiempo is not None:
+                self.tiempo[(tecnico_id, categoria_id)] = float(tiempo)
+        self.heaps = {}
+
+    def _competencia(self, tecnico_id, categoria_id):
+        return self.competencia.get((tecnico_id, categoria_id), 0.5)
+
+    def _entrada(self, tecnico_id, categoria_id):
+        costo = (self.carga[tecnico_id] + 1) / self._competencia(tecnico_id, categoria_id)
+        return (costo, tecnico_id, self.version[tecnico_id])
+
+    def _heap(self, categoria_id):
+        if categoria_id not in self.heaps:
+            heap = [
+                self._entrada(tecnico_id, categoria_id)
+                for tecnico_id, carga in self.carga.items()
+                if carga < self.maximo_activos
+            ]
+            heapq.heapify(heap)
+            self.heaps[categoria_id] = heap
+        return self.heaps[categoria_id]
+
+    def _elegir(self, categoria_id):
+        """Técnico de menor costo para la categoría (None si todos están llenos)"""
+        heap = self._heap(categoria_id)
+
+        while heap:
+            _, tecnico_id, version = heapq.heappop(heap)
+            if self.carga[tecnico_id] >= self.maximo_activos:
+                continue
+            if version != self.version[tecnico_id]:
+                # La carga cambió desde que se insertó: se reinserta con el costo actual
+                heapq.heappush(heap, self._entrada(tecnico_id, categoria_id))
+                continue
+
+            self.carga[tecnico_id] += 1
+            self.version[tecnico_id] += 1
+            if self.carga[tecnico_id] < self.maximo_activos:
+                heapq.heappush(heap, self._entrada(tecnico_id, categoria_id))
+            return tecnico_id
+
+        return None
+
+    def pendientes(self):
+        """Tickets Abiertos sin técnico por prioridad y antigüedad"""
+        consulta = Ticket.objects.filter(
+            estado_id=transiciones.ABIERTO,
+            tecnico_asignado_id__isnull=True
+        ).order_by('-prioridad_id', 'fecha_creacion', 'id_ticket').values_list(
+            'id_ticket', 'categoria_id', 'prioridad_id'
+        )
+        if self.limite:
+            consulta = consulta[:self.limite]
+        return list(consulta)
+
+    def planificar(self) -> dict:
+        asignaciones = []
+        sin_tecnico = []
+
+        for id_ticket, categoria_id, prioridad_id in self.pendientes():
+            tecnico_id = self._elegir(categoria_id)
+            if tecnico_id is None:
+                sin_tecnico.append(id_ticket)
+                continue
+
+            asignaciones.append(self._asignacion(
+                id_ticket, categoria_id, prioridad_id, tecnico_id, self.carga[tecnico_id]
+            ))
+
+        return {'asignaciones': asignaciones, 'sin_tecnico': sin_tecnico}
+
+    def _asignacion(self, id_ticket, categoria_id, prioridad_id, tecnico_id, carga):
+        return {
+            'id_ticket': id_ticket,
+            'categoria_id': categoria_id,
+            'prioridad_id': prioridad_id,
+            'tecnico_id': tecnico_id,
+            'tecnico': self.nombres[tecnico_id],
+            'competencia': round(self._competencia(tecnico_id, categoria_id), 3),
+            'carga_resultante': carga
+        }
+
+    def ejecutar(self, usuario_id, simular=False) -> dict:
+        """
+        Planifica y, salvo simular=True, aplica las asignaciones en una
+        transacción con transiciones.asignar_lote
+        """
+        plan = self.planificar()
+        if simular or not plan['asignaciones']:
+            return {**plan, 'actualizados': [], 'errores': []}
+
+        resultado = transiciones.asignar_lote(
+            {a['id_ticket']: a['tecnico_id'] for a in plan['asignaciones']},
+            usuario_id
+        )
+        return {**plan, **resultado}
+
+
+def resolver_asignacion(costos):
+    """
+    Algoritmo húngaro (caminos de aumento más cortos con potenciales) para
+    una matriz de costos n x m con n <= m. Retorna, para cada fila, la
+    columna asignada de modo que la suma de costos sea mínima. O(n² m), con
+    el recorrido de columnas vectorizado.
+    """
+    n, m = costos.shape
+    if n > m:
+        raise ValueError('La matriz debe tener al menos tantas columnas como filas')
+
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    fila_de = np.zeros(m + 1, dtype=np.int64)    # fila (1..n) asignada a cada columna; 0 = libre
+    previa = np.zeros(m + 1, dtype=np.int64)     # columna anterior en el camino de aumento
+
+    for i in range(1, n + 1):
+        fila_de[0] = i
+        j0 = 0
+        minimo = np.full(m + 1, np.inf)
+        usada = np.zeros(m + 1, dtype=bool)
+
+        while fila_de[j0] != 0:
+            usada[j0] = True
+            i0 = fila_de[j0]
+            libres = ~usada[1:]
+
+            reducido = costos[i0 - 1] - u[i0] - v[1:]
+            mejora = libres & (reducido < minimo[1:])
+            minimo[1:][mejora] = reducido[mejora]
+            previa[1:][mejora] = j0
+
+            candidatos = np.where(libres, minimo[1:], np.inf)
+            j1 = int(np.argmin(candidatos)) + 1
+            delta = candidatos[j1 - 1]
+
+            u[fila_de[usada]] += delta
+            v[usada] -= delta
+            minimo[1:][libres] -= delta
+            j0 = j1
+
+        # Aumento: se desplazan las asignaciones a lo largo del camino
+        while j0:
+            j1 = previa[j0]
+            fila_de[j0] = fila_de[j1]
+            j0 = j1
+
+    columna_de = np.empty(n, dtype=np.int64)
+    asignadas = np.nonzero(fila_de[1:])[0]
+    columna_de[fila_de[1:][asignadas] - 1] = asignadas
+    return columna_de
+
+
+class PlanificadorOptimo(PlanificadorAsignacion):
+    """
+    Asigna un lote de tickets pendientes minimizando el costo total:
+
+        costo(ticket, técnico, k) = prioridad x (carga + k + 1) / calidad
+
+    donde k es el cupo del técnico que ocupa el ticket (0 = el primero que
+    le queda libre hasta maximo_activos) y calidad combina la competencia en
+    la categoría con la rapidez relativa (tiempo promedio de resolución
+    frente a la mediana, 0.5 sin datos). Cada técnico aporta una columna por
+    cupo libre, así la capacidad se respeta y cada ticket adicional le
+    cuesta más. Multiplicar por la prioridad hace que los tickets urgentes
+    se queden con los mejores cupos.
+    """
+
+    def _calidad(self, tecnicos, categorias):
+        """Matriz (categorías x técnicos) con competencia x (0.5 + rapidez)"""
+        competencia = np.array([
+            [self._competencia(t, c) for t in tecnicos] for c in categorias
+        ])
+
+        tiempo = np.array([
+            [self.tiempo.get((t, c), np.nan) for t in tecnicos] for c in categorias
+        ])
+        conocidos = tiempo[~np.isnan(tiempo)]
+        referencia = np.median(conocidos) if len(conocidos) else 0.0
+        if referencia > 0:
+            rapidez = np.where(np.isnan(tiempo), 0.5, referencia / (referencia + np.nan_to_num(tiempo)))
+        else:
+            rapidez = np.full(tiempo.shape, 0.5)
+
+        return competencia * (0.5 + rapidez)
+
+    def planificar(self) -> dict:
+        tecnicos = [t for t, carga in self.carga.items() if carga < self.maximo_activos]
+        cupos = np.array([self.maximo_activos - self.carga[t] for t in tecnicos], dtype=np.int64)
+        pendientes = self.pendientes()
+
+        # Con más tickets que cupos se resuelven los primeros de la cola
+        total_cupos = int(cupos.sum())
+        lote = pendientes[:total_cupos]
+        sin_tecnico = [id_ticket for id_ticket, _, _ in pendientes[total_cupos:]]
+
+        if not lote:
+            return {'asignaciones': [], 'sin_tecnico': sin_tecnico, 'costo_total': 0.0}
+
+        # Columnas: un cupo por técnico y ticket adicional que puede recibir
+        tecnico_columna = np.repeat(np.arange(len(tecnicos)), cupos)
+        inicio = np.repeat(np.cumsum(cupos) - cupos, cupos)
+        cupo_columna = np.arange(total_cupos) - inicio
+        carga_columna = np.array([self.carga[t] for t in tecnicos])[tecnico_columna] + cupo_columna + 1
+
+        ids, categorias_lote, prioridades_lote = (np.array(c) for c in zip(*lote))
+        categorias, categoria_fila = np.unique(categorias_lote, return_inverse=True)
+        calidad = self._calidad(tecnicos, categorias.tolist())
+
+        costos = (
+            prioridades_lote[:, None]
+            * carga_columna[None, :]
+            / calidad[categoria_fila.reshape(-1)][:, tecnico_columna]
+        )
+        columnas = resolver_asignacion(costos)
+
+        # Los cupos de un mismo técnico cuestan lo mismo salvo por la carga:
+        # la carga resultante se informa en el orden de la cola
+        asignaciones = []
+        for i, j in enumerate(columnas.tolist()):
+            tecnico_id = tecnicos[tecnico_columna[j]]
+            self.carga[tecnico_id] += 1
+            asignaciones.append(self._asignacion(
+                int(ids[i]), int(categorias_lote[i]), int(prioridades_lote[i]),
+                tecnico_id, self.carga[tecnico_id]
+            ))
+
+        return {
+            'asignaciones': asignaciones,
+            'sin_tecnico': sin_tecnico,
+            'costo_total': round(float(costos[np.arange(len(lote)), columnas].sum()), 3)
+        }
+
+
+def administrador_por_defecto():
+    """Administrador que firma el historial de las asignaciones automáticas"""
+    return Usuarios.objects.filter(roles_id_roles=3).order_by('id_usuarios').values_list(
+        'id_usuarios', flat=True
+    ).first()
@@ -0,0 +1,218 @@
+"""
+Contadores de tickets activos por técnico (contador_tecnico)
+
+Se mantienen como consumidor de los eventos 'ticket' del outbox (ver
+signals.py) y permiten a las conexiones en espera (long-poll / SSE)
+enterarse de cambios sin consultar los tickets.
+"""
+import asyncio
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+
+from authentication.models import Usuarios
+from .models import Ticket, ContadorTecnico
+
+
+# Estados que cuentan como activos y su contador
+CAMPO_ESTADO = {
+    1: 'abiertos',
+    2: 'en_proceso',
+}
+
+# Prioridad de un ticket activo y su contador
+CAMPO_PRIORIDAD = {
+    1: 'activos_baja',
+    2: 'activos_media',
+    3: 'activos_alta',
+    4: 'activos_urgente',
+}
+
+CAMPOS_CONTADOR = list(CAMPO_ESTADO.values()) + list(CAMPO_PRIORIDAD.values())
+
+# Despierta a las conexiones de este proceso que esperan cambios. Las de
+# otros procesos los detectan al releer la versión (ver esperar_cambio).
+_cambios = threading.Condition()
+
+
+def _aporte(foto, signo, deltas):
+    """Suma (o resta) a los contadores del técnico lo que aporta un ticket"""
+    if foto is None or foto.tecnico_id is None or foto.estado_id not in CAMPO_ESTADO:
+        return
+
+    deltas[foto.tecnico_id][CAMPO_ESTADO[foto.estado_id]] += signo
+    if foto.prioridad_id in CAMPO_PRIORIDAD:
+        deltas[foto.tecnico_id][CAMPO_PRIORIDAD[foto.prioridad_id]] += signo
+
+
+def aplicar_cambios(cambios):
+    """
+    Aplica los cambios de tickets (lista de (antes, despues) con FotoTicket)
+    a los contadores y aumenta la versión de cada técnico afectado
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    tecnicos = set()
+
+    for antes, despues in cambios:
+        if antes == despues:
+            continue
+        _aporte(antes, -1, deltas)
+        _aporte(despues, 1, deltas)
+        tecnicos.update(
+            foto.tecnico_id for foto in (antes, despues)
+            if foto is not None and foto.tecnico_id is not None
+        )
+
+    if not tecnicos:
+        return
+
+    with transaction.atomic():
+        for tecnico_id in tecnicos:
+            valores = {
+                campo: F(campo) + delta
+                for campo, delta in deltas[tecnico_id].items()
+                if delta
+            }
+            actualizados = ContadorTecnico.objects.filter(tecnico_id=tecnico_id).update(
+                version=F('version') + 1,
+                **valores
+            )
+            if not actualizados:
+                # Sin fila todavía: se calcula desde los tickets (ya guardados)
+                reconstruir([tecnico_id])
+
+    transaction.on_commit(notificar)
+
+
+def _contar(tecnico_ids):
+    """Campos del contador de cada técnico, calculados con una consulta agrupada"""
+    filas = Ticket.objects.filter(
+        tecnico_asignado_id__in=tecnico_ids,
+        estado_id__in=CAMPO_ESTADO.keys()
+    ).values('tecnico_asignado_id').annotate(
+        **{campo: Count('id_ticket', filter=Q(estado_id=estado)) for estado, campo in CAMPO_ESTADO.items()},
+        **{campo: Count('id_ticket', filter=Q(prioridad_id=prioridad)) for prioridad, campo in CAMPO_PRIORIDAD.items()}
+    ).order_by()
+    por_tecnico = {fila['tecnico_asignado_id']: fila for fila in filas}
+
+    return {
+        tecnico_id: {campo: por_tecnico.get(tecnico_id, {}).get(campo, 0) for campo in CAMPOS_CONTADOR}
+        for tecnico_id in tecnico_ids
+    }
+
+
+def reconstruir(tecnico_ids=None):
+    """
+    Recalcula los contadores desde los tickets con una consulta agrupada.
+    Sin tecnico_ids se recalculan todos los técnicos.
+    """
+    if tecnico_ids is None:
+        tecnico_ids = list(Usuarios.objects.filter(
+            roles_id_roles=1
+        ).values_list('id_usuarios', flat=True))
+
+    por_tecnico = _contar(tecnico_ids)
+    versiones = dict(ContadorTecnico.objects.filter(
+        tecnico_id__in=tecnico_ids
+    ).values_list('tecnico_id', 'version'))
+
+    ContadorTecnico.objects.bulk_create(
+        [
+            ContadorTecnico(
+                tecnico_id=tecnico_id,
+                version=versiones.get(tecnico_id, 0) + 1,
+                **por_tecnico[tecnico_id]
+            )
+            for tecnico_id in tecnico_ids
+        ],
+        update_conflicts=True,
+        # MySQL no acepta unique_fields: usa ON DUPLICATE KEY sobre la clave primaria tecnico_id
+        unique_fields=['tecnico'] if connection.features.supports_update_conflicts_with_target else None,
+        update_fields=CAMPOS_CONTADOR + ['version', 'fecha_actualizacion']
+    )
+    transaction.on_commit(notificar)
+
+    return len(tecnico_ids)
+
+
+def obtener(tecnico_id):
+    """Contador del técnico (se crea si aún no existe)"""
+    contador = ContadorTecnico.objects.filter(tecnico_id=tecnico_id).first()
+    if contador is None:
+        reconstruir([tecnico_id])
+        contador = ContadorTecnico.objects.get(tecnico_id=tecnico_id)
+    return contador
+
+
+def tecnicos_con_carga():
+    """
+    Técnicos (rol 1) con su contador precargado en contador_tickets, en una
+    sola consulta. Solo lee: a los técnicos sin fila se les calcula un
+    contador que no se guarda (la fila la crean obtener() o los eventos).
+    """
+    tecnicos = list(Usuarios.objects.select_related(
+        'personas_id_personas',
+        'roles_id_roles',
+        'cargos_id_cargos',
+        'contador_tickets'
+    ).filter(roles_id_roles=1).order_by('id_usuarios'))
+
+    faltantes = [t for t in tecnicos if not hasattr(t, 'contador_tickets')]
+    if faltantes:
+        calculados = _contar([t.id_usuarios for t in faltantes])
+        for tecnico in faltantes:
+            tecnico.contador_tickets = ContadorTecnico(version=0, **calculados[tecnico.id_usuarios])
+
+    return tecnicos
+
+
+def carga_por_prioridad(contador):
+    """Tickets activos del contador por nombre de prioridad"""
+    return {
+        'baja': contador.activos_baja,
+        'media': contador.activos_media,
+        'alta': contador.activos_alta,
+        'urgente': contador.activos_urgente,
+    }
+
+
+def notificar():
+    with _cambios:
+        _cambios.notify_all()
+
+
+def esperar_cambio(tecnico_id, version, timeout, intervalo=2):
+    """
+    Espera hasta timeout segundos a que la versión del contador del técnico
+    sea distinta de version. Retorna el contador leído por última vez.
+    """
+    limite = time.monotonic() + timeout
+
+    while True:
+        contador = obtener(tecnico_id)
+        restante = limite - time.monotonic()
+        if contador.version != version or restante <= 0:
+            return contador
+
+        with _cambios:
+            _cambios.wait(min(intervalo, restante))
+
+
+async def aesperar_cambio(tecnico_id, version, timeout, intervalo=2):
+    """
+    Versión async de esperar_cambio para el stream bajo ASGI: espera con
+    asyncio.sleep entre lecturas, sin ocupar el hilo de las vistas síncronas
+    """
+    limite = time.monotonic() + timeout
+
+    while True:
+        contador = await sync_to_async(obtener)(tecnico_id)
+        restante = limite - time.monotonic()
+        if contador.version != version or restante <= 0:
+            return contador
+
+        await asyncio.sleep(min(intervalo, restante))
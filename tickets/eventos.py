@@ -0,0 +1,262 @@
+"""
+Outbox de eventos de dominio y despachador
+
+Los cambios de tickets, calificaciones y reclamos se registran con publicar()
+en la tabla eventos_dominio, dentro de la misma transacción que el cambio: si
+la transacción se revierte, el evento tampoco existe.
+
+Las estructuras derivadas (contadores, métricas, cachés) se registran como
+consumidores con @consumidor. despachar() les entrega los eventos nuevos en
+orden de id y guarda en eventos_checkpoint el último procesado por cada uno,
+en la misma transacción que los cambios del consumidor. Al confirmar cada
+transacción que publica eventos se entrega un lote sin esperar a otros
+despachos en curso; el resto lo entrega el comando despachar_eventos.
+
+Un id faltante detiene la entrega hasta MARGEN_HUECO_SEGUNDOS; después el
+despacho sigue y registra el id en eventos_huecos. Si ese evento se confirma
+más tarde (transacción larga), el comando repara a los consumidores que ya
+lo pasaron con su función reparar.
+"""
+import json
+import logging
+from collections import namedtuple
+from datetime import timedelta
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Min
+from django.utils import timezone
+
+from .models import CheckpointConsumidor, EventoDominio, HuecoEvento
+
+
+logger = logging.getLogger(__name__)
+
+
+TAMANO_LOTE = 500
+
+# Un id faltante (transacción aún abierta o revertida) detiene la entrega
+# hasta que el evento siguiente tenga esta antigüedad; luego se registra como
+# hueco y la entrega sigue
+MARGEN_HUECO_SEGUNDOS = 10
+
+# Un hueco sin evento después de este tiempo fue una transacción revertida
+VIGENCIA_HUECO = timedelta(hours=1)
+
+Consumidor = namedtuple('Consumidor', ['nombre', 'funcion', 'tipos', 'reparar'])
+
+_consumidores = {}
+
+
+def consumidor(nombre, tipos, reparar=None):
+    """
+    Registra una función que recibe la lista de eventos (EventoDominio con
+    el atributo contenido ya decodificado) de los tipos indicados.
+    reparar recibe los eventos confirmados después de que el consumidor los
+    pasó y debe dejar su estado correcto aunque se repita; por defecto es la
+    misma función (basta para las que solo invalidan cachés).
+    """
+    def registrar(funcion):
+        _consumidores[nombre] = Consumidor(nombre, funcion, set(tipos), reparar or funcion)
+        return funcion
+    return registrar
+
+
+def publicar(tipo, datos):
+    """
+    Registra eventos de un tipo (datos: lista de diccionarios, uno por
+    evento). Debe llamarse dentro de la transacción del cambio.
+    """
+    EventoDominio.objects.bulk_create([
+        EventoDominio(tipo=tipo, datos=json.dumps(d, cls=DjangoJSONEncoder))
+        for d in datos
+    ])
+    transaction.on_commit(despachar_al_confirmar)
+
+
+def despachar_al_confirmar():
+    """
+    Entrega inmediata tras el commit: un solo lote y solo a los consumidores
+    que ningún otro proceso está despachando, así los requests no se
+    serializan en los checkpoints. Lo pendiente lo retoma el comando.
+    """
+    try:
+        despachar(esperar=False, maximo_lotes=1)
+    except Exception:
+        logger.exception('Error despachando eventos')
+
+
+def _checkpoints(nombres, esperar=True):
+    """
+    Bloquea los checkpoints de los consumidores; con esperar=False omite los
+    que otro proceso tiene bloqueados. Un consumidor nuevo empieza donde va
+    el más atrasado de los existentes (0 si no hay ninguno): no reprocesa el
+    historial, su estado inicial se construye con su comando de
+    reconstrucción.
+    """
+    existentes = CheckpointConsumidor.objects.filter(consumidor__in=nombres).count()
+    if existentes < len(nombres):
+        inicio = CheckpointConsumidor.objects.aggregate(inicio=Min('ultimo_evento'))['inicio'] or 0
+        CheckpointConsumidor.objects.bulk_create(
+            [CheckpointConsumidor(consumidor=nombre, ultimo_evento=inicio) for nombre in nombres],
+            ignore_conflicts=True
+        )
+    return {
+        c.consumidor: c
+        for c in CheckpointConsumidor.objects.select_for_update(
+            skip_locked=not esperar
+        ).filter(consumidor__in=nombres)
+    }
+
+
+def _hasta_hueco(eventos, desde):
+    """
+    Eventos consecutivos desde el id siguiente a desde (ver
+    MARGEN_HUECO_SEGUNDOS) y los ids faltantes que quedan atrás
+    """
+    limite = timezone.now() - timedelta(seconds=MARGEN_HUECO_SEGUNDOS)
+    esperado = desde + 1
+    saltados = []
+
+    for i, evento in enumerate(eventos):
+        if evento.id_evento != esperado:
+            if evento.fecha_creacion > limite:
+                return eventos[:i], saltados
+            # Sin historial previo (desde = 0) los ids anteriores no son huecos
+            if desde:
+                saltados.extend(range(esperado, evento.id_evento))
+        esperado = evento.id_evento + 1
+
+    return eventos, saltados
+
+
+def _registrar_huecos(saltados):
+    HuecoEvento.objects.bulk_create(
+        [HuecoEvento(id_evento=id_evento) for id_evento in saltados],
+        ignore_conflicts=True
+    )
+    logger.warning('Eventos saltados (transacción abierta o revertida): %s', saltados)
+
+
+def revisar_huecos() -> int:
+    """
+    Repara a los consumidores que ya pasaron un evento confirmado tarde y
+    olvida los huecos vencidos. Retorna los eventos tardíos encontrados.
+    """
+    with transaction.atomic():
+        huecos = list(HuecoEvento.objects.select_for_update(skip_locked=True))
+        if not huecos:
+            return 0
+
+        tardios = list(EventoDominio.objects.filter(
+            id_evento__in=[h.id_evento for h in huecos]
+        ).order_by('id_evento'))
+        reparados = True
+        if tardios:
+            logger.warning('Eventos confirmados después de ser saltados: %s', [e.id_evento for e in tardios])
+            for evento in tardios:
+                evento.contenido = json.loads(evento.datos)
+
+            checkpoints = dict(CheckpointConsumidor.objects.values_list('consumidor', 'ultimo_evento'))
+            for registrado in _consumidores.values():
+                afectados = [
+                    e for e in tardios
+                    if e.tipo in registrado.tipos and e.id_evento <= checkpoints.get(registrado.nombre, 0)
+                ]
+                if not afectados:
+                    continue
+                try:
+                    with transaction.atomic():
+                        registrado.reparar(afectados)
+                except Exception:
+                    # Los huecos quedan registrados y se reintenta en la próxima revisión
+                    logger.exception('Error reparando el consumidor %s', registrado.nombre)
+                    reparados = False
+
+        vencimiento = timezone.now() - VIGENCIA_HUECO
+        encontrados = {e.id_evento for e in tardios}
+        resueltos = list(encontrados) if reparados else []
+        resueltos += [
+            h.id_evento for h in huecos
+            if h.fecha_registro < vencimiento and h.id_evento not in encontrados
+        ]
+        HuecoEvento.objects.filter(id_evento__in=resueltos).delete()
+
+    return len(tardios)
+
+
+def despachar(nombres=None, lote=TAMANO_LOTE, esperar=True, maximo_lotes=None) -> dict:
+    """
+    Entrega los eventos pendientes a los consumidores (todos o los
+    indicados). Cada lote se lee una vez para todos; cada consumidor lo
+    procesa en un savepoint junto con su checkpoint, así un consumidor que
+    falla no avanza ni afecta a los demás y reintenta en la próxima
+    ejecución. Con esperar=False se omiten los consumidores que otro proceso
+    está despachando; maximo_lotes limita los lotes de esta llamada.
+    Retorna los eventos procesados por consumidor.
+    """
+    activos = [n for n in (nombres or _consumidores) if n in _consumidores]
+    procesados = dict.fromkeys(activos, 0)
+    lotes = 0
+
+    while activos:
+        with transaction.atomic():
+            checkpoints = _checkpoints(activos, esperar)
+            activos = [n for n in activos if n in checkpoints]
+            if not activos:
+                break
+            desde = min(c.ultimo_evento for c in checkpoints.values())
+            leidos = list(EventoDominio.objects.filter(id_evento__gt=desde).order_by('id_evento')[:lote])
+            eventos, saltados = _hasta_hueco(leidos, desde)
+            if saltados:
+                _registrar_huecos(saltados)
+
+            for evento in eventos:
+                evento.contenido = json.loads(evento.datos)
+
+            fallidos = []
+            for nombre in activos:
+                checkpoint = checkpoints[nombre]
+                pendientes = [e for e in eventos if e.id_evento > checkpoint.ultimo_evento]
+                if not pendientes:
+                    continue
+
+                registrado = _consumidores[nombre]
+                try:
+                    with transaction.atomic():
+                        relevantes = [e for e in pendientes if e.tipo in registrado.tipos]
+                        if relevantes:
+                            registrado.funcion(relevantes)
+                        checkpoint.ultimo_evento = pendientes[-1].id_evento
+                        checkpoint.save(update_fields=['ultimo_evento', 'fecha_actualizacion'])
+                except Exception:
+                    logger.exception('Error en el consumidor %s', nombre)
+                    fallidos.append(nombre)
+                    continue
+
+                procesados[nombre] += len(pendientes)
+
+        lotes += 1
+        if len(leidos) < lote or len(eventos) < len(leidos) or lotes == maximo_lotes:
+            break
+        activos = [n for n in activos if n not in fallidos]
+
+    return procesados
+
+
+def purgar(dias):
+    """
+    Elimina los eventos con más de dias de antigüedad ya procesados por
+    todos los consumidores registrados. Retorna la cantidad eliminada.
+    """
+    procesado = CheckpointConsumidor.objects.filter(
+        consumidor__in=list(_consumidores)
+    ).order_by('ultimo_evento').values_list('ultimo_evento', flat=True).first()
+    if procesado is None:
+        return 0
+
+    eliminados, _ = EventoDominio.objects.filter(
+        id_evento__lte=procesado,
+        fecha_creacion__lt=timezone.now() - timedelta(days=dias)
+    ).delete()
+    return eliminados
@@ -0,0 +1,149 @@
+"""
+Importación masiva de tickets (JSON o CSV)
+"""
+import csv
+import io
+
+from django.db import connection, transaction
+
+from authentication.models import Usuarios
+from . import prioridades
+from .models import Ticket
+from .signals import foto_ticket, tickets_cambiados
+
+
+class ImportadorTickets:
+    """
+    Valida un lote de filas, resuelve los cargos de los usuarios con una
+    consulta, toma todas las prioridades de la matriz cargo x categoría en
+    una pasada y crea los tickets con bulk_create por lotes. Las filas
+    inválidas se reportan sin detener la importación.
+
+    Los eventos 'ticket' del outbox llevan el id de cada ticket: en MySQL,
+    donde un INSERT múltiple no retorna los ids (y con
+    innodb_autoinc_lock_mode=2 no son consecutivos), cada lote se inserta
+    fila por fila dentro de su transacción.
+    """
+
+    CAMPOS = ['titulo', 'descripcion', 'categoria_id', 'usuario_creador_id']
+    MAXIMO_FILAS = 5000
+    TAMANO_LOTE = 500
+    LARGO_TITULO = 100
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.errores = []
+
+    @classmethod
+    def desde_csv(cls, archivo):
+        """Crea el importador desde un archivo CSV con encabezados (CAMPOS)"""
+        contenido = archivo.read()
+        if isinstance(contenido, bytes):
+            contenido = contenido.decode('utf-8-sig')
+        return cls(list(csv.DictReader(io.StringIO(contenido))))
+
+    def _error(self, fila, mensaje):
+        self.errores.append({'fila': fila, 'error': mensaje})
+
+    def _validar(self):
+        """Retorna las filas válidas como (número de fila, datos normalizados)"""
+        validas = []
+
+        for numero, fila in enumerate(self.filas, start=1):
+            if not isinstance(fila, dict):
+                self._error(numero, 'Formato de fila inválido')
+                continue
+
+            faltantes = [campo for campo in self.CAMPOS if not str(fila.get(campo) or '').strip()]
+            if faltantes:
+                self._error(numero, f"Campos obligatorios: {', '.join(faltantes)}")
+                continue
+
+            titulo = str(fila['titulo']).strip()
+            if len(titulo) > self.LARGO_TITULO:
+                self._error(numero, f'El título supera {self.LARGO_TITULO} caracteres')
+                continue
+
+            try:
+                categoria_id = int(fila['categoria_id'])
+                usuario_id = int(fila['usuario_creador_id'])
+            except (TypeError, ValueError):
+                self._error(numero, 'categoria_id y usuario_creador_id deben ser números')
+                continue
+
+            validas.append((numero, {
+                'titulo': titulo,
+                'descripcion': str(fila['descripcion']).strip(),
+                'categoria_id': categoria_id,
+                'usuario_id': usuario_id
+            }))
+
+        return validas
+
+    def importar(self, solo_validar: bool = False) -> dict:
+        if len(self.filas) > self.MAXIMO_FILAS:
+            self._error(None, f'Máximo {self.MAXIMO_FILAS} filas por importación')
+            return self._resultado(0)
+
+        validas = self._validar()
+
+        # Cargos de los creadores en una consulta; las categorías y el
+        # cálculo de prioridad salen de la matriz en memoria
+        cargos = dict(Usuarios.objects.filter(
+            id_usuarios__in={datos['usuario_id'] for _, datos in validas}
+        ).values_list('id_usuarios', 'cargos_id_cargos'))
+        matriz = prioridades.obtener_matriz(
+            set(cargos.values()),
+            {datos['categoria_id'] for _, datos in validas}
+        )
+
+        resueltas = []
+        for numero, datos in validas:
+            if datos['usuario_id'] not in cargos:
+                self._error(numero, 'Usuario no encontrado')
+            elif not matriz.contiene(categoria_ids=[datos['categoria_id']]):
+                self._error(numero, 'Categoría no encontrada')
+            else:
+                resueltas.append(datos)
+
+        prioridades_filas = matriz.prioridades_para(
+            [cargos[d['usuario_id']] for d in resueltas],
+            [d['categoria_id'] for d in resueltas]
+        )
+
+        if solo_validar:
+            return self._resultado(0, validas=len(resueltas))
+
+        tickets = [
+            Ticket(
+                titulo=datos['titulo'],
+                descripcion=datos['descripcion'],
+                categoria_id_id=datos['categoria_id'],
+                prioridad_id_id=prioridad,
+                usuario_creador_id_id=datos['usuario_id'],
+                estado_id_id=1  # Estado: Abierto
+            )
+            for datos, prioridad in zip(resueltas, prioridades_filas.tolist())
+        ]
+
+        for inicio in range(0, len(tickets), self.TAMANO_LOTE):
+            lote = tickets[inicio:inicio + self.TAMANO_LOTE]
+            with transaction.atomic():
+                if connection.features.can_return_rows_from_bulk_insert:
+                    Ticket.objects.bulk_create(lote)
+                else:
+                    for ticket in lote:
+                        ticket.save(force_insert=True)
+                tickets_cambiados.send(sender=Ticket, cambios=[(None, foto_ticket(t)) for t in lote])
+
+        return self._resultado(len(tickets))
+
+    def _resultado(self, creados, validas=None):
+        resultado = {
+            'total_filas': len(self.filas),
+            'creados': creados,
+            'errores': sorted(self.errores, key=lambda e: e['fila'] or 0)
+        }
+        if validas is not None:
+            resultado['validas'] = validas
+        return resultado
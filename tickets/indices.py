@@ -0,0 +1,179 @@
+"""
+Índices compuestos de las consultas frecuentes
+
+Los modelos son managed = False, así que Django no crea índices en la base
+MySQL: el conjunto que necesitan los filtros de las vistas se declara aquí
+(las columnas nuevas de esas tablas están en sql/cambios_esquema.sql).
+El comando gestionar_indices lo compara con el esquema real, crea los que
+faltan y revisa con EXPLAIN que las consultas frecuentes los usen.
+"""
+from datetime import timedelta
+
+from django.db import connections
+from django.utils import timezone
+
+
+# Tabla -> [(nombre, columnas)]; el orden de las columnas importa: primero las
+# de igualdad, al final la de rango u orden
+INDICES = {
+    'tickets': [
+        # Tickets activos de un técnico (tecnico/mis-tickets, contadores, autoasignación)
+        ('idx_tickets_tecnico_estado', ('tecnico_asignado_id', 'estado_id')),
+        # Tickets de un trabajador por estado, los más nuevos primero
+        ('idx_tickets_creador_estado_fecha', ('usuario_creador_id', 'estado_id', 'fecha_creacion')),
+    ],
+    'historial_ticket': [
+        # Tickets que pasaron a un estado en un período (estadísticas históricas)
+        ('idx_historial_estado_fecha', ('estado_nuevo_id', 'fecha_cambio')),
+    ],
+    'ia_consultas_log': [
+        # Consultas del día de un usuario (límite diario)
+        ('idx_ia_consultas_usuario_fecha', ('usuario_id', 'fecha_consulta')),
+    ],
+}
+
+
+def indices_existentes(tabla, using='default'):
+    """Columnas de cada índice de la tabla (None si la tabla no existe)"""
+    conexion = connections[using]
+    with conexion.cursor() as cursor:
+        if tabla not in conexion.introspection.table_names(cursor):
+            return None
+        restricciones = conexion.introspection.get_constraints(cursor, tabla)
+
+    return {
+        nombre: tuple(datos['columns'])
+        for nombre, datos in restricciones.items()
+        if datos['index'] or datos['primary_key'] or datos['unique']
+    }
+
+
+def revisar(using='default'):
+    """
+    Estado de cada índice declarado: 'existe', 'cubierto' (otro índice empieza
+    con las mismas columnas), 'falta' o 'sin_tabla'
+    """
+    resultado = []
+    for tabla, declarados in INDICES.items():
+        existentes = indices_existentes(tabla, using)
+        for nombre, columnas in declarados:
+            if existentes is None:
+                estado, otro = 'sin_tabla', None
+            elif nombre in existentes:
+                estado, otro = 'existe', nombre
+            else:
+                otro = next(
+                    (n for n, cols in existentes.items() if cols[:len(columnas)] == columnas),
+                    None
+                )
+                estado = 'cubierto' if otro else 'falta'
+            resultado.append({
+                'tabla': tabla,
+                'nombre': nombre,
+                'columnas': columnas,
+                'estado': estado,
+                'indice': otro,
+            })
+    return resultado
+
+
+def sql_crear(tabla, nombre, columnas, using='default'):
+    """CREATE INDEX del índice declarado, para el motor de la conexión"""
+    conexion = connections[using]
+    nombre_col = conexion.ops.quote_name
+    sql = (
+        f'CREATE INDEX {nombre_col(nombre)} ON {nombre_col(tabla)} '
+        f'({", ".join(nombre_col(c) for c in columnas)})'
+    )
+    if conexion.vendor == 'mysql':
+        # InnoDB lo construye sin bloquear escrituras; si no puede, falla en vez de bloquear
+        sql += ' ALGORITHM=INPLACE LOCK=NONE'
+    return sql
+
+
+def crear(tabla, nombre, columnas, using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql_crear(tabla, nombre, columnas, using))
+
+
+# Columna del EXPLAIN con el índice que eligió el optimizador. En MySQL no
+# basta con buscar el nombre en toda la fila: possible_keys lista también los
+# índices solo considerados.
+COLUMNA_PLAN = {
+    'mysql': 'key',
+    'sqlite': 'detail',
+}
+
+
+def usa_indice(vendor, columnas, filas, nombre):
+    """
+    Si el plan (columnas y filas del EXPLAIN) elige el índice nombre. En
+    motores sin COLUMNA_PLAN se busca en todo el plan.
+    """
+    columna = COLUMNA_PLAN.get(vendor)
+    if columna not in columnas:
+        return any(nombre in ' '.join(str(c) for c in fila) for fila in filas)
+
+    posicion = columnas.index(columna)
+    if vendor == 'mysql':
+        # key trae varios índices separados por coma con index_merge
+        return any(nombre in str(fila[posicion]).split(',') for fila in filas)
+    return any(nombre in str(fila[posicion]) for fila in filas)
+
+
+def consultas_frecuentes():
+    """[(índice esperado, descripción, queryset)] con los filtros de las vistas"""
+    from ia_service.models import IAConsultasLog
+    from .models import HistorialTicket, Ticket
+
+    ahora = timezone.now()
+    return [
+        (
+            'idx_tickets_tecnico_estado',
+            'tickets activos de un técnico',
+            Ticket.objects.filter(tecnico_asignado_id=1, estado_id__in=[1, 2]),
+        ),
+        (
+            'idx_tickets_creador_estado_fecha',
+            'tickets pendientes de un trabajador',
+            Ticket.objects.filter(usuario_creador_id=1, estado_id__in=[1, 2]).order_by('-fecha_creacion'),
+        ),
+        (
+            'idx_historial_estado_fecha',
+            'tickets que pasaron a Resuelto en el mes',
+            HistorialTicket.objects.filter(
+                estado_nuevo_id=3,
+                fecha_cambio__range=[ahora - timedelta(days=30), ahora]
+            ).order_by().values('ticket_id').distinct(),
+        ),
+        (
+            'idx_ia_consultas_usuario_fecha',
+            'consultas IA del día de un usuario',
+            IAConsultasLog.objects.filter(
+                usuario_id=1,
+                fecha_consulta__gte=ahora.replace(hour=0, minute=0, second=0, microsecond=0)
+            ),
+        ),
+    ]
+
+
+def explicar(using='default'):
+    """Plan de cada consulta frecuente y si usa su índice (o el que lo cubre)"""
+    reales = {r['nombre']: r['indice'] or r['nombre'] for r in revisar(using)}
+
+    conexion = connections[using]
+    resultado = []
+    for indice, descripcion, consulta in consultas_frecuentes():
+        # Con el cursor y no QuerySet.explain(), que en SQLite omite el detalle de algunos planes
+        sql, params = consulta.query.get_compiler(using).as_sql()
+        with conexion.cursor() as cursor:
+            cursor.execute(f'{conexion.ops.explain_query_prefix()} {sql}', params)
+            columnas = [c[0] for c in cursor.description]
+            filas = cursor.fetchall()
+        resultado.append({
+            'indice': reales[indice],
+            'descripcion': descripcion,
+            'usa_indice': usa_indice(conexion.vendor, columnas, filas, reales[indice]),
+            'plan': '\n'.join(' '.join(str(c) for c in fila) for fila in filas),
+        })
+    return resultado
@@ -0,0 +1,91 @@
+"""
+Asigna automáticamente los tickets abiertos sin técnico
+
+Uso:
+    python manage.py autoasignar_tickets                  (una vez, p. ej. desde cron)
+    python manage.py autoasignar_tickets --simular        (solo muestra el plan)
+    python manage.py autoasignar_tickets --optimo         (reparto global, algoritmo húngaro)
+    python manage.py autoasignar_tickets --intervalo 5    (worker, cada 5 minutos)
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from migo_back.trabajos import repetir
+from tickets.autoasignacion import (
+    MAXIMO_ACTIVOS,
+    PlanificadorAsignacion,
+    PlanificadorOptimo,
+    administrador_por_defecto
+)
+
+
+class Command(BaseCommand):
+    help = 'Asigna los tickets abiertos sin técnico al técnico menos cargado y más competente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Muestra las asignaciones planificadas sin aplicarlas'
+        )
+        parser.add_argument(
+            '--optimo',
+            action='store_true',
+            help='Resuelve cada pasada como un problema de asignación (algoritmo húngaro)'
+        )
+        parser.add_argument(
+            '--maximo',
+            type=int,
+            default=MAXIMO_ACTIVOS,
+            help=f'Tickets activos máximos por técnico (default: {MAXIMO_ACTIVOS})'
+        )
+        parser.add_argument(
+            '--limite',
+            type=int,
+            default=None,
+            help='Máximo de tickets a asignar por pasada'
+        )
+        parser.add_argument(
+            '--admin',
+            type=int,
+            default=None,
+            help='Id del administrador que figura en el historial (default: el primero)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=None,
+            help='Minutos entre pasadas (sin este parámetro se ejecuta una vez)'
+        )
+
+    def handle(self, *args, **options):
+        admin_id = options['admin'] or administrador_por_defecto()
+        if not admin_id:
+            raise CommandError('No hay administradores para registrar el historial')
+
+        if not options['intervalo']:
+            self._pasada(admin_id, options)
+            return
+
+        repetir(lambda: self._pasada(admin_id, options), options['intervalo'] * 60, 'autoasignar_tickets')
+
+    def _pasada(self, admin_id, options):
+        clase = PlanificadorOptimo if options['optimo'] else PlanificadorAsignacion
+        planificador = clase(options['maximo'], options['limite'])
+        resultado = planificador.ejecutar(admin_id, simular=options['simular'])
+
+        for a in resultado['asignaciones']:
+            self.stdout.write(
+                f"Ticket #{a['id_ticket']} (prioridad {a['prioridad_id']}) -> "
+                f"{a['tecnico']} [competencia {a['competencia']}, carga {a['carga_resultante']}]"
+            )
+        for error in resultado['errores']:
+            self.stdout.write(self.style.WARNING(f"Ticket #{error['id_ticket']}: {error['error']}"))
+
+        resumen = (
+            f"Planificados: {len(resultado['asignaciones'])}, "
+            f"asignados: {len(resultado['actualizados'])}, "
+            f"sin técnico disponible: {len(resultado['sin_tecnico'])}"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'[simulación] {resumen}' if options['simular'] else resumen
+        ))
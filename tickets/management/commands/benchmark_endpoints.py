@@ -0,0 +1,210 @@
+"""
+Mide los endpoints de tickets, authentication e ia_service sobre datos
+sintéticos de varios tamaños y guarda los resultados en JSON
+
+Para cada tamaño usa (o genera con generar_datos) la base
+<directorio>/datos_<tamaño>_<semilla>.sqlite3 y llama a cada endpoint con el
+cliente de pruebas de Django: una vez con la caché vacía (frío) y luego
+--repeticiones veces. Registra mediana, p95, mínimo, consultas SQL y tiempo
+en la base. Las escrituras se revierten después de cada llamada, así todas
+las repeticiones ven los mismos datos.
+
+Los resultados quedan en <directorio>/resultados_<commit>_<fecha>.json;
+--comparar muestra la diferencia contra un resultado anterior.
+
+Uso:
+    DB_ENGINE=django.db.backends.sqlite3 DB_NAME=bench.sqlite3 python manage.py benchmark_endpoints
+    ... python manage.py benchmark_endpoints --tamanos 1000 20000 --repeticiones 10
+    ... python manage.py benchmark_endpoints --comparar benchmarks/resultados_<commit>_<fecha>.json
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+from django.utils import timezone
+
+from migo_back.replicas import replica_configurada
+from tickets import prioridades, sinteticos
+from tickets.models import Ticket
+from tickets.sinteticos import ENDPOINTS_EXCLUIDOS
+
+
+# Diferencia de mediana desde la que --comparar marca un endpoint
+UMBRAL_COMPARACION = 0.2
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconocido'
+
+
+class Command(BaseCommand):
+    help = 'Mide los endpoints sobre datos sintéticos de varios tamaños y guarda los resultados en JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tamanos',
+            type=int,
+            nargs='+',
+            default=[1000, 10000, 100000],
+            help='Cantidades de tickets a medir (default: 1000 10000 100000)'
+        )
+        parser.add_argument('--repeticiones', type=int, default=5, help='Llamadas en caliente por endpoint (default: 5)')
+        parser.add_argument(
+            '--limite-segundos',
+            type=float,
+            default=30,
+            help='Si la llamada en frío tarda más, no se repite (default: 30)'
+        )
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla de los datos (default: 1)')
+        parser.add_argument(
+            '--directorio',
+            default=str(Path(settings.BASE_DIR) / 'benchmarks'),
+            help='Directorio de las bases generadas y los resultados (default: benchmarks/)'
+        )
+        parser.add_argument('--regenerar', action='store_true', help='Regenera las bases aunque existan')
+        parser.add_argument('--endpoint', default=None, help='Solo los endpoints cuyo nombre contenga este texto')
+        parser.add_argument('--comparar', default=None, help='Archivo de resultados anterior para comparar')
+
+    def handle(self, *args, **options):
+        conexion = connections['default']
+        if conexion.vendor != 'sqlite':
+            raise CommandError(
+                'benchmark_endpoints solo trabaja sobre SQLite '
+                '(DB_ENGINE=django.db.backends.sqlite3 DB_NAME=<archivo>)'
+            )
+        if replica_configurada():
+            raise CommandError('Ejecute el benchmark sin DB_REPLICA_* configurado')
+
+        directorio = Path(options['directorio'])
+        directorio.mkdir(parents=True, exist_ok=True)
+        nombre_original = conexion.settings_dict['NAME']
+
+        resultados = {
+            'commit': _commit(),
+            'fecha': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'semilla': options['semilla'],
+            'repeticiones': options['repeticiones'],
+            'excluidos': ENDPOINTS_EXCLUIDOS,
+            'tamanos': {},
+        }
+
+        # Sin el log de requests lentos; las consultas se miden aquí
+        with override_settings(INSTRUMENTACION=False):
+            try:
+                for tamano in options['tamanos']:
+                    self._usar_base(directorio / f"datos_{tamano}_{options['semilla']}.sqlite3", tamano, options)
+                    resultados['tamanos'][str(tamano)] = self._medir(options)
+            finally:
+                conexion.close()
+                conexion.settings_dict['NAME'] = nombre_original
+
+        archivo = directorio / f"resultados_{resultados['commit']}_{timezone.now():%Y%m%d_%H%M%S}.json"
+        archivo.write_text(json.dumps(resultados, indent=2, ensure_ascii=False))
+        self.stdout.write(self.style.SUCCESS(f'Resultados guardados en {archivo}'))
+
+        if options['comparar']:
+            self._comparar(json.loads(Path(options['comparar']).read_text()), resultados)
+
+    def _usar_base(self, archivo, tamano, options):
+        """Cambia la conexión default a la base del tamaño, generándola si falta"""
+        conexion = connections['default']
+        conexion.close()
+        conexion.settings_dict['NAME'] = str(archivo)
+        prioridades.invalidar()
+
+        if options['regenerar'] or not os.path.exists(archivo):
+            self.stdout.write(f'Generando {archivo} ...')
+            call_command(
+                'generar_datos',
+                tickets=tamano,
+                semilla=options['semilla'],
+                reemplazar=True,
+                stdout=open(os.devnull, 'w')
+            )
+
+    def _medir(self, options):
+        parametros = sinteticos.parametros_endpoints()
+        endpoints = sinteticos.endpoints(parametros)
+
+        faltantes = sinteticos.urls_endpoints() - {e[0] for e in endpoints} - set(ENDPOINTS_EXCLUIDOS)
+        for nombre in sorted(faltantes):
+            self.stdout.write(self.style.WARNING(f'Sin medir (agregar a sinteticos.endpoints o ENDPOINTS_EXCLUIDOS): {nombre}'))
+
+        tamano = Ticket.objects.count()
+        self.stdout.write(self.style.MIGRATE_HEADING(f'{tamano} tickets'))
+
+        medidos = {}
+        for nombre, metodo, ruta, datos, usuario in endpoints:
+            if options['endpoint'] and options['endpoint'] not in nombre:
+                continue
+
+            cache.clear()
+            frio = self._llamar(metodo, ruta, datos, usuario)
+            repeticiones = options['repeticiones'] if frio[0] < options['limite_segundos'] * 1000 else 0
+            llamadas = [self._llamar(metodo, ruta, datos, usuario) for _ in range(repeticiones)]
+            tiempos = sorted(ms for ms, _, _, _ in llamadas) or [frio[0]]
+            _, estado, consultas, db_ms = llamadas[-1] if llamadas else frio
+
+            medidos[nombre] = {
+                'metodo': metodo,
+                'ruta': ruta,
+                'repeticiones': len(llamadas),
+                'estado': estado,
+                'frio_ms': round(frio[0], 2),
+                'mediana_ms': round(statistics.median(tiempos), 2),
+                'p95_ms': round(tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.95))], 2),
+                'min_ms': round(tiempos[0], 2),
+                'consultas_frio': frio[2],
+                'consultas': consultas,
+                'db_ms': round(db_ms, 2),
+            }
+            self.stdout.write(
+                f"  {nombre:<45} {estado}  {medidos[nombre]['mediana_ms']:>9.2f} ms  {consultas:>4} consultas"
+            )
+
+        return {'tickets': tamano, 'endpoints': medidos}
+
+    def _llamar(self, metodo, ruta, datos, usuario):
+        """Una llamada; retorna (ms, estado, consultas, ms en la base)"""
+        respuesta, medicion, ms = sinteticos.llamar_endpoint(metodo, ruta, datos, usuario)
+        return ms, respuesta.status_code, medicion.consultas, medicion.segundos * 1000
+
+    def _comparar(self, anterior, actual):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Comparación con {anterior['commit']} ({anterior['fecha']})"))
+
+        for tamano, medicion in actual['tamanos'].items():
+            previos = anterior['tamanos'].get(tamano, {}).get('endpoints', {})
+            for nombre, datos in medicion['endpoints'].items():
+                previo = previos.get(nombre)
+                if not previo or not previo['mediana_ms']:
+                    continue
+
+                cambio = datos['mediana_ms'] / previo['mediana_ms'] - 1
+                linea = (
+                    f"  {tamano:>7} {nombre:<45} {previo['mediana_ms']:>9.2f} -> {datos['mediana_ms']:>9.2f} ms "
+                    f"({cambio:+.0%})  {previo['consultas']} -> {datos['consultas']} consultas"
+                )
+                if cambio > UMBRAL_COMPARACION or datos['consultas'] > previo['consultas']:
+                    self.stdout.write(self.style.WARNING(linea))
+                elif cambio < -UMBRAL_COMPARACION or datos['consultas'] < previo['consultas']:
+                    self.stdout.write(self.style.SUCCESS(linea))
+                else:
+                    self.stdout.write(linea)
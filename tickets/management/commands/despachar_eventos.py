@@ -0,0 +1,66 @@
+"""
+Entrega los eventos pendientes del outbox a los consumidores
+
+Al confirmar la transacción que los publica se entrega un lote sin esperar
+a otros despachos; este comando entrega el resto y retoma los que quedaron
+pendientes (proceso caído, consumidor con error, checkpoint bloqueado).
+Con --intervalo debe estar siempre corriendo.
+
+Uso:
+    python manage.py despachar_eventos                    (una vez, p. ej. desde cron)
+    python manage.py despachar_eventos --intervalo 10     (worker, cada 10 segundos)
+    python manage.py despachar_eventos --purgar-dias 30   (además elimina eventos ya procesados)
+"""
+from django.core.management.base import BaseCommand
+
+from migo_back.trabajos import repetir
+from tickets import eventos
+
+
+class Command(BaseCommand):
+    help = 'Entrega los eventos pendientes del outbox a los consumidores registrados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--consumidor',
+            action='append',
+            default=None,
+            help='Nombre del consumidor (se puede repetir; default: todos)'
+        )
+        parser.add_argument(
+            '--intervalo',
+            type=int,
+            default=None,
+            help='Segundos entre pasadas (sin este parámetro se ejecuta una vez)'
+        )
+        parser.add_argument(
+            '--purgar-dias',
+            type=int,
+            default=None,
+            help='Elimina los eventos procesados por todos con más de estos días'
+        )
+
+    def handle(self, *args, **options):
+        if not options['intervalo']:
+            procesados = self._pasada(options)
+            self.stdout.write(self.style.SUCCESS(f'Eventos entregados: {sum(procesados.values())}'))
+            return
+
+        repetir(lambda: self._pasada(options), options['intervalo'], 'despachar_eventos')
+
+    def _pasada(self, options):
+        tardios = eventos.revisar_huecos()
+        if tardios:
+            self.stdout.write(self.style.WARNING(f'Eventos confirmados tarde (consumidores reparados): {tardios}'))
+
+        procesados = eventos.despachar(options['consumidor'])
+        for nombre, cantidad in procesados.items():
+            if cantidad:
+                self.stdout.write(f'{nombre}: {cantidad} eventos')
+
+        if options['purgar_dias']:
+            eliminados = eventos.purgar(options['purgar_dias'])
+            if eliminados:
+                self.stdout.write(f'Eventos purgados: {eliminados}')
+
+        return procesados
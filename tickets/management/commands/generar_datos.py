@@ -0,0 +1,75 @@
+"""
+Genera una base SQLite con datos sintéticos (ver tickets/sinteticos.py)
+
+Crea el esquema completo, incluidas las tablas de los modelos managed = False,
+lo llena con un conjunto reproducible y reconstruye las estructuras derivadas
+(contadores, métricas IA, resumen horario, insights). Solo trabaja sobre
+SQLite: nunca escribe en la base MySQL.
+
+Uso:
+    DB_ENGINE=django.db.backends.sqlite3 DB_NAME=datos.sqlite3 python manage.py generar_datos
+    ... python manage.py generar_datos --tickets 20000 --semilla 7 --reemplazar
+"""
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from tickets import sinteticos
+from tickets.models import Ticket
+
+
+class Command(BaseCommand):
+    help = 'Crea el esquema en SQLite y genera un conjunto de datos sintético'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tickets', type=int, default=200000, help='Cantidad de tickets (default: 200000)')
+        parser.add_argument('--tecnicos', type=int, default=40, help='Cantidad de técnicos (default: 40)')
+        parser.add_argument('--trabajadores', type=int, default=400, help='Cantidad de trabajadores (default: 400)')
+        parser.add_argument('--dias', type=int, default=365, help='Días de historia (default: 365)')
+        parser.add_argument('--semilla', type=int, default=1, help='Semilla del generador (default: 1)')
+        parser.add_argument(
+            '--reemplazar',
+            action='store_true',
+            help='Elimina el archivo de la base antes de generar'
+        )
+
+    def handle(self, *args, **options):
+        conexion = connections['default']
+        if conexion.vendor != 'sqlite':
+            raise CommandError(
+                'generar_datos solo trabaja sobre SQLite '
+                '(DB_ENGINE=django.db.backends.sqlite3 DB_NAME=<archivo>)'
+            )
+
+        archivo = str(conexion.settings_dict['NAME'])
+        if options['reemplazar'] and os.path.exists(archivo):
+            conexion.close()
+            os.remove(archivo)
+
+        creadas = sinteticos.crear_esquema()
+        if creadas:
+            self.stdout.write(f'Tablas creadas: {len(creadas)}')
+
+        if Ticket.objects.exists():
+            raise CommandError(f'{archivo} ya tiene tickets; use --reemplazar para regenerarla')
+
+        inicio = time.monotonic()
+        generador = sinteticos.GeneradorDatos(
+            tickets=options['tickets'],
+            tecnicos=options['tecnicos'],
+            trabajadores=options['trabajadores'],
+            dias=options['dias'],
+            semilla=options['semilla']
+        )
+        conteos = generador.generar(
+            progreso=lambda total: self.stdout.write(f'  {total} / {options["tickets"]} tickets')
+        )
+        derivados = sinteticos.reconstruir_derivados()
+
+        for nombre, cantidad in {**conteos, **derivados}.items():
+            self.stdout.write(f'{nombre}: {cantidad}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Datos generados en {archivo} ({time.monotonic() - inicio:.1f} s)'
+        ))
@@ -0,0 +1,72 @@
+"""
+Compara los índices declarados en tickets/indices.py con el esquema real
+
+Sin opciones solo informa el estado de cada índice. --crear crea los que
+faltan (en MySQL con ALGORITHM=INPLACE LOCK=NONE, sin bloquear escrituras) y
+--explicar ejecuta EXPLAIN sobre las consultas frecuentes y avisa si alguna no
+usa su índice. Con --sql solo muestra los CREATE INDEX, para aplicarlos a mano.
+
+Uso:
+    python manage.py gestionar_indices
+    python manage.py gestionar_indices --explicar
+    python manage.py gestionar_indices --crear --explicar
+    python manage.py gestionar_indices --sql
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from tickets import indices
+
+
+class Command(BaseCommand):
+    help = 'Revisa, crea y verifica con EXPLAIN los índices compuestos de las consultas frecuentes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--crear', action='store_true', help='Crea los índices que faltan')
+        parser.add_argument('--explicar', action='store_true', help='Ejecuta EXPLAIN sobre las consultas frecuentes')
+        parser.add_argument('--sql', action='store_true', help='Solo muestra el SQL de los índices que faltan')
+        parser.add_argument('--database', default='default', help='Alias de la base (default: default)')
+
+    def handle(self, *args, **options):
+        using = options['database']
+        if options['crear'] and using != 'default':
+            raise CommandError('Los índices se crean en la base principal; las réplicas los reciben por replicación')
+
+        faltantes = []
+        for indice in indices.revisar(using):
+            columnas = ', '.join(indice['columnas'])
+            linea = f"  {indice['tabla']:<18} {indice['nombre']:<34} ({columnas})"
+            if indice['estado'] == 'existe':
+                self.stdout.write(f'{linea}  existe')
+            elif indice['estado'] == 'cubierto':
+                self.stdout.write(f"{linea}  cubierto por {indice['indice']}")
+            elif indice['estado'] == 'sin_tabla':
+                self.stdout.write(self.style.ERROR(f'{linea}  la tabla no existe'))
+            else:
+                self.stdout.write(self.style.WARNING(f'{linea}  falta'))
+                faltantes.append(indice)
+
+        if options['sql']:
+            for indice in faltantes:
+                self.stdout.write(indices.sql_crear(indice['tabla'], indice['nombre'], indice['columnas'], using) + ';')
+        elif options['crear']:
+            for indice in faltantes:
+                indices.crear(indice['tabla'], indice['nombre'], indice['columnas'], using)
+                self.stdout.write(self.style.SUCCESS(f"Creado {indice['nombre']}"))
+        elif faltantes:
+            self.stdout.write(f'Faltan {len(faltantes)} índices; use --crear o --sql')
+
+        if options['explicar']:
+            self._explicar(using, options['verbosity'])
+
+    def _explicar(self, using, verbosidad):
+        self.stdout.write(self.style.MIGRATE_HEADING('EXPLAIN de las consultas frecuentes'))
+        for consulta in indices.explicar(using):
+            if consulta['usa_indice']:
+                self.stdout.write(f"  {consulta['descripcion']:<42} usa {consulta['indice']}")
+            else:
+                self.stdout.write(self.style.WARNING(
+                    f"  {consulta['descripcion']:<42} NO usa {consulta['indice']}"
+                ))
+            if verbosidad > 1 or not consulta['usa_indice']:
+                for linea in consulta['plan'].splitlines():
+                    self.stdout.write(f'      {linea}')
@@ -0,0 +1,28 @@
+"""
+Reconstruye contador_tecnico desde los tickets
+
+Uso:
+    python manage.py reconstruir_contadores
+    python manage.py reconstruir_contadores --tecnico 5
+"""
+from django.core.management.base import BaseCommand
+
+from tickets import contadores
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye los contadores de tickets activos por técnico'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--tecnico',
+            type=int,
+            action='append',
+            default=None,
+            help='Id del técnico a reconstruir (se puede repetir; default: todos)'
+        )
+
+    def handle(self, *args, **options):
+        total = contadores.reconstruir(options['tecnico'])
+
+        self.stdout.write(self.style.SUCCESS(f'Contadores reconstruidos: {total} técnicos'))
@@ -130,6 +130,9 @@ class Ticket(models.Model):
         default=False,
         help_text='False=Automática, True=Manual (no recalcular)'
     )
+    
+    # Control de concurrencia optimista: aumenta con cada actualización
+    version = models.IntegerField(default=0)
 
     class Meta:
         managed = False
@@ -278,4 +281,88 @@ class Reclamo(models.Model):
         ordering = ['-fecha_creacion']
     
     def __str__(self):
-        return f"Reclamo #{self.id_reclamo} - Ticket #{self.ticket_id.id_ticket}"
\ No newline at end of file
+        return f"Reclamo #{self.id_reclamo} - Ticket #{self.ticket_id.id_ticket}"
+
+class ContadorTecnico(models.Model):
+    """
+    Contadores de tickets activos por técnico, mantenidos con los eventos
+    'ticket' del outbox (tickets/eventos.py). version aumenta con cada cambio.
+    """
+    tecnico = models.OneToOneField(
+        Usuarios,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        db_column='tecnico_id',
+        related_name='contador_tickets'
+    )
+    abiertos = models.IntegerField(default=0)
+    en_proceso = models.IntegerField(default=0)
+    activos_baja = models.IntegerField(default=0)
+    activos_media = models.IntegerField(default=0)
+    activos_alta = models.IntegerField(default=0)
+    activos_urgente = models.IntegerField(default=0)
+    version = models.BigIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = True  # Django manejará esta tabla
+        db_table = 'contador_tecnico'
+
+    @property
+    def activos(self):
+        return self.abiertos + self.en_proceso
+
+    def __str__(self):
+        return f"Contador técnico {self.tecnico_id} (v{self.version})"
+
+
+class EventoDominio(models.Model):
+    """
+    Outbox de eventos de tickets, calificaciones y reclamos. Cada evento se
+    escribe en la misma transacción que el cambio que lo origina y los
+    consumidores registrados en tickets/eventos.py lo procesan en orden.
+    """
+    id_evento = models.BigAutoField(primary_key=True)
+    tipo = models.CharField(max_length=30)
+    datos = models.TextField()  # JSON
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = True  # Django manejará esta tabla
+        db_table = 'eventos_dominio'
+        verbose_name = 'Evento de dominio'
+        verbose_name_plural = 'Eventos de dominio'
+
+    def __str__(self):
+        return f"Evento #{self.id_evento} {self.tipo}"
+
+
+class CheckpointConsumidor(models.Model):
+    """Último evento del outbox procesado por cada consumidor"""
+    consumidor = models.CharField(max_length=60, primary_key=True)
+    ultimo_evento = models.BigIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        managed = True  # Django manejará esta tabla
+        db_table = 'eventos_checkpoint'
+
+    def __str__(self):
+        return f"{self.consumidor} -> #{self.ultimo_evento}"
+
+
+class HuecoEvento(models.Model):
+    """
+    Id del outbox que el despacho dejó atrás sin evento (transacción abierta
+    o revertida). Si el evento se confirma después, se repara a los
+    consumidores que ya lo pasaron (ver tickets/eventos.py).
+    """
+    id_evento = models.BigIntegerField(primary_key=True)
+    fecha_registro = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        managed = True  # Django manejará esta tabla
+        db_table = 'eventos_huecos'
+
+    def __str__(self):
+        return f"Hueco #{self.id_evento}"
@@ -0,0 +1,98 @@
+"""
+Reglas de prioridad automática de tickets
+
+La prioridad depende del puntaje peso_prioridad (cargo del solicitante) x
+multiplicador_prioridad (categoría). Todas las combinaciones se precalculan
+en una matriz en memoria que se recarga cuando cambia alguno de los dos
+catálogos (ver signals.py) o, como respaldo, cada RECARGA_SEGUNDOS.
+"""
+import threading
+import time
+
+import numpy as np
+
+from authentication.models import Cargos
+from .models import CategoriaTicket
+
+
+# Puntaje mínimo para Media (2), Alta (3) y Urgente (4); por debajo, Baja (1)
+UMBRALES_PRIORIDAD = [2.0, 4.0, 6.0]
+
+# Recarga periódica: cubre cambios hechos por otros procesos o directo en la BD
+RECARGA_SEGUNDOS = 300
+
+
+def prioridad_para_puntaje(puntaje):
+    """Prioridad (1-4) para un puntaje o un arreglo de puntajes"""
+    return np.searchsorted(UMBRALES_PRIORIDAD, puntaje, side='right') + 1
+
+
+class MatrizPrioridades:
+    """Puntajes y prioridades de todas las combinaciones cargo x categoría"""
+
+    def __init__(self):
+        cargos = list(Cargos.objects.order_by().values_list('id_cargos', 'peso_prioridad'))
+        categorias = list(CategoriaTicket.objects.order_by().values_list(
+            'id_categoria_ticket', 'multiplicador_prioridad'
+        ))
+
+        self.indice_cargo = {cargo_id: i for i, (cargo_id, _) in enumerate(cargos)}
+        self.indice_categoria = {categoria_id: j for j, (categoria_id, _) in enumerate(categorias)}
+        self.pesos = np.array([float(peso) for _, peso in cargos])
+        self.multiplicadores = np.array([float(m) for _, m in categorias])
+
+        self.puntajes = np.outer(self.pesos, self.multiplicadores)
+        self.prioridades = prioridad_para_puntaje(self.puntajes)
+        self.cargada_en = time.monotonic()
+
+    def contiene(self, cargo_ids=(), categoria_ids=()) -> bool:
+        return (
+            all(c in self.indice_cargo for c in cargo_ids)
+            and all(c in self.indice_categoria for c in categoria_ids)
+        )
+
+    def calcular(self, cargo_id, categoria_id) -> dict:
+        """Prioridad de una combinación con el detalle del cálculo"""
+        i = self.indice_cargo[cargo_id]
+        j = self.indice_categoria[categoria_id]
+        return {
+            'prioridad_id': int(self.prioridades[i, j]),
+            'puntaje': float(self.puntajes[i, j]),
+            'peso_cargo': float(self.pesos[i]),
+            'multiplicador_categoria': float(self.multiplicadores[j])
+        }
+
+    def prioridad(self, cargo_id, categoria_id) -> int:
+        return int(self.prioridades[self.indice_cargo[cargo_id], self.indice_categoria[categoria_id]])
+
+    def prioridades_para(self, cargo_ids, categoria_ids):
+        """Prioridades de varias combinaciones (ids conocidos) en una pasada"""
+        filas = np.array([self.indice_cargo[c] for c in cargo_ids], dtype=np.int64)
+        columnas = np.array([self.indice_categoria[c] for c in categoria_ids], dtype=np.int64)
+        return self.prioridades[filas, columnas]
+
+
+_matriz = None
+_bloqueo = threading.Lock()
+
+
+def obtener_matriz(cargo_ids=(), categoria_ids=()) -> MatrizPrioridades:
+    """
+    Matriz vigente. Si no contiene alguno de los cargos o categorías
+    indicados se recarga una vez (pudieron crearse en otro proceso).
+    """
+    global _matriz
+
+    with _bloqueo:
+        vencida = _matriz is None or time.monotonic() - _matriz.cargada_en > RECARGA_SEGUNDOS
+        if vencida or not _matriz.contiene(cargo_ids, categoria_ids):
+            _matriz = MatrizPrioridades()
+        return _matriz
+
+
+def invalidar():
+    """Descarta la matriz; la próxima consulta la recarga"""
+    global _matriz
+
+    with _bloqueo:
+        _matriz = None
@@ -77,7 +77,8 @@ class TicketListSerializer(serializers.ModelSerializer):
             'prioridad_color',
             'prioridad_nivel',
             'usuario_creador',
-            'tecnico_asignado'
+            'tecnico_asignado',
+            'version'
         ]
     
     def get_usuario_creador(self, obj):
@@ -127,7 +128,7 @@ class TicketDetailSerializer(serializers.ModelSerializer):
             'estado', 'estado_id_value', 'estado_color',
             'prioridad', 'prioridad_id_value', 'prioridad_color', 'prioridad_nivel',
             'usuario_creador', 'tecnico_asignado', 'prioridad_manual',
-            'calificacion_ticket'
+            'calificacion_ticket', 'version'
         ]
     
     def get_usuario_creador(self, obj):
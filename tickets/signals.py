@@ -0,0 +1,145 @@
+"""
+Señales del sistema de tickets
+"""
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+from django.utils.dateparse import parse_datetime
+
+from authentication.models import Cargos
+from . import contadores, eventos, prioridades
+from .models import CategoriaTicket
+
+
+# Foto de los campos de un ticket que afectan a métricas y contadores derivados
+FotoTicket = namedtuple('FotoTicket', [
+    'id_ticket',
+    'tecnico_id',
+    'categoria_id',
+    'estado_id',
+    'prioridad_id',
+    'fecha_asignacion',
+    'fecha_resolucion'
+])
+
+
+def foto_ticket(ticket):
+    """Toma la foto de un ticket sin hacer consultas"""
+    return FotoTicket(
+        id_ticket=ticket.id_ticket,
+        tecnico_id=ticket.tecnico_asignado_id_id,
+        categoria_id=ticket.categoria_id_id,
+        estado_id=ticket.estado_id_id,
+        prioridad_id=ticket.prioridad_id_id,
+        fecha_asignacion=ticket.fecha_asignacion,
+        fecha_resolucion=ticket.fecha_resolucion
+    )
+
+
+# Se envía después de guardar cambios en uno o más tickets, dentro de la
+# transacción del cambio. cambios: lista de (antes, despues) con FotoTicket;
+# antes es None para un ticket creado y despues es None para uno eliminado.
+# El único receptor los registra en el outbox (eventos.py); las estructuras
+# derivadas se actualizan como consumidores de los eventos 'ticket'.
+tickets_cambiados = Signal()
+
+
+@receiver(tickets_cambiados)
+def publicar_cambios_tickets(sender, cambios, **kwargs):
+    """Registra los cambios efectivos como eventos 'ticket' del outbox"""
+    datos = [
+        {
+            'antes': antes._asdict() if antes else None,
+            'despues': despues._asdict() if despues else None
+        }
+        for antes, despues in cambios
+        if antes != despues
+    ]
+    if datos:
+        eventos.publicar('ticket', datos)
+
+
+def _foto_desde_json(datos):
+    if datos is None:
+        return None
+    return FotoTicket(**{
+        **datos,
+        'fecha_asignacion': parse_datetime(datos['fecha_asignacion']) if datos['fecha_asignacion'] else None,
+        'fecha_resolucion': parse_datetime(datos['fecha_resolucion']) if datos['fecha_resolucion'] else None
+    })
+
+
+def cambios_tickets(lote):
+    """Pares (antes, despues) de FotoTicket de una lista de eventos 'ticket'"""
+    return [
+        (_foto_desde_json(e.contenido['antes']), _foto_desde_json(e.contenido['despues']))
+        for e in lote
+        if e.tipo == 'ticket'
+    ]
+
+
+def _tecnicos_afectados(lote):
+    """Técnicos involucrados en eventos de tickets, calificaciones o reclamos"""
+    tecnicos = set()
+    for evento in lote:
+        if evento.tipo == 'ticket':
+            fotos = (evento.contenido['antes'], evento.contenido['despues'])
+            tecnicos.update(f['tecnico_id'] for f in fotos if f)
+        else:
+            tecnicos.add(evento.contenido.get('tecnico_id'))
+    tecnicos.discard(None)
+    return tecnicos
+
+
+# Las invalidaciones solo llegan a otros procesos con caché compartida (ver
+# la sección Caché del README)
+
+# Clave de caché de las estadísticas de un técnico (tecnico_estadisticas)
+CLAVE_ESTADISTICAS_TECNICO = 'tecnico_estadisticas:{}'
+
+
+@eventos.consumidor('estadisticas_tecnico', tipos=['ticket', 'calificacion'])
+def invalidar_estadisticas_tecnico(lote):
+    """Descarta las estadísticas cacheadas de los técnicos afectados"""
+    cache.delete_many([CLAVE_ESTADISTICAS_TECNICO.format(t) for t in _tecnicos_afectados(lote)])
+
+
+# Clave de caché de estadisticas_reclamos (incluye tickets cerrados por técnico)
+CLAVE_ESTADISTICAS_RECLAMOS = 'estadisticas_reclamos'
+
+
+@eventos.consumidor('estadisticas_reclamos', tipos=['ticket', 'reclamo'])
+def invalidar_estadisticas_reclamos(lote):
+    """
+    Descarta las estadísticas de reclamos si cambió un reclamo, un ticket
+    cerrado o se eliminó un ticket (sus reclamos se eliminan en cascada)
+    """
+    if any(e.tipo == 'reclamo' for e in lote):
+        cache.delete(CLAVE_ESTADISTICAS_RECLAMOS)
+        return
+
+    for antes, despues in cambios_tickets(lote):
+        estados = {foto.estado_id for foto in (antes, despues) if foto is not None}
+        if despues is None or 4 in estados:
+            cache.delete(CLAVE_ESTADISTICAS_RECLAMOS)
+            return
+
+
+def reconstruir_contadores_afectados(lote):
+    """Recalcula desde los tickets los contadores de los técnicos del lote"""
+    contadores.reconstruir(list(_tecnicos_afectados(lote)))
+
+
+@eventos.consumidor('contadores_tecnico', tipos=['ticket'], reparar=reconstruir_contadores_afectados)
+def actualizar_contadores_tecnico(lote):
+    """Mantiene contador_tecnico y avisa a las conexiones en espera"""
+    contadores.aplicar_cambios(cambios_tickets(lote))
+
+
+@receiver([post_save, post_delete], sender=Cargos)
+@receiver([post_save, post_delete], sender=CategoriaTicket)
+def recargar_matriz_prioridades(sender, **kwargs):
+    """Un cambio en cargos o categorías invalida la matriz de prioridades"""
+    prioridades.invalidar()
@@ -0,0 +1,623 @@
+"""
+Datos sintéticos para pruebas de carga y benchmarks
+
+crear_esquema() crea en la base indicada todas las tablas del proyecto,
+incluidas las de los modelos managed = False (en producción ya existen en la
+base MySQL). GeneradorDatos llena esa base con un conjunto reproducible (la
+misma semilla genera los mismos datos) con la forma de los datos reales:
+tickets concentrados en horario laboral, técnicos con especialidades,
+tiempos de resolución según prioridad, historial, calificaciones, reclamos,
+feedback y consultas a la IA.
+
+Ver los comandos generar_datos y benchmark_endpoints.
+"""
+import json
+import math
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import connections, transaction
+from django.db.models import Count, Q
+from django.test import Client
+from django.urls import get_resolver
+from django.utils import timezone
+
+from authentication.models import Cargos, Personas, Roles, Usuarios
+from migo_back.instrumentacion import MedicionConsultas
+from ia_service.models import IAConfiguracion, IAConsultasLog, IAFeedback
+from .models import (
+    CalificacionTicket,
+    CategoriaTicket,
+    EstadoTicket,
+    HistorialTicket,
+    PrioridadTicket,
+    Reclamo,
+    Ticket,
+)
+
+
+TAMANO_LOTE = 5000
+
+ROLES = [(1, 'Técnico'), (2, 'Trabajador'), (3, 'Administrador')]
+
+# (nombre, peso_prioridad)
+CARGOS = [('Gerente', 4), ('Jefatura', 3), ('Analista', 2), ('Operario', 1)]
+
+# (nombre, multiplicador_prioridad, proporción de tickets)
+CATEGORIAS = [
+    ('Hardware', 1.5, 25),
+    ('Software', 1.0, 30),
+    ('Red', 2.0, 15),
+    ('Accesos', 1.2, 12),
+    ('Impresoras', 0.8, 10),
+    ('Correo', 1.0, 8),
+]
+
+ESTADOS = [
+    ('Abierto', '#3B82F6'),
+    ('En Proceso', '#F59E0B'),
+    ('Resuelto', '#10B981'),
+    ('Cerrado', '#6B7280'),
+    ('Cancelado', '#EF4444'),
+]
+
+# (nombre, color, proporción de tickets, horas promedio de resolución)
+PRIORIDADES = [
+    ('Baja', '#10B981', 30, 48),
+    ('Media', '#F59E0B', 40, 24),
+    ('Alta', '#F97316', 20, 8),
+    ('Urgente', '#EF4444', 10, 3),
+]
+
+CONFIGURACION_IA = [
+    ('activo', '0', 'Servicio de IA desactivado en los datos sintéticos'),
+    ('modelo_openai', 'gpt-4o-mini', 'Modelo de OpenAI'),
+    ('limite_diario', '50', 'Consultas diarias por usuario'),
+]
+
+# Peso de cada hora del día en la creación de tickets
+PESO_HORA = [1, 1, 1, 1, 1, 2, 4, 10, 16, 18, 17, 14, 10, 14, 16, 15, 12, 8, 5, 3, 2, 2, 1, 1]
+
+NOMBRES = ['Ana', 'Carlos', 'Daniela', 'Felipe', 'Javiera', 'José', 'María', 'Matías', 'Valentina', 'Tomás']
+APELLIDOS = ['González', 'Muñoz', 'Rojas', 'Díaz', 'Pérez', 'Soto', 'Contreras', 'Silva', 'Martínez', 'Sepúlveda']
+
+PROBABILIDAD_CANCELACION = 0.05
+PROBABILIDAD_ESPECIALISTA = 0.75
+
+# Backlog: parte de los tickets de los últimos días sigue abierta o en proceso
+DIAS_PENDIENTES = 14
+PROBABILIDAD_SIN_ASIGNAR = 0.4
+PROBABILIDAD_EN_PROCESO = 0.3
+
+
+def crear_esquema(alias='default'):
+    """
+    Crea las tablas que falten: las de Django con migrate y las de los
+    modelos del proyecto (managed o no) con el schema editor. Retorna las
+    tablas creadas por el schema editor.
+    """
+    call_command('migrate', run_syncdb=True, database=alias, verbosity=0)
+
+    conexion = connections[alias]
+    existentes = set(conexion.introspection.table_names())
+    creadas = []
+
+    with conexion.schema_editor() as editor:
+        for modelo in apps.get_models():
+            tabla = modelo._meta.db_table
+            if modelo._meta.proxy or tabla in existentes:
+                continue
+            editor.create_model(modelo)
+            existentes.add(tabla)
+            creadas.append(tabla)
+
+    return creadas
+
+
+@contextmanager
+def _fechas_explicitas(*modelos):
+    """Desactiva auto_now / auto_now_add para guardar fechas históricas"""
+    campos = [
+        (campo, campo.auto_now, campo.auto_now_add)
+        for modelo in modelos
+        for campo in modelo._meta.concrete_fields
+        if getattr(campo, 'auto_now', False) or getattr(campo, 'auto_now_add', False)
+    ]
+    for campo, _, _ in campos:
+        campo.auto_now = campo.auto_now_add = False
+    try:
+        yield
+    finally:
+        for campo, auto_now, auto_now_add in campos:
+            campo.auto_now, campo.auto_now_add = auto_now, auto_now_add
+
+
+class GeneradorDatos:
+    """
+    Genera catálogos, usuarios y tickets con todo lo que cuelga de ellos.
+    Los tickets se insertan en lotes de TAMANO_LOTE con ids consecutivos.
+    """
+
+    def __init__(self, tickets, tecnicos=40, trabajadores=400, dias=365, semilla=1):
+        self.total_tickets = tickets
+        self.total_tecnicos = tecnicos
+        self.total_trabajadores = trabajadores
+        self.dias = dias
+        self.azar = random.Random(semilla)
+        self.ahora = timezone.localtime(timezone.now())
+
+        self.conteos = dict.fromkeys(
+            ['usuarios', 'tickets', 'historial', 'calificaciones', 'reclamos', 'feedback_ia', 'consultas_ia'],
+            0
+        )
+        self._horas = list(range(24))
+        self._peso_horas = list(accumulate(PESO_HORA))
+        self._categorias = list(range(1, len(CATEGORIAS) + 1))
+        self._peso_categorias = list(accumulate(c[2] for c in CATEGORIAS))
+        self._prioridades = list(range(1, len(PRIORIDADES) + 1))
+        self._peso_prioridades = list(accumulate(p[2] for p in PRIORIDADES))
+
+    def generar(self, progreso=None) -> dict:
+        """Inserta todo en una transacción; progreso(n) recibe los tickets generados"""
+        modelos = (Ticket, HistorialTicket, CalificacionTicket, Reclamo, IAFeedback, IAConsultasLog)
+        with transaction.atomic(), _fechas_explicitas(*modelos):
+            self._catalogos()
+            self._usuarios()
+            self.agregar_tickets(self.total_tickets, progreso)
+            self._reclamo_pendiente()
+
+        return self.conteos
+
+    def agregar_tickets(self, cantidad, progreso=None):
+        """Agrega tickets (con ids a continuación de los ya generados) a la misma base"""
+        modelos = (Ticket, HistorialTicket, CalificacionTicket, Reclamo, IAFeedback, IAConsultasLog)
+        with transaction.atomic(), _fechas_explicitas(*modelos):
+            for inicio in range(0, cantidad, TAMANO_LOTE):
+                self._lote(self.conteos['tickets'] + 1, min(TAMANO_LOTE, cantidad - inicio))
+                if progreso:
+                    progreso(self.conteos['tickets'])
+
+        return self.conteos
+
+    def _catalogos(self):
+        Roles.objects.bulk_create([Roles(id_roles=i, nombre_rol=nombre) for i, nombre in ROLES])
+        Cargos.objects.bulk_create([
+            Cargos(id_cargos=i, nombre_cargo=nombre, peso_prioridad=peso)
+            for i, (nombre, peso) in enumerate(CARGOS, 1)
+        ])
+        CategoriaTicket.objects.bulk_create([
+            CategoriaTicket(id_categoria_ticket=i, nombre_categoria=nombre, multiplicador_prioridad=multiplicador)
+            for i, (nombre, multiplicador, _) in enumerate(CATEGORIAS, 1)
+        ])
+        EstadoTicket.objects.bulk_create([
+            EstadoTicket(id_estado_ticket=i, nombre_estado=nombre, color=color)
+            for i, (nombre, color) in enumerate(ESTADOS, 1)
+        ])
+        PrioridadTicket.objects.bulk_create([
+            PrioridadTicket(id_prioridad_ticket=i, nombre_prioridad=nombre, nivel=i, color=color)
+            for i, (nombre, color, _, _) in enumerate(PRIORIDADES, 1)
+        ])
+        IAConfiguracion.objects.bulk_create([
+            IAConfiguracion(clave=clave, valor=valor, descripcion=descripcion)
+            for clave, valor, descripcion in CONFIGURACION_IA
+        ])
+
+    def _usuarios(self):
+        """Administradores (ids 1-2), técnicos y trabajadores, en ese orden"""
+        roles = [3, 3] + [1] * self.total_tecnicos + [2] * self.total_trabajadores
+        personas, usuarios = [], []
+
+        for i, rol in enumerate(roles, 1):
+            personas.append(Personas(
+                id_personas=i,
+                run=f'{10000000 + i}-{i % 10}',
+                primer_nombre=self.azar.choice(NOMBRES),
+                primer_apellido=self.azar.choice(APELLIDOS),
+                segundo_apellido=self.azar.choice(APELLIDOS)
+            ))
+            prefijo = {1: 'tecnico', 2: 'usuario', 3: 'admin'}[rol]
+            usuarios.append(Usuarios(
+                id_usuarios=i,
+                correo=f'{prefijo}{i}@migo.cl',
+                contraseña='migo123',
+                personas_id_personas_id=i,
+                roles_id_roles_id=rol,
+                cargos_id_cargos_id=1 if rol == 3 else self.azar.randint(1, len(CARGOS))
+            ))
+
+        Personas.objects.bulk_create(personas)
+        Usuarios.objects.bulk_create(usuarios)
+        self.conteos['usuarios'] = len(usuarios)
+
+        self.administradores = [1, 2]
+        self.tecnicos = [i for i, rol in enumerate(roles, 1) if rol == 1]
+        self.trabajadores = [i for i, rol in enumerate(roles, 1) if rol == 2]
+
+        # Cada técnico domina dos categorías y resuelve a su propio ritmo
+        self.habilidad = {t: self.azar.uniform(0.6, 1.0) for t in self.tecnicos}
+        self.especialistas = {c: [] for c in self._categorias}
+        for tecnico in self.tecnicos:
+            for categoria in self.azar.sample(self._categorias, 2):
+                self.especialistas[categoria].append(tecnico)
+
+    def _fecha_creacion(self):
+        """Más tickets recientes que antiguos, en horario laboral y días hábiles"""
+        while True:
+            dias_atras = int(self.dias * self.azar.random() ** 1.3)
+            dia = self.ahora - timedelta(days=dias_atras)
+            if dia.weekday() < 5 or self.azar.random() < 0.3:
+                break
+        hora = self.azar.choices(self._horas, cum_weights=self._peso_horas)[0]
+        fecha = dia.replace(hour=hora, minute=self.azar.randint(0, 59), second=self.azar.randint(0, 59))
+        return min(fecha, self.ahora - timedelta(minutes=1))
+
+    def _tecnico_para(self, categoria):
+        if self.especialistas[categoria] and self.azar.random() < PROBABILIDAD_ESPECIALISTA:
+            return self.azar.choice(self.especialistas[categoria])
+        return self.azar.choice(self.tecnicos)
+
+    def _lote(self, primer_id, cantidad):
+        tickets, historial, calificaciones, reclamos, feedback, consultas = [], [], [], [], [], []
+        azar = self.azar
+
+        for id_ticket in range(primer_id, primer_id + cantidad):
+            creacion = self._fecha_creacion()
+            categoria = azar.choices(self._categorias, cum_weights=self._peso_categorias)[0]
+            prioridad = azar.choices(self._prioridades, cum_weights=self._peso_prioridades)[0]
+            creador = azar.choice(self.trabajadores)
+            ticket = Ticket(
+                id_ticket=id_ticket,
+                titulo=f'{CATEGORIAS[categoria - 1][0]}: incidencia #{id_ticket}',
+                descripcion=f'Descripción generada para el ticket {id_ticket}',
+                fecha_creacion=creacion,
+                usuario_creador_id_id=creador,
+                categoria_id_id=categoria,
+                prioridad_id_id=prioridad,
+                estado_id_id=1
+            )
+            tickets.append(ticket)
+            historial.append(self._historial(ticket, creador, None, 1, creacion, 'Ticket creado'))
+
+            # Cancelado antes de asignarse
+            if azar.random() < PROBABILIDAD_CANCELACION:
+                cancelacion = min(creacion + timedelta(hours=azar.expovariate(1 / 12)), self.ahora)
+                ticket.estado_id_id = 5
+                historial.append(self._historial(ticket, creador, 1, 5, cancelacion, 'Cancelado por el usuario'))
+                continue
+
+            reciente = (self.ahora - creacion).days < DIAS_PENDIENTES
+            if reciente and azar.random() < PROBABILIDAD_SIN_ASIGNAR:
+                continue
+
+            asignacion = creacion + timedelta(hours=azar.expovariate(1 / 3))
+            if asignacion >= self.ahora:
+                continue
+
+            tecnico = self._tecnico_para(categoria)
+            ticket.tecnico_asignado_id_id = tecnico
+            ticket.fecha_asignacion = asignacion
+            ticket.estado_id_id = 2
+            historial.append(self._historial(ticket, azar.choice(self.administradores), 1, 2, asignacion, 'Técnico asignado'))
+
+            if azar.random() < 0.3:
+                consultas.append(self._consulta(ticket, tecnico, 'guia_solucion', asignacion))
+            if azar.random() < 0.05:
+                consultas.append(self._consulta(ticket, azar.choice(self.administradores), 'recomendar_tecnico', creacion))
+
+            horas_esperadas = PRIORIDADES[prioridad - 1][3] / self.habilidad[tecnico]
+            horas = azar.lognormvariate(math.log(horas_esperadas), 0.8)
+            resolucion = asignacion + timedelta(hours=horas)
+            if resolucion >= self.ahora or (reciente and azar.random() < PROBABILIDAD_EN_PROCESO):
+                continue
+
+            ticket.fecha_resolucion = resolucion
+            ticket.solucion = f'Solución aplicada por el técnico {tecnico}'
+            ticket.estado_id_id = 3
+            historial.append(self._historial(ticket, tecnico, 2, 3, resolucion, 'Ticket resuelto'))
+
+            if azar.random() < 0.15:
+                feedback.append(IAFeedback(
+                    ticket_id=id_ticket,
+                    tecnico_id=tecnico,
+                    fue_util=azar.random() < 0.65,
+                    fecha_feedback=resolucion
+                ))
+
+            cierre = resolucion + timedelta(hours=azar.expovariate(1 / 24))
+            if cierre >= self.ahora or azar.random() < 0.2:
+                continue
+
+            ticket.fecha_cierre = cierre
+            ticket.estado_id_id = 4
+            historial.append(self._historial(ticket, creador, 3, 4, cierre, 'Ticket cerrado'))
+
+            if azar.random() < 0.7:
+                nota = self._calificacion(tecnico, horas, horas_esperadas)
+                calificaciones.append(CalificacionTicket(
+                    ticket_id_id=id_ticket,
+                    usuario_id_id=creador,
+                    calificacion=nota,
+                    fecha_calificacion=cierre
+                ))
+                if nota <= 2 and azar.random() < 0.4:
+                    reclamos.append(self._reclamo(ticket, creador, tecnico, cierre))
+
+        Ticket.objects.bulk_create(tickets)
+        HistorialTicket.objects.bulk_create(historial)
+        CalificacionTicket.objects.bulk_create(calificaciones)
+        Reclamo.objects.bulk_create(reclamos)
+        IAFeedback.objects.bulk_create(feedback)
+        IAConsultasLog.objects.bulk_create(consultas)
+
+        self.conteos['tickets'] += len(tickets)
+        self.conteos['historial'] += len(historial)
+        self.conteos['calificaciones'] += len(calificaciones)
+        self.conteos['reclamos'] += len(reclamos)
+        self.conteos['feedback_ia'] += len(feedback)
+        self.conteos['consultas_ia'] += len(consultas)
+
+    def _reclamo_pendiente(self):
+        """Los conjuntos chicos (pruebas) también tienen un reclamo pendiente"""
+        if Reclamo.objects.filter(estado='pendiente').exists():
+            return
+        ticket = Ticket.objects.filter(estado_id=4).order_by('-fecha_cierre').first()
+        if ticket:
+            self._reclamo(ticket, ticket.usuario_creador_id_id, ticket.tecnico_asignado_id_id, self.ahora).save()
+            self.conteos['reclamos'] += 1
+
+    def _historial(self, ticket, usuario, anterior, nuevo, fecha, comentario):
+        return HistorialTicket(
+            ticket_id_id=ticket.id_ticket,
+            usuario_id_id=usuario,
+            estado_anterior_id_id=anterior,
+            estado_nuevo_id_id=nuevo,
+            comentario=comentario,
+            fecha_cambio=fecha
+        )
+
+    def _calificacion(self, tecnico, horas, horas_esperadas):
+        """Mejor nota a mayor habilidad; peor si tardó más del doble de lo esperado"""
+        nota = 2.5 + 2.5 * (self.habilidad[tecnico] - 0.6) / 0.4 + self.azar.gauss(0, 0.8)
+        if horas > 2 * horas_esperadas:
+            nota -= 1
+        return max(1, min(5, round(nota)))
+
+    def _reclamo(self, ticket, usuario, tecnico, fecha):
+        resuelto = (self.ahora - fecha).days > 7
+        return Reclamo(
+            ticket_id_id=ticket.id_ticket,
+            usuario_id_id=usuario,
+            tecnico_id_id=tecnico,
+            categoria=self.azar.choice(['solucion_ticket', 'comportamiento_tecnico']),
+            descripcion='La solución no resolvió el problema',
+            estado='resuelto' if resuelto else 'pendiente',
+            prioridad=self.azar.choice(['baja', 'media', 'alta']),
+            respuesta_admin='Revisado con el técnico' if resuelto else None,
+            admin_revisor_id_id=self.azar.choice(self.administradores) if resuelto else None,
+            fecha_creacion=fecha,
+            fecha_actualizacion=fecha,
+            fecha_resolucion=fecha + timedelta(days=3) if resuelto else None
+        )
+
+    def _consulta(self, ticket, usuario, tipo, desde):
+        fecha = min(desde + timedelta(minutes=self.azar.randint(1, 90)), self.ahora)
+        error = self.azar.random() < 0.02
+        return IAConsultasLog(
+            ticket_id=ticket.id_ticket,
+            usuario_id=usuario,
+            tipo_consulta=tipo,
+            prompt_enviado=f'Consulta sobre el ticket {ticket.id_ticket}',
+            respuesta_ia='ERROR: tiempo de espera agotado' if error else 'Respuesta generada',
+            tokens_usados=None if error else self.azar.randint(200, 1500),
+            tiempo_respuesta_ms=int(self.azar.lognormvariate(math.log(2500), 0.6)),
+            fecha_consulta=fecha
+        )
+
+
+def reconstruir_derivados() -> dict:
+    """
+    Recalcula lo que en producción mantienen los consumidores de eventos y los
+    workers: contadores por técnico, métricas IA, resumen horario e insights
+    """
+    from ia_service.services import (
+        CalculadorMetricasService,
+        InsightsCapacitacionService,
+        ResumenConsultasService,
+    )
+    from . import contadores
+
+    return {
+        'contadores': contadores.reconstruir(),
+        'metricas_ia': CalculadorMetricasService.actualizar_todas_metricas(),
+        'resumen_ia': ResumenConsultasService.reconstruir(
+            modelo=IAConfiguracion.get_valor('modelo_openai', 'gpt-4o-mini')
+        ),
+        'insights': InsightsCapacitacionService.generar_snapshot().fecha_generacion,
+    }
+
+
+# Catálogo de endpoints (benchmark_endpoints y pruebas de presupuesto de consultas)
+
+# Endpoints que no se miden y por qué
+ENDPOINTS_EXCLUIDOS = {
+    'ia_service:guia_solucion': 'llama a la API de OpenAI',
+    'ia_service:priorizar_ticket': 'llama a la API de OpenAI',
+    'tickets:tecnico-alertas-stream': 'respuesta SSE sin fin',
+}
+
+APPS_ENDPOINTS = ('authentication', 'tickets', 'ia_service')
+
+
+def parametros_endpoints():
+    """Ids representativos del conjunto de datos para armar las llamadas"""
+    # Con tickets urgentes activos, para que las alertas recorran la lista de urgentes
+    tecnico = Ticket.objects.filter(estado_id__in=[1, 2], tecnico_asignado_id__isnull=False).values(
+        'tecnico_asignado_id'
+    ).annotate(
+        urgentes=Count('id_ticket', filter=Q(prioridad_id=4)),
+        total=Count('id_ticket')
+    ).order_by('-urgentes', '-total')[0]['tecnico_asignado_id']
+    trabajador = Ticket.objects.values('usuario_creador_id').annotate(
+        total=Count('id_ticket')
+    ).order_by('-total')[0]['usuario_creador_id']
+
+    return {
+        'admin': 1,
+        'tecnico': tecnico,
+        'trabajador': trabajador,
+        'ticket': Ticket.objects.filter(estado_id=4).order_by('-id_ticket').values_list('id_ticket', flat=True)[0],
+        'abierto': Ticket.objects.filter(estado_id=1).order_by('-id_ticket').values('id_ticket', 'usuario_creador_id')[0],
+        'abiertos': list(Ticket.objects.filter(estado_id=1).order_by('id_ticket').values_list('id_ticket', flat=True)[:100]),
+        'resuelto': Ticket.objects.filter(estado_id=3, calificacion__isnull=True).values(
+            'id_ticket', 'usuario_creador_id'
+        )[0],
+        'calificado': CalificacionTicket.objects.values_list('ticket_id', flat=True)[0],
+        'reclamo': Reclamo.objects.filter(estado='pendiente').values_list('id_reclamo', flat=True)[0],
+    }
+
+
+def endpoints(p):
+    """(nombre de la url, método, ruta, datos, usuario del token) de cada endpoint medido"""
+    abierto, resuelto = p['abierto'], p['resuelto']
+    return [
+        ('authentication:verificar-conexion', 'GET', '/api/auth/verificar/', None, None),
+        ('authentication:login', 'POST', '/api/auth/login/', {'correo': f"admin{p['admin']}@migo.cl", 'contraseña': 'migo123'}, None),
+        ('authentication:logout', 'POST', '/api/auth/logout/', {}, p['admin']),
+        ('authentication:perfil', 'GET', '/api/auth/perfil/', None, p['admin']),
+        ('authentication:listar-usuarios', 'GET', '/api/auth/usuarios/', None, p['admin']),
+        ('authentication:obtener-usuario', 'GET', f"/api/auth/usuarios/{p['tecnico']}/", None, p['admin']),
+        ('authentication:tecnicos-disponibles', 'GET', '/api/auth/tecnicos/disponibles/', None, p['admin']),
+        ('authentication:todos-tecnicos', 'GET', '/api/auth/tecnicos/todos/', None, p['admin']),
+
+        ('tickets:listar-categorias', 'GET', '/api/tickets/categorias/', None, None),
+        ('tickets:listar-estados', 'GET', '/api/tickets/estados/', None, None),
+        ('tickets:listar-prioridades', 'GET', '/api/tickets/prioridades/', None, None),
+        ('tickets:listar-tickets', 'GET', f"/api/tickets/?user_id={p['admin']}", None, None),
+        ('tickets:mis-tickets', 'GET', f"/api/tickets/mis-tickets/?user_id={p['trabajador']}", None, None),
+        ('tickets:tickets-pendientes', 'GET', f"/api/tickets/tickets-pendientes/?user_id={p['trabajador']}", None, None),
+        ('tickets:crear-ticket', 'POST', '/api/tickets/crear/', {
+            'titulo': 'Benchmark', 'descripcion': 'Ticket de benchmark',
+            'categoria_id': 1, 'usuario_creador_id': p['trabajador']
+        }, None),
+        ('tickets:importar-tickets', 'POST', '/api/tickets/importar/', {
+            'admin_id': p['admin'],
+            'tickets': [
+                {'titulo': f'Importado {i}', 'descripcion': 'Ticket importado', 'categoria_id': i % 6 + 1,
+                 'usuario_creador_id': p['trabajador']}
+                for i in range(100)
+            ]
+        }, None),
+        ('tickets:actualizar-tickets-masivo', 'POST', '/api/tickets/masivo/', {
+            'admin_id': p['admin'], 'ticket_ids': p['abiertos'], 'tecnico_asignado_id': p['tecnico']
+        }, None),
+        ('tickets:planificar-asignaciones', 'POST', '/api/tickets/planificar-asignaciones/', {'admin_id': p['admin']}, None),
+        ('tickets:obtener-ticket', 'GET', f"/api/tickets/{p['ticket']}/", None, None),
+        ('tickets:actualizar-ticket', 'PUT', f"/api/tickets/{abierto['id_ticket']}/actualizar/", {
+            'tecnico_asignado_id': p['tecnico'], 'usuario_id': p['admin']
+        }, None),
+        ('tickets:eliminar-ticket', 'DELETE', f"/api/tickets/{abierto['id_ticket']}/eliminar/", None, None),
+        ('tickets:cancelar-ticket', 'POST', f"/api/tickets/{abierto['id_ticket']}/cancelar/", {'usuario_id': abierto['usuario_creador_id']}, None),
+        ('tickets:historial-ticket', 'GET', f"/api/tickets/{p['ticket']}/historial/", None, None),
+        ('tickets:calificar-ticket', 'POST', f"/api/tickets/{resuelto['id_ticket']}/calificar/", {
+            'usuario_id': resuelto['usuario_creador_id'], 'calificacion': 4
+        }, None),
+        ('tickets:obtener-calificacion', 'GET', f"/api/tickets/{p['calificado']}/calificacion/", None, None),
+        ('tickets:tickets-sin-calificar', 'GET', f"/api/tickets/sin-calificar/?user_id={p['trabajador']}", None, None),
+        ('tickets:estadisticas-tickets', 'GET', '/api/tickets/estadisticas/', None, None),
+        ('tickets:estadisticas-historicas', 'GET', '/api/tickets/estadisticas-historicas/', None, None),
+        ('tickets:estadisticas-tiempos-resolucion', 'GET', '/api/tickets/estadisticas/tiempos-resolucion/?agrupar=categoria,prioridad', None, None),
+        ('tickets:tecnico-estadisticas', 'GET', f"/api/tickets/tecnico/estadisticas/?tecnico_id={p['tecnico']}", None, None),
+        ('tickets:tecnico-mis-tickets', 'GET', f"/api/tickets/tecnico/mis-tickets/?tecnico_id={p['tecnico']}", None, None),
+        ('tickets:tecnico-historial', 'GET', f"/api/tickets/tecnico/historial/?tecnico_id={p['tecnico']}", None, None),
+        ('tickets:tecnico-alertas', 'GET', f"/api/tickets/tecnico/alertas/?tecnico_id={p['tecnico']}", None, None),
+        ('tickets:listar-reclamos', 'GET', '/api/tickets/reclamos/', None, None),
+        ('tickets:crear-reclamo', 'POST', '/api/tickets/reclamos/crear/', {
+            'usuario_id': resuelto['usuario_creador_id'], 'ticket_id': resuelto['id_ticket'],
+            'categoria': 'solucion_ticket', 'descripcion': 'Reclamo de benchmark'
+        }, None),
+        ('tickets:estadisticas-reclamos', 'GET', '/api/tickets/reclamos/estadisticas/', None, None),
+        ('tickets:obtener-reclamo', 'GET', f"/api/tickets/reclamos/{p['reclamo']}/", None, None),
+        ('tickets:actualizar-reclamo', 'PUT', f"/api/tickets/reclamos/{p['reclamo']}/actualizar/", {
+            'admin_id': p['admin'], 'estado': 'resuelto', 'respuesta_admin': 'Revisado'
+        }, None),
+
+        ('ia_service:tickets_similares', 'GET', f"/api/ia/tickets-similares/{p['ticket']}/", None, p['tecnico']),
+        ('ia_service:feedback', 'GET', '/api/ia/feedback/', None, p['admin']),
+        ('ia_service:recomendar_tecnico', 'POST', '/api/ia/recomendar-tecnico/', {'ticket_id': abierto['id_ticket']}, p['admin']),
+        ('ia_service:analizar_patrones', 'POST', '/api/ia/analizar-patrones/', {'dias': 90, 'narrar': False}, p['admin']),
+        ('ia_service:metricas_tecnicos', 'GET', '/api/ia/metricas-tecnicos/', None, p['admin']),
+        ('ia_service:insights_capacitacion', 'GET', '/api/ia/insights-capacitacion/', None, p['admin']),
+        ('ia_service:configuracion', 'GET', '/api/ia/configuracion/', None, p['admin']),
+        ('ia_service:historial', 'GET', '/api/ia/historial/', None, p['admin']),
+        ('ia_service:metricas_consultas', 'GET', '/api/ia/metricas-consultas/', None, p['admin']),
+        ('ia_service:consultas_restantes', 'GET', '/api/ia/consultas-restantes/', None, p['tecnico']),
+        ('ia_service:status', 'GET', '/api/ia/status/', None, None),
+    ]
+
+
+def urls_endpoints():
+    """Nombres (app:nombre) de todas las urls de APPS_ENDPOINTS"""
+    nombres = set()
+    for app, (_, resolver) in get_resolver().namespace_dict.items():
+        if app in APPS_ENDPOINTS:
+            nombres.update(
+                f'{app}:{nombre}' for nombre in resolver.reverse_dict
+                if isinstance(nombre, str)
+            )
+    return nombres
+
+
+def llamar_endpoint(metodo, ruta, datos=None, usuario=None, revertir=True):
+    """
+    Llama a un endpoint con el cliente de pruebas contando sus consultas.
+    Las escrituras se revierten (revertir=False las deja a cargo del que
+    llama). Retorna (respuesta, MedicionConsultas, ms).
+    """
+    cliente = Client(HTTP_HOST='localhost')
+    cabeceras = {'HTTP_AUTHORIZATION': f'Bearer migo_token_{usuario}'} if usuario else {}
+    medicion = MedicionConsultas()
+
+    with ExitStack() as pila:
+        pila.enter_context(connections['default'].execute_wrapper(medicion))
+        if metodo != 'GET' and revertir:
+            pila.enter_context(transaction.atomic())
+
+        inicio = time.perf_counter()
+        respuesta = getattr(cliente, metodo.lower())(
+            ruta,
+            data=json.dumps(datos) if datos is not None else None,
+            content_type='application/json',
+            **cabeceras
+        )
+        ms = (time.perf_counter() - inicio) * 1000
+
+        if metodo != 'GET' and revertir:
+            transaction.set_rollback(True)
+
+    return respuesta, medicion, ms
+
+
+def medir_despacho(metodo, ruta, datos=None, usuario=None):
+    """
+    Llama a un endpoint y cuenta las consultas de eventos.despachar() sobre
+    los eventos que publicó, lo que en producción corre al confirmar (y
+    llamar_endpoint, al revertir, nunca ejecuta). Todo se revierte.
+    Retorna (respuesta, MedicionConsultas del despacho).
+    """
+    from . import eventos
+
+    medicion = MedicionConsultas()
+    with transaction.atomic():
+        # Los eventos previos ya entregados: solo se mide lo de esta llamada
+        eventos.despachar()
+        respuesta, _, _ = llamar_endpoint(metodo, ruta, datos, usuario, revertir=False)
+        with connections['default'].execute_wrapper(medicion):
+            eventos.despachar()
+        transaction.set_rollback(True)
+
+    return respuesta, medicion
@@ -1,3 +1,707 @@
-from django.test import TestCase
+import io
+import itertools
+import json
+import time
+from collections import Counter
+from datetime import timedelta
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+
+from django.contrib.admin import site
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models import F
+from django.test import AsyncClient, Client, SimpleTestCase, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from authentication.models import Usuarios
+from migo_back import instrumentacion, pruebas, replicas, trabajos
+from tickets import autoasignacion, contadores, eventos, indices, signals, sinteticos, transiciones, views
+from tickets.admin import TicketAdmin
+from tickets.analitica import DistribucionResolucion
+from tickets.importacion import ImportadorTickets
+from tickets.models import CategoriaTicket, CheckpointConsumidor, ContadorTecnico, EventoDominio, HuecoEvento, Ticket
+
+
+class PresupuestoConsultasTicketsTest(pruebas.PresupuestoConsultasTestCase):
+    APP = 'tickets'
+    # Incluyen los SAVEPOINT de las transacciones y los INSERT en
+    # eventos_dominio e historial de cada escritura; los consumidores de esos
+    # eventos (contadores, métricas, cachés) se miden en PRESUPUESTOS_DESPACHO
+    PRESUPUESTOS = {
+        'tickets:crear-ticket': 14,
+        'tickets:actualizar-tickets-masivo': 11,
+        'tickets:actualizar-ticket': 18,
+        'tickets:eliminar-ticket': 14,
+        'tickets:calificar-ticket': 16,
+        'tickets:crear-reclamo': 14,
+        'tickets:actualizar-reclamo': 18,
+        # Un COUNT por estado, prioridad, categoría y calificación
+        'tickets:estadisticas-tickets': 25,
+        'tickets:estadisticas-historicas': 29,
+    }
+    # Las métricas IA hacen un UPDATE por par (técnico, categoría) afectado:
+    # la reasignación masiva toca los pares de sus tickets
+    PRESUPUESTOS_DESPACHO = {
+        'tickets:actualizar-tickets-masivo': 51,
+        'tickets:actualizar-ticket': 24,
+        'tickets:calificar-ticket': 20,
+    }
+
+
+class IndicesTest(TestCase):
+    def test_crear_y_explicar(self):
+        self.assertTrue(all(i['estado'] == 'falta' for i in indices.revisar()))
+
+        for indice in indices.revisar():
+            indices.crear(indice['tabla'], indice['nombre'], indice['columnas'])
+
+        self.assertTrue(all(i['estado'] == 'existe' for i in indices.revisar()))
+        for consulta in indices.explicar():
+            self.assertTrue(consulta['usa_indice'], f"{consulta['descripcion']}:\n{consulta['plan']}")
+
+    def test_indice_considerado_pero_no_elegido(self):
+        columnas = ['id', 'select_type', 'table', 'type', 'possible_keys', 'key', 'rows', 'Extra']
+        considerado = [(1, 'SIMPLE', 'tickets', 'ref', 'idx_tickets_tecnico_estado,fk_tecnico', 'fk_tecnico', 40, None)]
+        elegido = [(1, 'SIMPLE', 'tickets', 'ref', 'idx_tickets_tecnico_estado,fk_tecnico', 'idx_tickets_tecnico_estado', 4, None)]
+
+        self.assertFalse(indices.usa_indice('mysql', columnas, considerado, 'idx_tickets_tecnico_estado'))
+        self.assertTrue(indices.usa_indice('mysql', columnas, elegido, 'idx_tickets_tecnico_estado'))
+
+    def test_indice_existente_no_usado(self):
+        indices.crear('tickets', 'idx_tickets_tecnico_estado', ('tecnico_asignado_id', 'estado_id'))
+        sin_indice = [('idx_tickets_tecnico_estado', 'tickets por título', Ticket.objects.filter(titulo='x'))]
+
+        with mock.patch.object(indices, 'consultas_frecuentes', return_value=sin_indice):
+            consulta, = indices.explicar()
+
+        self.assertFalse(consulta['usa_indice'], consulta['plan'])
+
+    def test_indice_cubierto(self):
+        indices.crear('historial_ticket', 'idx_otro', ('estado_nuevo_id', 'fecha_cambio', 'ticket_id'))
+
+        historial = next(i for i in indices.revisar() if i['tabla'] == 'historial_ticket')
+        self.assertEqual(historial['estado'], 'cubierto')
+        self.assertEqual(historial['indice'], 'idx_otro')
+
+
+class ContadoresTest(pruebas.DatosSinteticosTestCase):
+    def test_obtener_crea_contador_sin_upsert_con_destino(self):
+        """En MySQL (sin ON CONFLICT(...)) el primer contador de un técnico se crea igual"""
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            contador = contadores.obtener(3)
+
+        self.assertEqual(contador.version, 1)
+        self.assertEqual(ContadorTecnico.objects.filter(tecnico_id=3).count(), 1)
+
+    def test_tecnicos_con_carga_no_escribe(self):
+        tecnicos = contadores.tecnicos_con_carga()
+
+        self.assertFalse(ContadorTecnico.objects.exists())
+        for tecnico in tecnicos:
+            self.assertEqual(
+                tecnico.contador_tickets.activos,
+                Ticket.objects.filter(tecnico_asignado_id=tecnico.id_usuarios, estado_id__in=[1, 2]).count()
+            )
+
+
+class AlertasTest(pruebas.DatosSinteticosTestCase):
+    def test_parametros_no_numericos(self):
+        for ruta in (
+            '/api/tickets/tecnico/alertas/?tecnico_id=3&version=abc',
+            '/api/tickets/tecnico/alertas/?tecnico_id=3&version=1&esperar=x',
+            '/api/tickets/tecnico/alertas/stream/?tecnico_id=abc',
+        ):
+            respuesta, _, _ = sinteticos.llamar_endpoint('GET', ruta, usuario=3)
+            self.assertEqual(respuesta.status_code, 400, ruta)
+
+    def test_stream_bajo_wsgi_no_espera(self):
+        respuesta, _, _ = sinteticos.llamar_endpoint('GET', '/api/tickets/tecnico/alertas/stream/?tecnico_id=3', usuario=3)
+        contenido = b''.join(respuesta.streaming_content).decode()
+
+        self.assertTrue(contenido.startswith(f'retry: {views.REINTENTO_STREAM_WSGI * 1000}'))
+        self.assertIn('event: alertas', contenido)
+
+        # Reconecta sin cambios: solo el retry
+        version = ContadorTecnico.objects.get(tecnico_id=3).version
+        cliente = Client(HTTP_HOST='localhost')
+        respuesta = cliente.get(
+            '/api/tickets/tecnico/alertas/stream/?tecnico_id=3',
+            HTTP_AUTHORIZATION='Bearer migo_token_3',
+            HTTP_LAST_EVENT_ID=str(version)
+        )
+        self.assertNotIn('event: alertas', b''.join(respuesta.streaming_content).decode())
+
+    async def test_stream_bajo_asgi_envia_a_medida(self):
+        respuesta = await AsyncClient(HTTP_HOST='localhost').get('/api/tickets/tecnico/alertas/stream/?tecnico_id=3')
+        contenido = aiter(respuesta.streaming_content)
+        inicio = time.monotonic()
+
+        self.assertTrue((await anext(contenido)).startswith(b'retry: 3000'))
+        self.assertIn(b'event: alertas', await anext(contenido))
+
+        # Un cambio del contador llega como otro evento, sin esperar el fin del stream
+        await sync_to_async(ContadorTecnico.objects.filter(tecnico_id=3).update)(version=F('version') + 1)
+        self.assertIn(b'"delta"', await anext(contenido))
+        self.assertLess(time.monotonic() - inicio, views.LATIDO_STREAM_ALERTAS)
+        await contenido.aclose()
+
+
+class TransicionesTest(pruebas.DatosSinteticosTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.resuelto = sinteticos.parametros_endpoints()['resuelto']
+
+    def test_calificar_con_version_vencida_responde_409(self):
+        ticket = Ticket.objects.get(id_ticket=self.resuelto['id_ticket'])
+
+        respuesta, _, _ = sinteticos.llamar_endpoint(
+            'POST', f'/api/tickets/{ticket.id_ticket}/calificar/',
+            {'usuario_id': self.resuelto['usuario_creador_id'], 'calificacion': 4, 'version': ticket.version - 1}
+        )
+
+        self.assertEqual(respuesta.status_code, 409)
+        self.assertEqual(Ticket.objects.get(id_ticket=ticket.id_ticket).estado_id_id, transiciones.RESUELTO)
+
+    def test_version_no_numerica_responde_400(self):
+        for ruta, datos in (
+            (f"/api/tickets/{self.resuelto['id_ticket']}/actualizar/", {'estado_id': 3, 'version': 'abc'}),
+            (f"/api/tickets/{self.resuelto['id_ticket']}/calificar/", {
+                'usuario_id': self.resuelto['usuario_creador_id'], 'calificacion': 4, 'version': 'abc'
+            }),
+        ):
+            respuesta, _, _ = sinteticos.llamar_endpoint('PATCH' if 'actualizar' in ruta else 'POST', ruta, datos)
+            self.assertEqual(respuesta.status_code, 400, ruta)
+
+    def test_reintento_relee_la_version_vigente(self):
+        """Una lectura simple que siempre ve la foto vieja (REPEATABLE READ) no agota los reintentos"""
+        vigente = Ticket.objects.get(id_ticket=self.resuelto['id_ticket'])
+        foto = Ticket.objects.get(id_ticket=vigente.id_ticket)
+        foto.version -= 1
+
+        with mock.patch.object(Ticket.objects, 'get', return_value=foto), transaction.atomic():
+            ticket = transiciones.aplicar(
+                vigente.id_ticket, 'calificar', usuario_id=self.resuelto['usuario_creador_id']
+            )
+
+        self.assertEqual(ticket.version, vigente.version + 1)
+        self.assertEqual(Ticket.objects.get(id_ticket=vigente.id_ticket).estado_id_id, transiciones.CERRADO)
+
+
+class EstadisticasTecnicoTest(pruebas.DatosSinteticosTestCase):
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_id_con_ceros_usa_la_clave_que_se_invalida(self):
+        respuesta, _, _ = sinteticos.llamar_endpoint('GET', '/api/tickets/tecnico/estadisticas/?tecnico_id=03')
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIsNotNone(cache.get(signals.CLAVE_ESTADISTICAS_TECNICO.format(3)))
+
+    def test_id_no_numerico_responde_400(self):
+        respuesta, _, _ = sinteticos.llamar_endpoint('GET', '/api/tickets/tecnico/estadisticas/?tecnico_id=abc')
+
+        self.assertEqual(respuesta.status_code, 400)
+
+    def test_ttl_acotado_sin_cache_compartida(self):
+        with self.settings(CACHE_COMPARTIDA=False, CACHE_TTL_LOCAL=30):
+            self.assertEqual(views.ttl_invalidable(views.TTL_ESTADISTICAS_TECNICO), 30)
+        with self.settings(CACHE_COMPARTIDA=True):
+            self.assertEqual(views.ttl_invalidable(views.TTL_ESTADISTICAS_TECNICO), views.TTL_ESTADISTICAS_TECNICO)
+
+
+class TicketsResueltos:
+    """Sustituto del queryset: (grupo, horas de resolución) por ticket"""
+
+    def __init__(self, filas):
+        inicio = timezone.now().replace(microsecond=0)
+        self.filas = [(grupo, inicio, inicio + timedelta(hours=horas)) for grupo, horas in filas]
+
+    def filter(self, **filtros):
+        return self
+
+    def order_by(self):
+        return self
+
+    def values_list(self, *campos):
+        # Solo las columnas pedidas: sin agrupar no viene el grupo
+        return [fila[-len(campos):] for fila in self.filas]
+
+
+class DistribucionResolucionTest(SimpleTestCase):
+    def test_estadisticas_coinciden_con_numpy_por_grupo(self):
+        generador = np.random.default_rng(7)
+        horas_por_grupo = {
+            3: generador.exponential(20, size=37).round(2),
+            4: generador.exponential(5, size=8).round(2),
+            5: np.array([30.0]),
+        }
+        filas = [(grupo, float(h)) for grupo, horas in horas_por_grupo.items() for h in horas]
+        generador.shuffle(filas)
+
+        distribucion = DistribucionResolucion(TicketsResueltos(filas), agrupar_por=['tecnico'])
+
+        self.assertEqual([int(g) for g in distribucion.grupos[:, 0]], [3, 4, 5])
+        for i, horas in enumerate(horas_por_grupo.values()):
+            self.assertEqual(distribucion.cantidad[i], len(horas))
+            self.assertAlmostEqual(distribucion.media[i], np.mean(horas))
+            self.assertAlmostEqual(distribucion.mediana[i], np.percentile(horas, 50))
+            self.assertAlmostEqual(distribucion.p90[i], np.percentile(horas, 90))
+            self.assertEqual(distribucion.histograma[i].sum(), len(horas))
+
+    def test_histograma_incluye_el_limite_en_su_tramo(self):
+        filas = [(3, 1), (3, 1.5), (3, 4), (3, 200)]
+
+        total = DistribucionResolucion(TicketsResueltos(filas)).total()
+
+        cantidades = {tramo['hasta_horas']: tramo['cantidad'] for tramo in total['histograma']}
+        self.assertEqual(cantidades[1], 1)
+        self.assertEqual(cantidades[4], 2)
+        self.assertEqual(cantidades[None], 1)
+        self.assertEqual(total['mediana'], 2.8)
+
+    def test_sin_tickets_resueltos(self):
+        distribucion = DistribucionResolucion(TicketsResueltos([]), agrupar_por=['tecnico'])
+
+        self.assertIsNone(distribucion.total())
+        self.assertEqual(distribucion.resultados(), [])
+
+
+class TiemposResolucionTest(pruebas.DatosSinteticosTestCase):
+    def test_filtro_no_numerico_responde_400_con_su_nombre(self):
+        respuesta, _, _ = sinteticos.llamar_endpoint('GET', '/api/tickets/estadisticas/tiempos-resolucion/?categoria_id=abc')
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['error'], 'categoria_id debe ser un número')
+
+    def test_fecha_invalida_responde_400(self):
+        respuesta, _, _ = sinteticos.llamar_endpoint('GET', '/api/tickets/estadisticas/tiempos-resolucion/?fecha_inicio=2024-13-01')
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('fecha', respuesta.json()['error'])
+
+
+class AdminTicketTest(pruebas.DatosSinteticosTestCase):
+    def setUp(self):
+        self.admin = TicketAdmin(Ticket, site)
+        self.ticket = Ticket.objects.filter(tecnico_asignado_id=3, estado_id__in=[1, 2]).first()
+
+    def _activos(self, tecnico_id):
+        return Ticket.objects.filter(tecnico_asignado_id=tecnico_id, estado_id__in=[1, 2]).count()
+
+    def test_guardar_actualiza_los_contadores(self):
+        contadores.obtener(3), contadores.obtener(4)
+
+        self.ticket.tecnico_asignado_id_id = 4
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.save_model(None, self.ticket, None, True)
+
+        evento = EventoDominio.objects.filter(tipo='ticket').latest('id_evento')
+        self.assertIn('"tecnico_id": 3', evento.datos)
+        for tecnico_id in (3, 4):
+            self.assertEqual(contadores.obtener(tecnico_id).activos, self._activos(tecnico_id))
+
+    def test_guardar_aumenta_la_version(self):
+        version = self.ticket.version
+
+        self.ticket.titulo = 'Editado en el admin'
+        self.admin.save_model(None, self.ticket, None, True)
+
+        self.assertEqual(Ticket.objects.get(id_ticket=self.ticket.id_ticket).version, version + 1)
+
+        # Un cliente con la versión anterior ya no sobrescribe la edición
+        respuesta, _, _ = sinteticos.llamar_endpoint(
+            'PATCH', f'/api/tickets/{self.ticket.id_ticket}/actualizar/', {'solucion': 'x' * 20, 'version': version}
+        )
+        self.assertEqual(respuesta.status_code, 409)
+
+    def test_eliminar_actualiza_los_contadores(self):
+        contadores.obtener(3)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.delete_queryset(None, Ticket.objects.filter(id_ticket=self.ticket.id_ticket))
+
+        self.assertEqual(contadores.obtener(3).activos, self._activos(3))
+
+
+def planificador(clase, carga, competencia=(), pendientes=(), **opciones):
+    """
+    Planificador con técnicos de prueba (id -> tickets activos), competencia
+    por (técnico, categoría) y cola pendiente [(id_ticket, categoría, prioridad)]
+    """
+    tecnicos = [
+        SimpleNamespace(
+            id_usuarios=tecnico_id,
+            personas_id_personas=SimpleNamespace(nombre_completo=f'Técnico {tecnico_id}'),
+            contador_tickets=SimpleNamespace(activos=activos)
+        )
+        for tecnico_id, activos in carga.items()
+    ]
+    with mock.patch.object(autoasignacion.contadores, 'tecnicos_con_carga', return_value=tecnicos):
+        resultado = clase(**opciones)
+    resultado.competencia.update(dict(competencia))
+    resultado.pendientes = lambda: list(pendientes)
+    return resultado
+
+
+class AsignacionTest(TestCase):
+    def test_menos_cargado_y_mas_competente(self):
+        plan = planificador(
+            autoasignacion.PlanificadorAsignacion, {10: 2, 11: 2, 12: 0},
+            {(10, 1): 0.9, (11, 1): 0.3, (12, 1): 0.1},
+            [(1, 1, 4), (2, 2, 4)]
+        ).planificar()
+
+        # Categoría 1: 3/0.9 < 1/0.1; categoría 2 (0.5 para todos): el menos cargado
+        self.assertEqual([a['tecnico_id'] for a in plan['asignaciones']], [10, 12])
+
+    def test_omite_tecnicos_llenos(self):
+        plan = planificador(
+            autoasignacion.PlanificadorAsignacion, {10: 3, 11: 1},
+            {(10, 1): 1.0, (11, 1): 0.1},
+            [(i, 1, 2) for i in range(1, 5)],
+            maximo_activos=3
+        ).planificar()
+
+        self.assertEqual([a['tecnico_id'] for a in plan['asignaciones']], [11, 11])
+        self.assertEqual(plan['sin_tecnico'], [3, 4])
+
+    def test_heaps_con_invalidacion_igual_a_recalcular(self):
+        """Las entradas vencidas de otras categorías no cambian la elección"""
+        azar = np.random.default_rng(3)
+        carga = {t: int(azar.integers(0, 6)) for t in range(10, 20)}
+        competencia = {(t, c): float(azar.uniform(0.1, 1)) for t in carga for c in range(1, 4)}
+        pendientes = [(i, int(azar.integers(1, 4)), 1) for i in range(1, 60)]
+
+        plan = planificador(autoasignacion.PlanificadorAsignacion, carga, competencia, pendientes).planificar()
+
+        restante = dict(carga)
+        esperado = []
+        for _, categoria_id, _ in pendientes:
+            libres = [t for t in restante if restante[t] < autoasignacion.MAXIMO_ACTIVOS]
+            if not libres:
+                break
+            tecnico_id = min(libres, key=lambda t: ((restante[t] + 1) / competencia[(t, categoria_id)], t))
+            restante[tecnico_id] += 1
+            esperado.append(tecnico_id)
+        self.assertEqual([a['tecnico_id'] for a in plan['asignaciones']], esperado)
+
+
+class AutoasignarComandoTest(pruebas.DatosSinteticosTestCase):
+    def test_simular_no_modifica_tickets(self):
+        Ticket.objects.filter(estado_id=transiciones.ABIERTO).update(tecnico_asignado_id=None)
+        salida = io.StringIO()
+
+        call_command('autoasignar_tickets', simular=True, stdout=salida)
+
+        self.assertIn('[simulación] Planificados:', salida.getvalue())
+        self.assertIn('Ticket #', salida.getvalue())
+        self.assertFalse(Ticket.objects.filter(
+            estado_id=transiciones.ABIERTO, tecnico_asignado_id__isnull=False
+        ).exists())
+
+
+class AsignacionOptimaTest(TestCase):
+    def test_resolver_igual_a_fuerza_bruta(self):
+        azar = np.random.default_rng(7)
+        for _ in range(200):
+            n = int(azar.integers(1, 5))
+            m = int(azar.integers(n, 7))
+            costos = azar.integers(0, 20, size=(n, m)).astype(float)
+
+            columnas = autoasignacion.resolver_asignacion(costos)
+
+            self.assertEqual(len(set(columnas.tolist())), n)
+            optimo = min(
+                sum(costos[i, j] for i, j in enumerate(permutacion))
+                for permutacion in itertools.permutations(range(m), n)
+            )
+            self.assertEqual(costos[np.arange(n), columnas].sum(), optimo, costos)
+
+    def test_respeta_los_cupos(self):
+        carga = {10: 0, 11: 2, 12: 3}
+        pendientes = [(i, 1 + i % 2, 1 + i % 4) for i in range(1, 10)]
+        resultado = planificador(
+            autoasignacion.PlanificadorOptimo, carga, {(10, 1): 0.9, (12, 2): 0.8},
+            pendientes, maximo_activos=4
+        ).planificar()
+
+        # 4 + 2 + 1 cupos libres para 9 tickets
+        self.assertEqual(len(resultado['asignaciones']), 7)
+        self.assertEqual(resultado['sin_tecnico'], [8, 9])
+        recibidos = Counter(a['tecnico_id'] for a in resultado['asignaciones'])
+        for tecnico_id, activos in carga.items():
+            self.assertLessEqual(activos + recibidos[tecnico_id], 4)
+
+    def test_lote_de_200_tickets_y_50_tecnicos_en_menos_de_un_segundo(self):
+        azar = np.random.default_rng(11)
+        carga = {t: int(azar.integers(0, 5)) for t in range(100, 150)}
+        competencia = {(t, c): float(azar.uniform(0.2, 1)) for t in carga for c in range(1, 6)}
+        pendientes = [(i, int(azar.integers(1, 6)), int(azar.integers(1, 5))) for i in range(1, 201)]
+        optimo = planificador(autoasignacion.PlanificadorOptimo, carga, competencia, pendientes)
+
+        inicio = time.perf_counter()
+        resultado = optimo.planificar()
+
+        self.assertLess(time.perf_counter() - inicio, 1.0)
+        self.assertEqual(len(resultado['asignaciones']), 200)
+
+
+class ActualizacionMasivaTest(pruebas.DatosSinteticosTestCase):
+    def setUp(self):
+        ids = list(Ticket.objects.order_by('id_ticket').values_list('id_ticket', flat=True))
+        self.abiertos, self.resuelto = ids[:4], ids[4]
+        Ticket.objects.filter(id_ticket__in=self.abiertos).update(
+            estado_id=transiciones.ABIERTO, tecnico_asignado_id=None, fecha_asignacion=None
+        )
+        # Dos ya tuvieron técnico: su asignación no cambia fecha_asignacion ni el estado
+        Ticket.objects.filter(id_ticket__in=self.abiertos[:2]).update(fecha_asignacion=timezone.now())
+        Ticket.objects.filter(id_ticket=self.resuelto).update(estado_id=transiciones.RESUELTO)
+
+    def _estados(self):
+        return dict(Ticket.objects.filter(id_ticket__in=self.abiertos).values_list('id_ticket', 'estado_id'))
+
+    def test_todo_o_nada(self):
+        resultado = transiciones.aplicar_lote(
+            self.abiertos + [self.resuelto], usuario_id=1, estado_id=transiciones.EN_PROCESO
+        )
+
+        self.assertEqual(resultado['actualizados'], [])
+        self.assertEqual([e['id_ticket'] for e in resultado['errores']], [self.resuelto])
+        self.assertEqual(set(self._estados().values()), {transiciones.ABIERTO})
+
+    def test_parcial_aplica_los_validos(self):
+        resultado = transiciones.aplicar_lote(
+            self.abiertos + [self.resuelto], usuario_id=1, estado_id=transiciones.EN_PROCESO, parcial=True
+        )
+
+        self.assertEqual(resultado['actualizados'], self.abiertos)
+        self.assertEqual([e['id_ticket'] for e in resultado['errores']], [self.resuelto])
+        self.assertEqual(set(self._estados().values()), {transiciones.EN_PROCESO})
+
+    def test_un_update_por_grupo_y_un_insert_de_historial(self):
+        with CaptureQueriesContext(connection) as consultas:
+            resultado = transiciones.aplicar_lote(self.abiertos, usuario_id=1, tecnico_id=3)
+
+        sentencias = [c['sql'] for c in consultas.captured_queries]
+        # Grupos: con fecha_asignacion previa (solo técnico) y sin ella (técnico, fecha y En Proceso)
+        self.assertEqual(sum(sql.startswith('UPDATE "tickets"') for sql in sentencias), 2)
+        self.assertEqual(sum(sql.startswith('INSERT INTO "historial_ticket"') for sql in sentencias), 1)
+        self.assertEqual(resultado['actualizados'], self.abiertos)
+        self.assertEqual(self._estados(), {
+            **dict.fromkeys(self.abiertos[:2], transiciones.ABIERTO),
+            **dict.fromkeys(self.abiertos[2:], transiciones.EN_PROCESO),
+        })
+
+    def test_tecnico_inexistente_y_otros_errores(self):
+        ruta = '/api/tickets/masivo/'
+        datos = {'admin_id': 1, 'ticket_ids': self.abiertos, 'tecnico_asignado_id': 99999}
+
+        respuesta, _, _ = sinteticos.llamar_endpoint('POST', ruta, datos)
+        self.assertEqual((respuesta.status_code, respuesta.json()['error']), (404, 'Técnico no encontrado'))
+
+        # Un Usuarios.DoesNotExist ajeno al técnico no se informa como tal
+        with mock.patch.object(transiciones, 'aplicar_lote', side_effect=Usuarios.DoesNotExist), \
+                mock.patch('builtins.print'):
+            respuesta, _, _ = sinteticos.llamar_endpoint('POST', ruta, datos)
+        self.assertEqual(respuesta.status_code, 500)
+
+
+class ImportacionTest(pruebas.DatosSinteticosTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.usuario = Usuarios.objects.filter(roles_id_roles=1).values_list('id_usuarios', flat=True).first()
+        cls.categoria = CategoriaTicket.objects.values_list('id_categoria_ticket', flat=True).first()
+
+    def _fila(self, **cambios):
+        return {
+            'titulo': 'Impresora sin tóner',
+            'descripcion': 'No imprime',
+            'categoria_id': self.categoria,
+            'usuario_creador_id': self.usuario,
+            **cambios
+        }
+
+    def _eventos_creados(self):
+        return [
+            json.loads(datos)['despues']['id_ticket']
+            for datos in EventoDominio.objects.filter(tipo='ticket').order_by('id_evento').values_list('datos', flat=True)
+        ]
+
+    def test_csv_con_bom(self):
+        archivo = io.BytesIO(
+            '\ufefftitulo,descripcion,categoria_id,usuario_creador_id\n'
+            f'Sin red,Cable suelto,{self.categoria},{self.usuario}\n'.encode('utf-8')
+        )
+
+        resultado = ImportadorTickets.desde_csv(archivo).importar()
+
+        self.assertEqual((resultado['creados'], resultado['errores']), (1, []))
+        self.assertTrue(Ticket.objects.filter(titulo='Sin red', usuario_creador_id=self.usuario).exists())
+
+    def test_errores_por_fila(self):
+        filas = [
+            self._fila(),
+            'no es un objeto',
+            self._fila(titulo=''),
+            self._fila(titulo='x' * 101),
+            self._fila(categoria_id='abc'),
+            self._fila(usuario_creador_id=99999),
+            self._fila(categoria_id=99999),
+        ]
+
+        resultado = ImportadorTickets(filas).importar()
+
+        self.assertEqual(resultado['creados'], 1)
+        self.assertEqual([e['fila'] for e in resultado['errores']], [2, 3, 4, 5, 6, 7])
+        self.assertEqual(resultado['errores'][4]['error'], 'Usuario no encontrado')
+        self.assertEqual(resultado['errores'][5]['error'], 'Categoría no encontrada')
+
+    def test_maximo_de_filas(self):
+        with mock.patch.object(ImportadorTickets, 'MAXIMO_FILAS', 2):
+            resultado = ImportadorTickets([self._fila()] * 3).importar()
+
+        self.assertEqual(resultado['creados'], 0)
+        self.assertEqual(resultado['errores'], [{'fila': None, 'error': 'Máximo 2 filas por importación'}])
+
+    def test_eventos_con_id_sin_ids_en_bulk_create(self):
+        """En MySQL bulk_create no retorna ids: los eventos igual llevan el id de cada ticket"""
+        antes = set(Ticket.objects.values_list('id_ticket', flat=True))
+
+        with mock.patch.object(
+            type(connection.features), 'can_return_rows_from_bulk_insert', new_callable=mock.PropertyMock, return_value=False
+        ):
+            ImportadorTickets([self._fila(titulo=f'Ticket {i}') for i in range(3)]).importar()
+
+        creados = sorted(set(Ticket.objects.values_list('id_ticket', flat=True)) - antes)
+        self.assertEqual(len(creados), 3)
+        self.assertEqual(self._eventos_creados()[-3:], creados)
+
+
+class HuecosEventosTest(TestCase):
+    def setUp(self):
+        self.entregados, self.reparados = [], []
+        consumidor = eventos.Consumidor(
+            'prueba',
+            lambda lote: self.entregados.extend(e.id_evento for e in lote),
+            {'prueba'},
+            lambda lote: self.reparados.extend(e.id_evento for e in lote)
+        )
+        parche = mock.patch.dict(eventos._consumidores, {'prueba': consumidor}, clear=True)
+        parche.start()
+        self.addCleanup(parche.stop)
+
+        CheckpointConsumidor.objects.create(consumidor='prueba', ultimo_evento=1)
+
+    def _evento(self, id_evento, antiguedad):
+        EventoDominio.objects.create(id_evento=id_evento, tipo='prueba', datos='{}')
+        EventoDominio.objects.filter(id_evento=id_evento).update(
+            fecha_creacion=timezone.now() - antiguedad
+        )
+
+    def test_hueco_reciente_detiene_la_entrega(self):
+        self._evento(2, timedelta(0))
+        self._evento(4, timedelta(0))
+
+        eventos.despachar()
+
+        self.assertEqual(self.entregados, [2])
+        self.assertFalse(HuecoEvento.objects.exists())
+
+    def test_evento_tardio_repara_al_consumidor(self):
+        self._evento(2, timedelta(minutes=1))
+        self._evento(4, timedelta(minutes=1))
+
+        with self.assertLogs('tickets.eventos', 'WARNING') as registro:
+            eventos.despachar()
+        self.assertIn('[3]', registro.output[0])
+        self.assertEqual(self.entregados, [2, 4])
+        self.assertEqual(list(HuecoEvento.objects.values_list('id_evento', flat=True)), [3])
+
+        # La transacción que tenía el id 3 se confirma después
+        self._evento(3, timedelta(minutes=2))
+        with self.assertLogs('tickets.eventos', 'WARNING'):
+            self.assertEqual(eventos.revisar_huecos(), 1)
+
+        self.assertEqual(self.reparados, [3])
+        self.assertFalse(HuecoEvento.objects.exists())
+
+    def test_hueco_vencido_se_olvida(self):
+        HuecoEvento.objects.create(id_evento=7)
+        HuecoEvento.objects.update(fecha_registro=timezone.now() - eventos.VIGENCIA_HUECO * 2)
+
+        self.assertEqual(eventos.revisar_huecos(), 0)
+
+        self.assertEqual(self.reparados, [])
+        self.assertFalse(HuecoEvento.objects.exists())
+
+
+class InstrumentacionTest(TestCase):
+    def test_forma_sql_agrupa_consultas_repetidas(self):
+        medicion = instrumentacion.MedicionConsultas()
+        for sql in (
+            "SELECT * FROM tickets WHERE id_ticket = 1",
+            "SELECT * FROM tickets WHERE id_ticket = 2",
+            "SELECT * FROM tickets WHERE id_ticket = 3",
+            "SELECT * FROM personas WHERE nombre = 'Ana' AND id IN (%s, %s)",
+            "SELECT * FROM personas WHERE nombre = 'Luis' AND id IN (%s, %s, %s)",
+            "SELECT COUNT(*) FROM tickets",
+        ):
+            medicion(lambda *args: None, sql, None, False, {})
+
+        self.assertEqual(medicion.consultas, 6)
+        self.assertEqual(medicion.repetidas(), [
+            {'sql': 'SELECT * FROM tickets WHERE id_ticket = ?', 'veces': 3},
+            {'sql': 'SELECT * FROM personas WHERE nombre = ? AND id IN (...)', 'veces': 2},
+        ])
+
+    def test_server_timing_y_registro_de_requests_con_muchas_consultas(self):
+        with self.settings(INSTRUMENTACION_MAX_CONSULTAS=1):
+            with self.assertLogs('migo_back.instrumentacion', 'WARNING') as registro:
+                respuesta = Client(HTTP_HOST='localhost').get('/api/auth/verificar/')
+
+        self.assertRegex(respuesta['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ consultas", app;dur=[\d.]+, total;dur=')
+        linea = json.loads(registro.records[0].getMessage())
+        self.assertEqual((linea['evento'], linea['ruta']), ('request_lento', '/api/auth/verificar/'))
+        self.assertGreaterEqual(linea['consultas'], 1)
+
+
+class TrabajosTest(TestCase):
+    def test_un_error_no_detiene_el_worker(self):
+        pasadas = []
+
+        def pasada():
+            pasadas.append(1)
+            if len(pasadas) == 1:
+                raise RuntimeError('base caída')
+
+        # El segundo sleep detiene el bucle
+        with mock.patch.object(trabajos.time, 'sleep', side_effect=[None, KeyboardInterrupt]), \
+                mock.patch.object(trabajos, 'close_old_connections') as cerrar, \
+                self.assertLogs('migo_back.trabajos', 'ERROR') as registro, \
+                self.assertRaises(KeyboardInterrupt):
+            trabajos.repetir(pasada, 60, 'prueba')
+
+        self.assertEqual((len(pasadas), cerrar.call_count), (2, 2))
+        self.assertIn('Error en la pasada de prueba', registro.output[0])
+
+
+class ReplicaTest(TestCase):
+    def test_leer_primaria_dentro_de_usar_replica(self):
+        # Las escrituras de otras pruebas dejan marcada la lectura de lo propio en este hilo
+        token = replicas._leer_primaria.set(False)
+        self.addCleanup(replicas._leer_primaria.reset, token)
+        router = replicas.RouterReplica()
+        with mock.patch.object(replicas, 'replica_configurada', return_value=True), replicas.usar_replica():
+            self.assertEqual(router.db_for_read(Ticket), replicas.ALIAS_REPLICA)
+            with replicas.leer_primaria():
+                self.assertIsNone(router.db_for_read(Ticket))
+            self.assertEqual(router.db_for_read(Ticket), replicas.ALIAS_REPLICA)
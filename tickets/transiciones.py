@@ -0,0 +1,414 @@
+"""
+Motor de transiciones de estado de tickets
+
+Las reglas de qué acción puede mover un ticket de un estado a otro están en
+TRANSICIONES. Cada transición corre en una transacción: lee el ticket,
+valida en memoria, guarda solo los campos modificados con un UPDATE
+condicionado a la versión leída (control optimista; solo los reintentos
+bloquean la fila) y escribe las filas de historial con un único bulk_create.
+
+aplicar_lote (mismos valores para varios tickets) y asignar_lote (un técnico
+distinto por ticket) bloquean los tickets del lote y los guardan con UPDATEs
+agrupados por cambios idénticos; también aumentan la versión.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from authentication.models import Usuarios
+from .models import EstadoTicket, HistorialTicket, Ticket
+from .signals import foto_ticket, tickets_cambiados
+
+
+ABIERTO = 1
+EN_PROCESO = 2
+RESUELTO = 3
+CERRADO = 4
+CANCELADO = 5
+
+# Acción -> estado de origen -> estados de destino permitidos
+TRANSICIONES = {
+    # Edición de un ticket (actualizar_ticket). Cerrado solo se alcanza al
+    # calificar y desde Resuelto no se vuelve a estados anteriores.
+    'actualizar': {
+        ABIERTO: {ABIERTO, EN_PROCESO, RESUELTO, CANCELADO},
+        EN_PROCESO: {ABIERTO, EN_PROCESO, RESUELTO, CANCELADO},
+        RESUELTO: {RESUELTO, CANCELADO},
+        CANCELADO: {ABIERTO, EN_PROCESO, RESUELTO, CANCELADO},
+    },
+    # El creador cancela su ticket
+    'cancelar': {
+        ABIERTO: {CANCELADO},
+    },
+    # El creador califica el ticket resuelto, que queda cerrado
+    'calificar': {
+        RESUELTO: {CERRADO},
+    },
+}
+
+# Estado de destino fijo de las acciones que no lo reciben
+DESTINO_ACCION = {
+    'cancelar': CANCELADO,
+    'calificar': CERRADO,
+}
+
+# Acciones reservadas al creador del ticket
+SOLO_CREADOR = {
+    'cancelar': 'Solo el creador puede cancelar el ticket',
+    'calificar': 'Solo el creador del ticket puede calificarlo',
+}
+
+# Mensaje cuando la acción no admite el estado actual del ticket
+ORIGEN_NO_PERMITIDO = {
+    'actualizar': 'No se puede modificar un ticket cerrado',
+    'cancelar': 'Solo se pueden cancelar tickets en estado Abierto',
+    'calificar': 'Solo se pueden calificar tickets en estado "Resuelto"',
+}
+
+# Mensaje cuando el destino no está permitido: por (origen, destino), por
+# destino (origen None) o por origen (destino None)
+DESTINO_NO_PERMITIDO = {
+    (None, CERRADO): 'El estado "Cerrado" solo se establece automáticamente después de calificar',
+    (RESUELTO, None): 'No se puede volver a estados anteriores desde "Resuelto"',
+}
+
+LARGO_MINIMO_SOLUCION = 10
+
+# Valor por defecto de los parámetros opcionales: el campo no se modifica
+SIN_CAMBIO = object()
+
+# Relecturas de aplicar() ante un cambio concurrente cuando el cliente no
+# indicó la versión que vio
+REINTENTOS_CONFLICTO = 3
+
+
+class TransicionInvalida(Exception):
+    """Transición rechazada por las reglas; status es el código HTTP sugerido"""
+
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.mensaje = mensaje
+        self.status = status
+
+
+class ConflictoVersion(TransicionInvalida):
+    """El ticket cambió desde la versión que se leyó"""
+
+    def __init__(self, id_ticket):
+        super().__init__('El ticket fue modificado por otro usuario; revise los cambios e intente nuevamente', status=409)
+        self.id_ticket = id_ticket
+
+
+_nombres_estado = {}
+
+
+def nombre_estado(estado_id):
+    """Nombre del estado desde el catálogo precargado (se carga una vez)"""
+    if estado_id not in _nombres_estado:
+        _nombres_estado.update(EstadoTicket.objects.values_list('id_estado_ticket', 'nombre_estado'))
+    return _nombres_estado.get(estado_id)
+
+
+def validar_transicion(accion, origen, destino, solucion=None):
+    """
+    Valida en memoria que la acción pueda llevar el ticket de origen a
+    destino (destino None = sin cambio de estado). Lanza TransicionInvalida.
+    """
+    permitidos = TRANSICIONES[accion].get(origen)
+    if permitidos is None:
+        raise TransicionInvalida(ORIGEN_NO_PERMITIDO[accion])
+
+    if destino is None or destino == origen:
+        return
+
+    if nombre_estado(destino) is None:
+        raise TransicionInvalida('Estado no válido')
+
+    if destino not in permitidos:
+        mensaje = (
+            DESTINO_NO_PERMITIDO.get((origen, destino))
+            or DESTINO_NO_PERMITIDO.get((None, destino))
+            or DESTINO_NO_PERMITIDO.get((origen, None))
+            or f'No se puede cambiar de "{nombre_estado(origen)}" a "{nombre_estado(destino)}"'
+        )
+        raise TransicionInvalida(mensaje)
+
+    if destino == RESUELTO and (not solucion or len(solucion.strip()) < LARGO_MINIMO_SOLUCION):
+        raise TransicionInvalida(
+            f'Debe ingresar una solución de al menos {LARGO_MINIMO_SOLUCION} caracteres para cambiar a "Resuelto"'
+        )
+
+
+def efectos_destino(destino, ticket, ahora):
+    """Campos que cambian al llegar a un estado (además de estado_id)"""
+    if destino == RESUELTO and not ticket.fecha_resolucion:
+        return {'fecha_resolucion': ahora}
+    if destino == CERRADO:
+        return {'fecha_cierre': ahora}
+    return {}
+
+
+def _planificar(ticket, destino, tecnico_id, tecnico_nuevo_id, solucion, ahora):
+    """
+    Cambios (campo del modelo -> nuevo valor, los ForeignKey por id) que
+    produce la transición en un ticket ya validado
+    """
+    cambios = {}
+
+    if tecnico_id is not SIN_CAMBIO:
+        if tecnico_id:
+            cambios['tecnico_asignado_id'] = tecnico_nuevo_id
+            if not ticket.fecha_asignacion:
+                cambios['fecha_asignacion'] = ahora
+                # Primera asignación de un ticket Abierto: pasa a En Proceso
+                if ticket.estado_id_id == ABIERTO:
+                    cambios['estado_id'] = EN_PROCESO
+        else:
+            cambios['tecnico_asignado_id'] = None
+
+    if destino is not None:
+        cambios['estado_id'] = destino
+        cambios.update(efectos_destino(destino, ticket, ahora))
+
+    if solucion is not SIN_CAMBIO:
+        cambios['solucion'] = solucion
+
+    return cambios
+
+
+def _asignar(ticket, cambios):
+    """Copia los cambios en la instancia en memoria"""
+    for campo, valor in cambios.items():
+        setattr(ticket, Ticket._meta.get_field(campo).attname, valor)
+
+
+def _historial(ticket, antes, destino, tecnico, autor_id, comentario):
+    """Filas de historial de un ticket ya modificado en memoria"""
+    origen = antes.estado_id
+    final = ticket.estado_id_id
+    historial = []
+
+    if destino is not None and final != origen:
+        historial.append(HistorialTicket(
+            ticket_id=ticket,
+            usuario_id_id=autor_id,
+            estado_anterior_id_id=origen,
+            estado_nuevo_id_id=final,
+            comentario=comentario or f'Estado cambiado de "{nombre_estado(origen)}" a "{nombre_estado(final)}"'
+        ))
+
+    if tecnico is not None and tecnico.id_usuarios != antes.tecnico_id:
+        historial.append(HistorialTicket(
+            ticket_id=ticket,
+            usuario_id_id=autor_id,
+            estado_anterior_id_id=origen,
+            estado_nuevo_id_id=final,
+            comentario=f'Ticket asignado a {tecnico.personas_id_personas.nombre_completo}'
+        ))
+
+    return historial
+
+
+def _obtener_tecnico(tecnico_id):
+    if tecnico_id is SIN_CAMBIO or not tecnico_id:
+        return None
+    try:
+        return Usuarios.objects.select_related('personas_id_personas').get(id_usuarios=tecnico_id)
+    except Usuarios.DoesNotExist:
+        raise TransicionInvalida('Técnico no encontrado', status=404)
+
+
+def aplicar(id_ticket, accion, usuario_id=None, estado_id=None, tecnico_id=SIN_CAMBIO,
+            solucion=SIN_CAMBIO, comentario=None, version=None):
+    """
+    Aplica una acción de TRANSICIONES a un ticket y retorna el ticket
+    actualizado.
+
+    usuario_id: quien ejecuta la acción (default: el creador del ticket)
+    estado_id: estado de destino (acción 'actualizar')
+    tecnico_id: técnico a asignar (None = desasignar)
+    solucion: texto de solución
+    comentario: comentario del historial para el cambio de estado
+    version: versión del ticket que vio el cliente (opcional)
+
+    El ticket se guarda con un UPDATE condicionado a la versión leída. Si
+    otro cambio se adelantó y el cliente envió version se lanza
+    ConflictoVersion; sin version se relee con select_for_update y se vuelve
+    a validar (hasta REINTENTOS_CONFLICTO veces). La relectura bloquea la
+    fila porque dentro de una transacción externa, con REPEATABLE READ, una
+    lectura simple vería la misma foto y el reintento fallaría otra vez.
+
+    Lanza Ticket.DoesNotExist, TransicionInvalida (404 si el técnico no
+    existe) o ConflictoVersion.
+    """
+    ahora = timezone.now()
+
+    for intento in range(REINTENTOS_CONFLICTO):
+        with transaction.atomic():
+            # La lectura con bloqueo ve la última versión confirmada, no la foto de la transacción
+            consulta = Ticket.objects.select_for_update() if intento else Ticket.objects
+            ticket = consulta.get(id_ticket=id_ticket)
+            if version is not None and ticket.version != int(version):
+                raise ConflictoVersion(id_ticket)
+
+            antes = foto_ticket(ticket)
+
+            if accion in SOLO_CREADOR and (usuario_id is None or ticket.usuario_creador_id_id != int(usuario_id)):
+                raise TransicionInvalida(SOLO_CREADOR[accion], status=403)
+
+            destino = DESTINO_ACCION.get(accion, estado_id)
+            nueva_solucion = ticket.solucion if solucion is SIN_CAMBIO else solucion
+            validar_transicion(accion, antes.estado_id, destino, nueva_solucion)
+
+            tecnico = _obtener_tecnico(tecnico_id)
+            cambios = _planificar(ticket, destino, tecnico_id, tecnico and tecnico.id_usuarios, solucion, ahora)
+            if cambios:
+                actualizados = Ticket.objects.filter(
+                    id_ticket=id_ticket,
+                    version=ticket.version
+                ).update(version=F('version') + 1, **cambios)
+                if not actualizados:
+                    if version is not None:
+                        raise ConflictoVersion(id_ticket)
+                    continue
+                _asignar(ticket, cambios)
+                ticket.version += 1
+
+            historial = _historial(
+                ticket, antes, destino, tecnico, usuario_id or ticket.usuario_creador_id_id, comentario
+            )
+            if historial:
+                HistorialTicket.objects.bulk_create(historial)
+
+            tickets_cambiados.send(sender=Ticket, cambios=[(antes, foto_ticket(ticket))])
+
+        return ticket
+
+    raise ConflictoVersion(id_ticket)
+
+
+def _guardar_lote(planes, usuario_id, destino, comentario):
+    """
+    Guarda los tickets planificados (lista de (ticket, cambios, tecnico)):
+    un UPDATE por grupo de tickets con cambios idénticos, un bulk_create con
+    todo el historial y un envío de tickets_cambiados. Debe llamarse dentro
+    de la transacción que bloqueó los tickets.
+    """
+    grupos = {}
+    for ticket, cambios, tecnico in planes:
+        if cambios:
+            grupos.setdefault(tuple(sorted(cambios.items())), []).append((ticket, tecnico))
+
+    historial = []
+    pares = []
+    for clave, grupo in grupos.items():
+        cambios = dict(clave)
+        Ticket.objects.filter(id_ticket__in=[t.id_ticket for t, _ in grupo]).update(
+            version=F('version') + 1,
+            **cambios
+        )
+
+        for ticket, tecnico in grupo:
+            antes = foto_ticket(ticket)
+            _asignar(ticket, cambios)
+            ticket.version += 1
+            historial += _historial(ticket, antes, destino, tecnico, usuario_id, comentario)
+            pares.append((antes, foto_ticket(ticket)))
+
+    if historial:
+        HistorialTicket.objects.bulk_create(historial)
+
+    if pares:
+        tickets_cambiados.send(sender=Ticket, cambios=pares)
+
+
+def aplicar_lote(ticket_ids, usuario_id, estado_id=None, tecnico_id=SIN_CAMBIO,
+                 solucion=SIN_CAMBIO, comentario=None, parcial=False) -> dict:
+    """
+    Aplica la acción 'actualizar' con los mismos valores a varios tickets.
+
+    Bloquea los tickets con una consulta, valida todas las transiciones en
+    memoria y agrupa los tickets que reciben los mismos cambios para
+    aplicarlos con un UPDATE por grupo. Las filas de historial se escriben
+    con un único bulk_create, todo en una transacción.
+
+    Si algún ticket no admite la transición no se modifica ninguno, salvo
+    con parcial=True, que aplica los válidos. Retorna los ids actualizados y
+    los errores por ticket ({id_ticket, error}).
+
+    Lanza TransicionInvalida (404) si el técnico no existe.
+    """
+    ahora = timezone.now()
+    ids = list(dict.fromkeys(int(i) for i in ticket_ids))
+    errores = []
+
+    with transaction.atomic():
+        tecnico = _obtener_tecnico(tecnico_id)
+        tickets = {
+            t.id_ticket: t
+            for t in Ticket.objects.select_for_update().filter(id_ticket__in=ids)
+        }
+
+        # Validación en memoria de todas las transiciones
+        planes = []
+        for id_ticket in ids:
+            ticket = tickets.get(id_ticket)
+            if ticket is None:
+                errores.append({'id_ticket': id_ticket, 'error': 'Ticket no encontrado'})
+                continue
+
+            nueva_solucion = ticket.solucion if solucion is SIN_CAMBIO else solucion
+            try:
+                validar_transicion('actualizar', ticket.estado_id_id, estado_id, nueva_solucion)
+            except TransicionInvalida as e:
+                errores.append({'id_ticket': id_ticket, 'error': e.mensaje})
+                continue
+
+            cambios = _planificar(ticket, estado_id, tecnico_id, tecnico and tecnico.id_usuarios, solucion, ahora)
+            planes.append((ticket, cambios, tecnico))
+
+        if errores and not parcial:
+            return {'actualizados': [], 'errores': errores}
+
+        _guardar_lote(planes, usuario_id, estado_id, comentario)
+
+    return {'actualizados': [ticket.id_ticket for ticket, _, _ in planes], 'errores': errores}
+
+
+def asignar_lote(asignaciones, usuario_id) -> dict:
+    """
+    Asigna tickets Abiertos sin técnico (asignaciones: id_ticket -> id del
+    técnico) en una transacción, con las mismas reglas que una asignación
+    individual. Los tickets que ya no están Abiertos y sin asignar (cambiaron
+    después de planificar) se omiten y se reportan en errores.
+    """
+    ahora = timezone.now()
+    errores = []
+
+    with transaction.atomic():
+        tecnicos = {
+            t.id_usuarios: t
+            for t in Usuarios.objects.select_related('personas_id_personas').filter(
+                id_usuarios__in=set(asignaciones.values())
+            )
+        }
+        tickets = {
+            t.id_ticket: t
+            for t in Ticket.objects.select_for_update().filter(id_ticket__in=list(asignaciones))
+        }
+
+        planes = []
+        for id_ticket, tecnico_id in asignaciones.items():
+            ticket = tickets.get(id_ticket)
+            tecnico = tecnicos.get(tecnico_id)
+            if ticket is None or ticket.estado_id_id != ABIERTO or ticket.tecnico_asignado_id_id is not None:
+                errores.append({'id_ticket': id_ticket, 'error': 'El ticket ya no está abierto sin asignar'})
+            elif tecnico is None:
+                errores.append({'id_ticket': id_ticket, 'error': 'Técnico no encontrado'})
+            else:
+                cambios = _planificar(ticket, None, tecnico_id, tecnico_id, SIN_CAMBIO, ahora)
+                planes.append((ticket, cambios, tecnico))
+
+        _guardar_lote(planes, usuario_id, None, None)
+
+    return {'actualizados': [ticket.id_ticket for ticket, _, _ in planes], 'errores': errores}
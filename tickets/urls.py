@@ -11,7 +11,10 @@ from .views import (
     listar_tickets,
     obtener_ticket,
     crear_ticket,
+    importar_tickets,
     actualizar_ticket,
+    actualizar_tickets_masivo,
+    planificar_asignaciones,
     eliminar_ticket,
     mis_tickets,
     cancelar_ticket,
@@ -21,6 +24,7 @@ from .views import (
     # Estadísticas
     estadisticas_tickets,
     estadisticas_historicas,
+    estadisticas_tiempos_resolucion,
     # Calificaciones
     calificar_ticket,
     obtener_calificacion,
@@ -30,6 +34,7 @@ from .views import (
     tecnico_mis_tickets,
     tecnico_historial,
     tecnico_alertas,
+    tecnico_alertas_stream,
     #reclamos
     listar_reclamos, 
     obtener_reclamo, 
@@ -52,6 +57,9 @@ urlpatterns = [
     path('mis-tickets/', mis_tickets, name='mis-tickets'),
     path('tickets-pendientes/', tickets_pendientes, name='tickets-pendientes'),
     path('crear/', crear_ticket, name='crear-ticket'),
+    path('importar/', importar_tickets, name='importar-tickets'),
+    path('masivo/', actualizar_tickets_masivo, name='actualizar-tickets-masivo'),
+    path('planificar-asignaciones/', planificar_asignaciones, name='planificar-asignaciones'),
     path('<int:id_ticket>/', obtener_ticket, name='obtener-ticket'),
     path('<int:id_ticket>/actualizar/', actualizar_ticket, name='actualizar-ticket'),
     path('<int:id_ticket>/eliminar/', eliminar_ticket, name='eliminar-ticket'),
@@ -68,12 +76,14 @@ urlpatterns = [
     # Estadísticas
     path('estadisticas/', estadisticas_tickets, name='estadisticas-tickets'),
     path('estadisticas-historicas/', estadisticas_historicas, name='estadisticas-historicas'),
+    path('estadisticas/tiempos-resolucion/', estadisticas_tiempos_resolucion, name='estadisticas-tiempos-resolucion'),
 
     # Endpoints para Técnicos
     path('tecnico/estadisticas/', tecnico_estadisticas, name='tecnico-estadisticas'),
     path('tecnico/mis-tickets/', tecnico_mis_tickets, name='tecnico-mis-tickets'),
     path('tecnico/historial/', tecnico_historial, name='tecnico-historial'),
     path('tecnico/alertas/', tecnico_alertas, name='tecnico-alertas'),
+    path('tecnico/alertas/stream/', tecnico_alertas_stream, name='tecnico-alertas-stream'),
 
     # Reclamos
     path('reclamos/', listar_reclamos, name='listar-reclamos'),
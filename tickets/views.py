@@ -1,16 +1,24 @@
 """
 Vistas para el sistema de tickets
 """
+import time
+
 from rest_framework import status, viewsets
-from rest_framework.decorators import api_view, permission_classes, action
+from rest_framework.decorators import api_view, permission_classes, action, parser_classes
+from rest_framework.parsers import JSONParser, MultiPartParser, FormParser
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
 from django.db.models import Q
 from django.views.decorators.csrf import csrf_exempt
 from django.db.models import Count
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
 from django.views.decorators.csrf import csrf_exempt
 
+from migo_back.replicas import leer_primaria, usar_replica
+
 from .models import (
     CategoriaTicket,
     EstadoTicket,
@@ -33,9 +41,54 @@ from .serializers import (
     ReclamoListSerializer,
     ReclamoDetailSerializer
 )
+from .signals import (
+    foto_ticket,
+    tickets_cambiados,
+    CLAVE_ESTADISTICAS_TECNICO,
+    CLAVE_ESTADISTICAS_RECLAMOS
+)
+from . import contadores
+from .importacion import ImportadorTickets
+from .autoasignacion import MAXIMO_ACTIVOS, PlanificadorOptimo
+from . import eventos, prioridades, transiciones
+from .analitica import DistribucionResolucion
 from authentication.models import Usuarios
 
 
+# Segundos que se mantienen en caché las estadísticas de un técnico. Los
+# cambios en sus tickets la invalidan; el TTL cubre el cambio de mes.
+TTL_ESTADISTICAS_TECNICO = 600
+
+# Alertas del técnico cacheadas por versión de su contador. El TTL acota el
+# desfase de los conteos que dependen de la hora (nuevos, antiguos).
+CLAVE_ALERTAS_TECNICO = 'tecnico_alertas:{}:{}'
+TTL_ALERTAS_TECNICO = 60
+
+# Segundos que se mantienen en caché las estadísticas de reclamos
+TTL_ESTADISTICAS_RECLAMOS = 300
+
+
+def ttl_invalidable(ttl):
+    """
+    TTL de una entrada que invalidan los consumidores del outbox. Sin caché
+    compartida la invalidación no llega desde otros procesos, así que se
+    acota a CACHE_TTL_LOCAL.
+    """
+    if settings.CACHE_COMPARTIDA:
+        return ttl
+    return min(ttl, settings.CACHE_TTL_LOCAL)
+
+# Duración máxima de una conexión SSE y segundos entre latidos (ASGI)
+DURACION_STREAM_ALERTAS = 300
+LATIDO_STREAM_ALERTAS = 15
+
+# Bajo WSGI el stream responde sin esperar y el navegador reconecta tras estos segundos
+REINTENTO_STREAM_WSGI = 15
+
+# Tickets por operación de actualizar_tickets_masivo
+MAXIMO_TICKETS_MASIVO = 1000
+
+
 # ============================================
 # CATÁLOGOS (Categorías, Estados, Prioridades)
 # ============================================
@@ -143,6 +196,14 @@ def listar_tickets(request):
         if categoria:
             tickets = tickets.filter(categoria_id=categoria)
         
+        tickets = tickets.select_related(
+            'categoria_id',
+            'estado_id',
+            'prioridad_id',
+            'usuario_creador_id__personas_id_personas',
+            'tecnico_asignado_id__personas_id_personas'
+        )
+        
         serializer = TicketListSerializer(tickets, many=True)
         
         return Response({
@@ -214,38 +275,28 @@ def crear_ticket(request):
                 'error': 'Todos los campos son obligatorios'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Obtener usuario con cargo
-        usuario = Usuarios.objects.select_related('cargos_id_cargos').get(id_usuarios=user_id)
-        
-        # Obtener categoría
-        categoria = CategoriaTicket.objects.get(id_categoria_ticket=categoria_id)
-        
-        # CALCULAR PRIORIDAD AUTOMÁTICAMENTE
-        peso_cargo = usuario.cargos_id_cargos.peso_prioridad
-        multiplicador_categoria = float(categoria.multiplicador_prioridad)
-        
-        # Calcular puntaje de prioridad
-        puntaje_prioridad = peso_cargo * multiplicador_categoria
-        
-        # Determinar nivel de prioridad basado en puntaje
-        if puntaje_prioridad >= 6.0:
-            prioridad_id = 4  # Urgente
-        elif puntaje_prioridad >= 4.0:
-            prioridad_id = 3  # Alta
-        elif puntaje_prioridad >= 2.0:
-            prioridad_id = 2  # Media
-        else:
-            prioridad_id = 1  # Baja
-        
-        # Crear ticket
-        ticket = Ticket.objects.create(
-            titulo=titulo,
-            descripcion=descripcion,
-            categoria_id_id=categoria_id,
-            prioridad_id_id=prioridad_id,
-            usuario_creador_id_id=user_id,
-            estado_id_id=1  # Estado: Abierto
-        )
+        # Cargo del usuario (el resto del cálculo usa la matriz en memoria)
+        cargo_id = Usuarios.objects.values_list('cargos_id_cargos', flat=True).get(id_usuarios=user_id)
+        categoria_id = int(categoria_id)
+        
+        matriz = prioridades.obtener_matriz([cargo_id], [categoria_id])
+        if not matriz.contiene(categoria_ids=[categoria_id]):
+            raise CategoriaTicket.DoesNotExist
+        
+        # CALCULAR PRIORIDAD AUTOMÁTICAMENTE (peso cargo x multiplicador categoría)
+        prioridad_id = matriz.prioridad(cargo_id, categoria_id)
+        
+        # Crear ticket (el evento del outbox va en la misma transacción)
+        with transaction.atomic():
+            ticket = Ticket.objects.create(
+                titulo=titulo,
+                descripcion=descripcion,
+                categoria_id_id=categoria_id,
+                prioridad_id_id=prioridad_id,
+                usuario_creador_id_id=user_id,
+                estado_id_id=1  # Estado: Abierto
+            )
+            tickets_cambiados.send(sender=Ticket, cambios=[(None, foto_ticket(ticket))])
         
         # Serializar respuesta
         response_serializer = TicketDetailSerializer(ticket)
@@ -398,109 +449,112 @@ def crear_ticket(request):
 
 
 @csrf_exempt
-@api_view(['PUT', 'PATCH'])
+@api_view(['POST'])
 @permission_classes([AllowAny])
-def actualizar_ticket(request, id_ticket):
-    """Actualizar un ticket existente"""
+@parser_classes([JSONParser, MultiPartParser, FormParser])
+def importar_tickets(request):
+    """
+    Importación masiva de tickets (solo administradores)
+    Body JSON: {"admin_id": 1, "tickets": [{titulo, descripcion, categoria_id, usuario_creador_id}, ...]}
+    o multipart con admin_id y archivo (CSV con esos encabezados).
+    Parámetros opcionales:
+    - solo_validar=true: valida sin crear tickets
+    """
     try:
-        ticket = Ticket.objects.get(id_ticket=id_ticket)
+        admin_id = request.data.get('admin_id')
         
-        # ❌ BLOQUEO: No se puede modificar un ticket cerrado
-        if ticket.estado_id.id_estado_ticket == 4:
+        if not admin_id:
             return Response({
                 'success': False,
-                'error': 'No se puede modificar un ticket cerrado'
+                'error': 'admin_id es requerido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Guardar estado anterior para historial
-        estado_anterior = ticket.estado_id
+        admin = Usuarios.objects.get(id_usuarios=admin_id)
+        if admin.roles_id_roles_id != 3:
+            return Response({
+                'success': False,
+                'error': 'Solo administradores'
+            }, status=status.HTTP_403_FORBIDDEN)
         
-        # ❌ BLOQUEO: No se puede establecer manualmente el estado "Cerrado"
-        if 'estado_id' in request.data and int(request.data['estado_id']) == 4:
+        if 'archivo' in request.FILES:
+            importador = ImportadorTickets.desde_csv(request.FILES['archivo'])
+        elif isinstance(request.data.get('tickets'), list):
+            importador = ImportadorTickets(request.data['tickets'])
+        else:
             return Response({
                 'success': False,
-                'error': 'El estado "Cerrado" solo se establece automáticamente después de calificar'
+                'error': 'Envíe una lista "tickets" o un archivo CSV en "archivo"'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Asignar técnico
-        if 'tecnico_asignado_id' in request.data:
-            tecnico_id = request.data['tecnico_asignado_id']
-            if tecnico_id:
-                ticket.tecnico_asignado_id_id = tecnico_id
-                if not ticket.fecha_asignacion:
-                    ticket.fecha_asignacion = timezone.now()
-                    # Si está en Abierto, cambiar a En Proceso automáticamente
-                    if ticket.estado_id.id_estado_ticket == 1:
-                        ticket.estado_id_id = 2  # En Proceso
-            else:
-                ticket.tecnico_asignado_id = None
+        solo_validar = str(request.data.get('solo_validar', '')).lower() in ['1', 'true']
+        resultado = importador.importar(solo_validar=solo_validar)
         
-        # Cambiar estado
-        if 'estado_id' in request.data:
-            nuevo_estado_id = int(request.data['estado_id'])
-            
-            # Validar que si cambia a Resuelto (3), debe tener solución
-            if nuevo_estado_id == 3:
-                solucion = request.data.get('solucion', ticket.solucion)
-                if not solucion or len(solucion.strip()) < 10:
-                    return Response({
-                        'success': False,
-                        'error': 'Debe ingresar una solución de al menos 10 caracteres para cambiar a "Resuelto"'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-            
-            # ❌ BLOQUEO: No se puede volver a estados anteriores desde Resuelto
-            if ticket.estado_id.id_estado_ticket == 3 and nuevo_estado_id < 3:
-                return Response({
-                    'success': False,
-                    'error': 'No se puede volver a estados anteriores desde "Resuelto"'
-                }, status=status.HTTP_400_BAD_REQUEST)
-            
-            ticket.estado_id_id = nuevo_estado_id
-            
-            # Actualizar fechas según el estado
-            if nuevo_estado_id == 3 and not ticket.fecha_resolucion:  # Resuelto
-                ticket.fecha_resolucion = timezone.now()
-            elif nuevo_estado_id == 5:  # Cancelado
-                # No actualizar fecha_cierre para cancelados
-                pass
-        
-        # Actualizar solución
-        if 'solucion' in request.data:
-            ticket.solucion = request.data['solucion']
-        
-        # Guardar cambios
-        ticket.save()
-        
-        # Crear entrada en historial si cambió el estado
-        if 'estado_id' in request.data and estado_anterior.id_estado_ticket != ticket.estado_id.id_estado_ticket:
-            comentario_historial = f'Estado cambiado de "{estado_anterior.nombre_estado}" a "{ticket.estado_id.nombre_estado}"'
-            
-            # Si se canceló, agregar mensaje especial
-            if ticket.estado_id.id_estado_ticket == 5:
-                motivo_cancelacion = request.data.get('motivo_cancelacion', 'Sin motivo especificado')
-                comentario_historial = f'Ticket cancelado. Motivo: {motivo_cancelacion}'
-            
-            HistorialTicket.objects.create(
-                ticket_id=ticket,
-                usuario_id=ticket.usuario_creador_id,
-                estado_anterior_id=estado_anterior,
-                estado_nuevo_id=ticket.estado_id,
-                comentario=comentario_historial
-            )
+        if resultado['creados'] == 0 and not resultado.get('validas'):
+            return Response({
+                'success': False,
+                'error': 'No se importó ningún ticket',
+                **resultado
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Crear historial si se asignó técnico por primera vez
-        if 'tecnico_asignado_id' in request.data and request.data['tecnico_asignado_id'] and not estado_anterior.id_estado_ticket == ticket.estado_id.id_estado_ticket:
-            try:
-                tecnico = Usuarios.objects.get(id_usuarios=request.data['tecnico_asignado_id'])
-                HistorialTicket.objects.create(
-                    ticket_id=ticket,
-                    usuario_id=ticket.usuario_creador_id,
-                    estado_anterior_id=estado_anterior,
-                    estado_nuevo_id=ticket.estado_id,
-                    comentario=f'Ticket asignado a {tecnico.personas_id_personas.nombre_completo}'
-                )
-            except:
-                pass
+        return Response({
+            'success': True,
+            **resultado
+        }, status=status.HTTP_200_OK if solo_validar else status.HTTP_201_CREATED)
+        
+    except Usuarios.DoesNotExist:
+        return Response({
+            'success': False,
+            'error': 'Usuario no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except UnicodeDecodeError:
+        return Response({
+            'success': False,
+            'error': 'El archivo debe estar en UTF-8'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        import traceback
+        print("Error completo:", traceback.format_exc())
+        return Response({
+            'success': False,
+            'error': f'Error en el servidor: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+@api_view(['PUT', 'PATCH'])
+@permission_classes([AllowAny])
+def actualizar_ticket(request, id_ticket):
+    """
+    Actualizar un ticket existente (estado, técnico y/o solución)
+    Enviar version (la del ticket leído) para detectar cambios concurrentes:
+    si el ticket cambió se responde 409 con el ticket vigente.
+    """
+    try:
+        try:
+            estado_id = int(request.data['estado_id']) if 'estado_id' in request.data else None
+            version = request.data.get('version')
+            version = int(version) if version is not None else None
+        except (TypeError, ValueError):
+            return Response({
+                'success': False,
+                'error': 'estado_id y version deben ser enteros'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Si se cancela, el historial registra el motivo
+        comentario = None
+        if estado_id == transiciones.CANCELADO:
+            motivo_cancelacion = request.data.get('motivo_cancelacion', 'Sin motivo especificado')
+            comentario = f'Ticket cancelado. Motivo: {motivo_cancelacion}'
+        
+        ticket = transiciones.aplicar(
+            id_ticket,
+            'actualizar',
+            estado_id=estado_id,
+            tecnico_id=request.data.get('tecnico_asignado_id') if 'tecnico_asignado_id' in request.data else transiciones.SIN_CAMBIO,
+            solucion=request.data['solucion'] if 'solucion' in request.data else transiciones.SIN_CAMBIO,
+            comentario=comentario,
+            version=version
+        )
         
         # Serializar respuesta
         response_serializer = TicketDetailSerializer(ticket)
@@ -511,6 +565,18 @@ def actualizar_ticket(request, id_ticket):
             'ticket': response_serializer.data
         }, status=status.HTTP_200_OK)
         
+    except transiciones.ConflictoVersion as e:
+        # Se devuelve el ticket vigente para que el cliente vea el cambio ajeno
+        return Response({
+            'success': False,
+            'error': e.mensaje,
+            'ticket': TicketDetailSerializer(Ticket.objects.get(id_ticket=id_ticket)).data
+        }, status=status.HTTP_409_CONFLICT)
+    except transiciones.TransicionInvalida as e:
+        return Response({
+            'success': False,
+            'error': e.mensaje
+        }, status=e.status)
     except Ticket.DoesNotExist:
         return Response({
             'success': False,
@@ -525,6 +591,168 @@ def actualizar_ticket(request, id_ticket):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def actualizar_tickets_masivo(request):
+    """
+    Cambio de estado y/o reasignación de varios tickets (solo administradores)
+    Body: {"admin_id": 1, "ticket_ids": [1, 2, ...], "estado_id": 2,
+           "tecnico_asignado_id": 5, "solucion": "...", "motivo_cancelacion": "..."}
+    Se requiere estado_id y/o tecnico_asignado_id (null = desasignar).
+    Si algún ticket no admite el cambio no se modifica ninguno, salvo con
+    parcial=true, que aplica los válidos y reporta el resto.
+    """
+    try:
+        admin_id = request.data.get('admin_id')
+        ticket_ids = request.data.get('ticket_ids')
+        
+        if not admin_id:
+            return Response({
+                'success': False,
+                'error': 'admin_id es requerido'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        rol_admin = Usuarios.objects.filter(id_usuarios=admin_id).values_list('roles_id_roles_id', flat=True).first()
+        if rol_admin is None:
+            return Response({
+                'success': False,
+                'error': 'Usuario no encontrado'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if rol_admin != 3:
+            return Response({
+                'success': False,
+                'error': 'Solo administradores'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        if not isinstance(ticket_ids, list) or not ticket_ids:
+            return Response({
+                'success': False,
+                'error': 'ticket_ids debe ser una lista de ids'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if len(ticket_ids) > MAXIMO_TICKETS_MASIVO:
+            return Response({
+                'success': False,
+                'error': f'Máximo {MAXIMO_TICKETS_MASIVO} tickets por operación'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        if 'estado_id' not in request.data and 'tecnico_asignado_id' not in request.data:
+            return Response({
+                'success': False,
+                'error': 'Indique estado_id y/o tecnico_asignado_id'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        estado_id = int(request.data['estado_id']) if request.data.get('estado_id') is not None else None
+        
+        comentario = None
+        if estado_id == transiciones.CANCELADO:
+            motivo_cancelacion = request.data.get('motivo_cancelacion', 'Sin motivo especificado')
+            comentario = f'Ticket cancelado. Motivo: {motivo_cancelacion}'
+        
+        resultado = transiciones.aplicar_lote(
+            ticket_ids,
+            usuario_id=int(admin_id),
+            estado_id=estado_id,
+            tecnico_id=request.data.get('tecnico_asignado_id') if 'tecnico_asignado_id' in request.data else transiciones.SIN_CAMBIO,
+            solucion=request.data['solucion'] if 'solucion' in request.data else transiciones.SIN_CAMBIO,
+            comentario=comentario,
+            parcial=str(request.data.get('parcial', '')).lower() in ['1', 'true']
+        )
+        
+        if not resultado['actualizados']:
+            return Response({
+                'success': False,
+                'error': 'No se actualizó ningún ticket',
+                **resultado
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'success': True,
+            'message': f"{len(resultado['actualizados'])} tickets actualizados",
+            **resultado
+        }, status=status.HTTP_200_OK)
+        
+    except transiciones.TransicionInvalida as e:
+        return Response({
+            'success': False,
+            'error': e.mensaje
+        }, status=e.status)
+    except (TypeError, ValueError):
+        return Response({
+            'success': False,
+            'error': 'ticket_ids y estado_id deben ser números'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        import traceback
+        print("Error completo:", traceback.format_exc())
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@csrf_exempt
+@api_view(['POST'])
+@permission_classes([AllowAny])
+def planificar_asignaciones(request):
+    """
+    Planifica la asignación óptima de los tickets abiertos sin técnico
+    (algoritmo húngaro) y, con aplicar=true, la aplica (solo administradores)
+    Body: {"admin_id": 1, "maximo": 10, "limite": 200, "aplicar": false}
+    - maximo: tickets activos máximos por técnico
+    - limite: tickets de la cola a considerar (por prioridad y antigüedad)
+    """
+    try:
+        admin_id = request.data.get('admin_id')
+        
+        if not admin_id:
+            return Response({
+                'success': False,
+                'error': 'admin_id es requerido'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        rol_admin = Usuarios.objects.filter(id_usuarios=admin_id).values_list('roles_id_roles_id', flat=True).first()
+        if rol_admin is None:
+            return Response({
+                'success': False,
+                'error': 'Usuario no encontrado'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        if rol_admin != 3:
+            return Response({
+                'success': False,
+                'error': 'Solo administradores'
+            }, status=status.HTTP_403_FORBIDDEN)
+        
+        maximo = int(request.data.get('maximo') or MAXIMO_ACTIVOS)
+        limite = min(int(request.data.get('limite') or MAXIMO_TICKETS_MASIVO), MAXIMO_TICKETS_MASIVO)
+        aplicar = str(request.data.get('aplicar', '')).lower() in ['1', 'true']
+        
+        planificador = PlanificadorOptimo(maximo_activos=maximo, limite=limite)
+        resultado = planificador.ejecutar(int(admin_id), simular=not aplicar)
+        
+        return Response({
+            'success': True,
+            'aplicado': aplicar,
+            **resultado
+        }, status=status.HTTP_200_OK)
+        
+    except (TypeError, ValueError):
+        return Response({
+            'success': False,
+            'error': 'maximo y limite deben ser números'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        import traceback
+        print("Error completo:", traceback.format_exc())
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
 @csrf_exempt
 @api_view(['DELETE'])
 @permission_classes([AllowAny])
@@ -532,7 +760,10 @@ def eliminar_ticket(request, id_ticket):
     """Eliminar un ticket (solo administradores)"""
     try:
         ticket = Ticket.objects.get(id_ticket=id_ticket)
-        ticket.delete()
+        antes = foto_ticket(ticket)
+        with transaction.atomic():
+            ticket.delete()
+            tickets_cambiados.send(sender=Ticket, cambios=[(antes, None)])
         
         return Response({
             'success': True,
@@ -560,7 +791,11 @@ def eliminar_ticket(request, id_ticket):
 def obtener_historial_ticket(request, id_ticket):
     """Obtener historial de cambios de un ticket"""
     try:
-        historial = HistorialTicket.objects.filter(ticket_id=id_ticket).order_by('-fecha_cambio')
+        historial = HistorialTicket.objects.filter(ticket_id=id_ticket).select_related(
+            'estado_anterior_id',
+            'estado_nuevo_id',
+            'usuario_id__personas_id_personas'
+        ).order_by('-fecha_cambio')
         serializer = HistorialTicketSerializer(historial, many=True)
         
         return Response({
@@ -582,6 +817,7 @@ def obtener_historial_ticket(request, id_ticket):
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@usar_replica
 def estadisticas_tickets(request):
     """Obtener estadísticas generales de tickets + satisfacción"""
     try:
@@ -672,7 +908,8 @@ def mis_tickets(request):
             'categoria_id',
             'estado_id',
             'prioridad_id',
-            'tecnico_asignado_id'
+            'usuario_creador_id__personas_id_personas',
+            'tecnico_asignado_id__personas_id_personas'
         ).order_by('-fecha_creacion')
         
         # Filtros opcionales
@@ -710,8 +947,6 @@ def cancelar_ticket(request, id_ticket):
     Cancelar un ticket (solo si está Abierto y es el creador)
     """
     try:
-        ticket = Ticket.objects.get(id_ticket=id_ticket)
-        
         # Obtener usuario del request
         user_id = request.data.get('usuario_id')
         
@@ -721,33 +956,10 @@ def cancelar_ticket(request, id_ticket):
                 'error': 'usuario_id es requerido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verificar que el usuario sea el creador
-        if ticket.usuario_creador_id.id_usuarios != int(user_id):
-            return Response({
-                'success': False,
-                'error': 'Solo el creador puede cancelar el ticket'
-            }, status=status.HTTP_403_FORBIDDEN)
-        
-        # Verificar que el ticket esté en estado "Abierto"
-        if ticket.estado_id.id_estado_ticket != 1:
-            return Response({
-                'success': False,
-                'error': 'Solo se pueden cancelar tickets en estado Abierto'
-            }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Guardar estado anterior para historial
-        estado_anterior = ticket.estado_id
-        
-        # Cambiar estado a Cancelado (id: 5)
-        ticket.estado_id_id = 5
-        ticket.save()
-        
-        # Registrar en historial
-        HistorialTicket.objects.create(
-            ticket_id=ticket,
-            usuario_id=ticket.usuario_creador_id,
-            estado_anterior_id=estado_anterior,
-            estado_nuevo_id_id=5,
+        transiciones.aplicar(
+            id_ticket,
+            'cancelar',
+            usuario_id=int(user_id),
             comentario='Ticket cancelado por el usuario creador'
         )
         
@@ -756,6 +968,11 @@ def cancelar_ticket(request, id_ticket):
             'message': 'Ticket cancelado exitosamente'
         }, status=status.HTTP_200_OK)
         
+    except transiciones.TransicionInvalida as e:
+        return Response({
+            'success': False,
+            'error': e.mensaje
+        }, status=e.status)
     except Ticket.DoesNotExist:
         return Response({
             'success': False,
@@ -790,7 +1007,7 @@ def mis_tickets(request):
             'categoria_id',
             'estado_id',
             'prioridad_id',
-            'tecnico_asignado_id',
+            'usuario_creador_id__personas_id_personas',
             'tecnico_asignado_id__personas_id_personas'
         ).order_by('-fecha_creacion')
         
@@ -834,7 +1051,7 @@ def tickets_pendientes(request):
             'categoria_id',
             'estado_id',
             'prioridad_id',
-            'tecnico_asignado_id',
+            'usuario_creador_id__personas_id_personas',
             'tecnico_asignado_id__personas_id_personas'
         ).order_by('-fecha_creacion')
         
@@ -859,9 +1076,10 @@ def tickets_pendientes(request):
 def calificar_ticket(request, id_ticket):
     """
     Calificar un ticket resuelto (cambia automáticamente a Cerrado)
+    Enviar version (la del ticket leído) para detectar cambios concurrentes:
+    si el ticket cambió se responde 409.
     """
     try:
-        ticket = Ticket.objects.get(id_ticket=id_ticket)
         user_id = request.data.get('usuario_id')
         
         if not user_id:
@@ -870,63 +1088,61 @@ def calificar_ticket(request, id_ticket):
                 'error': 'usuario_id es requerido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verificar que el ticket esté RESUELTO
-        if ticket.estado_id.id_estado_ticket != 3:
+        # Verificar que NO tenga calificación previa
+        if CalificacionTicket.objects.filter(ticket_id=id_ticket).exists():
             return Response({
                 'success': False,
-                'error': 'Solo se pueden calificar tickets en estado "Resuelto"'
+                'error': 'Este ticket ya fue calificado'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verificar que sea el usuario creador
-        if ticket.usuario_creador_id.id_usuarios != int(user_id):
+        serializer = CalificacionCreateSerializer(data=request.data)
+        if not serializer.is_valid():
             return Response({
                 'success': False,
-                'error': 'Solo el creador del ticket puede calificarlo'
-            }, status=status.HTTP_403_FORBIDDEN)
+                'error': serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Verificar que NO tenga calificación previa
-        if CalificacionTicket.objects.filter(ticket_id=ticket).exists():
+        try:
+            version = request.data.get('version')
+            version = int(version) if version is not None else None
+        except (TypeError, ValueError):
             return Response({
                 'success': False,
-                'error': 'Este ticket ya fue calificado'
+                'error': 'version debe ser un entero'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Crear calificación
-        serializer = CalificacionCreateSerializer(data=request.data)
-        if serializer.is_valid():
-            calificacion = serializer.save(
-                ticket_id=ticket,
-                usuario_id=ticket.usuario_creador_id
+        # La calificación y el cierre se guardan juntos
+        with transaction.atomic():
+            ticket = transiciones.aplicar(
+                id_ticket,
+                'calificar',
+                usuario_id=int(user_id),
+                comentario=f"Ticket cerrado automáticamente después de calificación ({serializer.validated_data['calificacion']}/5 estrellas)",
+                version=version
             )
-            
-            # ✅ CAMBIAR AUTOMÁTICAMENTE A CERRADO
-            estado_anterior = ticket.estado_id
-            ticket.estado_id_id = 4  # Cerrado
-            ticket.fecha_cierre = timezone.now()
-            ticket.save()
-            
-            # Registrar en historial
-            HistorialTicket.objects.create(
+            calificacion = serializer.save(
                 ticket_id=ticket,
-                usuario_id=ticket.usuario_creador_id,
-                estado_anterior_id=estado_anterior,
-                estado_nuevo_id_id=4,
-                comentario=f'Ticket cerrado automáticamente después de calificación ({calificacion.calificacion}/5 estrellas)'
+                usuario_id_id=ticket.usuario_creador_id_id
             )
-            
-            response_serializer = CalificacionTicketSerializer(calificacion)
-            
-            return Response({
-                'success': True,
-                'message': 'Calificación registrada exitosamente. El ticket ha sido cerrado.',
-                'calificacion': response_serializer.data
-            }, status=status.HTTP_201_CREATED)
+            eventos.publicar('calificacion', [{
+                'id_ticket': ticket.id_ticket,
+                'tecnico_id': ticket.tecnico_asignado_id_id,
+                'calificacion': calificacion.calificacion
+            }])
+        
+        response_serializer = CalificacionTicketSerializer(calificacion)
         
         return Response({
-            'success': False,
-            'error': serializer.errors
-        }, status=status.HTTP_400_BAD_REQUEST)
+            'success': True,
+            'message': 'Calificación registrada exitosamente. El ticket ha sido cerrado.',
+            'calificacion': response_serializer.data
+        }, status=status.HTTP_201_CREATED)
         
+    except transiciones.TransicionInvalida as e:
+        return Response({
+            'success': False,
+            'error': e.mensaje
+        }, status=e.status)
     except Ticket.DoesNotExist:
         return Response({
             'success': False,
@@ -993,6 +1209,12 @@ def tickets_sin_calificar(request):
             estado_id=3  # Resuelto (no Cerrado)
         ).exclude(
             id_ticket__in=CalificacionTicket.objects.values_list('ticket_id', flat=True)
+        ).select_related(
+            'categoria_id',
+            'estado_id',
+            'prioridad_id',
+            'usuario_creador_id__personas_id_personas',
+            'tecnico_asignado_id__personas_id_personas'
         ).order_by('-fecha_resolucion')
         
         serializer = TicketListSerializer(tickets, many=True)
@@ -1012,6 +1234,7 @@ def tickets_sin_calificar(request):
     
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@usar_replica
 def estadisticas_historicas(request):
     """
     Obtener estadísticas históricas basadas en el historial de tickets
@@ -1170,13 +1393,165 @@ def estadisticas_historicas(request):
             'error': str(e)
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def estadisticas_tiempos_resolucion(request):
+    """
+    Distribución del tiempo de resolución (media, mediana, p90 e histograma)
+    Parámetros opcionales:
+    - agrupar: tecnico, categoria y/o prioridad separados por coma
+    - tecnico_id, categoria_id, prioridad_id: filtros
+    - fecha_inicio / fecha_fin: YYYY-MM-DD sobre fecha_resolucion
+    """
+    try:
+        from datetime import datetime
+        
+        agrupar = [a for a in request.GET.get('agrupar', '').split(',') if a]
+        invalidos = [a for a in agrupar if a not in DistribucionResolucion.CAMPOS_AGRUPACION]
+        if invalidos:
+            return Response({
+                'success': False,
+                'error': f'agrupar solo admite: {", ".join(DistribucionResolucion.CAMPOS_AGRUPACION)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        tickets = Ticket.objects.all()
+        for filtro in ['tecnico_id', 'categoria_id', 'prioridad_id']:
+            valor = request.GET.get(filtro)
+            if valor:
+                try:
+                    valor = int(valor)
+                except ValueError:
+                    return Response({
+                        'success': False,
+                        'error': f'{filtro} debe ser un número'
+                    }, status=status.HTTP_400_BAD_REQUEST)
+                campo = 'tecnico_asignado_id' if filtro == 'tecnico_id' else filtro
+                tickets = tickets.filter(**{campo: valor})
+        
+        try:
+            fecha_inicio = request.GET.get('fecha_inicio')
+            if fecha_inicio:
+                fecha_inicio_dt = timezone.make_aware(datetime.strptime(fecha_inicio, '%Y-%m-%d'))
+                tickets = tickets.filter(fecha_resolucion__gte=fecha_inicio_dt)
+            
+            fecha_fin = request.GET.get('fecha_fin')
+            if fecha_fin:
+                fecha_fin_dt = timezone.make_aware(datetime.strptime(fecha_fin, '%Y-%m-%d'))
+                tickets = tickets.filter(fecha_resolucion__lte=fecha_fin_dt.replace(hour=23, minute=59, second=59))
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'Formato de fecha inválido (use YYYY-MM-DD)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        grupos = DistribucionResolucion(tickets, agrupar_por=agrupar).resultados()
+        
+        # Nombres de los grupos (una consulta por dimensión)
+        nombres = {}
+        if 'tecnico' in agrupar:
+            nombres['tecnico'] = {
+                u.id_usuarios: u.personas_id_personas.nombre_completo
+                for u in Usuarios.objects.select_related('personas_id_personas').filter(
+                    id_usuarios__in={g['tecnico'] for g in grupos}
+                )
+            }
+        if 'categoria' in agrupar:
+            nombres['categoria'] = dict(CategoriaTicket.objects.values_list('id_categoria_ticket', 'nombre_categoria'))
+        if 'prioridad' in agrupar:
+            nombres['prioridad'] = dict(PrioridadTicket.objects.values_list('id_prioridad_ticket', 'nombre_prioridad'))
+        
+        for grupo in grupos:
+            for clave, por_id in nombres.items():
+                grupo[f'{clave}_nombre'] = por_id.get(grupo[clave])
+        
+        return Response({
+            'success': True,
+            'agrupar': agrupar,
+            'grupos': grupos
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        import traceback
+        print("Error completo:", traceback.format_exc())
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
 ## PERFIL TECNICO
 # ============================================
 # ENDPOINTS PARA TÉCNICOS
 # ============================================
 
+def _calcular_estadisticas_tecnico(tecnico_id):
+    """
+    Estadísticas del técnico con una agregación condicional sobre sus
+    tickets, otra sobre sus calificaciones y la distribución de tiempos
+    """
+    from django.db.models import Avg
+    
+    hoy = timezone.now()
+    inicio_mes = hoy.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    
+    tickets_asignados = Ticket.objects.filter(tecnico_asignado_id=tecnico_id)
+    
+    def contar(**filtros):
+        return Count('id_ticket', filter=Q(**filtros))
+    
+    conteos = tickets_asignados.aggregate(
+        total_asignados=Count('id_ticket'),
+        en_proceso=contar(estado_id=2),
+        resueltos=contar(estado_id=3),
+        cerrados=contar(estado_id=4),
+        # Resueltos este mes (usar fecha_resolucion o fecha_cierre)
+        resueltos_mes=Count('id_ticket', filter=Q(estado_id__in=[3, 4]) & (
+            Q(fecha_resolucion__gte=inicio_mes) | Q(fecha_cierre__gte=inicio_mes)
+        )),
+        # Tickets activos por prioridad
+        baja=contar(estado_id__in=[1, 2], prioridad_id=1),
+        media=contar(estado_id__in=[1, 2], prioridad_id=2),
+        alta=contar(estado_id__in=[1, 2], prioridad_id=3),
+        urgente=contar(estado_id__in=[1, 2], prioridad_id=4)
+    )
+    
+    calificaciones = CalificacionTicket.objects.filter(
+        ticket_id__tecnico_asignado_id=tecnico_id
+    ).aggregate(
+        total=Count('id_calificacion'),
+        promedio=Avg('calificacion'),
+        **{
+            str(i): Count('id_calificacion', filter=Q(calificacion=i))
+            for i in range(1, 6)
+        }
+    )
+    
+    # Distribución del tiempo de resolución (en horas)
+    tiempo_resolucion = DistribucionResolucion(tickets_asignados).total()
+    
+    return {
+        'total_asignados': conteos['total_asignados'],
+        'en_proceso': conteos['en_proceso'],
+        'resueltos': conteos['resueltos'],
+        'cerrados': conteos['cerrados'],
+        'completados': conteos['resueltos'] + conteos['cerrados'],
+        'resueltos_mes': conteos['resueltos_mes'],
+        'tiempo_promedio_horas': tiempo_resolucion['media'] if tiempo_resolucion else 0,
+        'tiempo_resolucion': tiempo_resolucion,
+        'calificacion_promedio': round(calificaciones['promedio'], 2) if calificaciones['total'] else 0,
+        'total_calificaciones': calificaciones['total'],
+        'distribucion_calificaciones': {str(i): calificaciones[str(i)] for i in range(1, 6)},
+        'por_prioridad': {
+            'baja': conteos['baja'],
+            'media': conteos['media'],
+            'alta': conteos['alta'],
+            'urgente': conteos['urgente']
+        }
+    }
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
+@usar_replica
 def tecnico_estadisticas(request):
     """
     Obtener estadísticas personales del técnico
@@ -1190,83 +1565,27 @@ def tecnico_estadisticas(request):
                 'error': 'tecnico_id es requerido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        from django.db.models import Avg, Count
-        
-        # Tickets asignados al técnico
-        tickets_asignados = Ticket.objects.filter(tecnico_asignado_id=tecnico_id)
-        
-        # Conteos por estado
-        total_asignados = tickets_asignados.count()
-        en_proceso = tickets_asignados.filter(estado_id=2).count()
-        resueltos = tickets_asignados.filter(estado_id=3).count()
-        cerrados = tickets_asignados.filter(estado_id=4).count()
-        
-        # Tickets resueltos este mes (usar fecha_resolucion o fecha_cierre)
-        hoy = timezone.now()
-        inicio_mes = hoy.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        from django.db.models import Q
-        resueltos_mes = tickets_asignados.filter(
-            estado_id__in=[3, 4]
-        ).filter(
-            Q(fecha_resolucion__gte=inicio_mes) | Q(fecha_cierre__gte=inicio_mes)
-        ).count()
-        
-        # Tiempo promedio de resolución (en horas)
-        tickets_con_resolucion = tickets_asignados.filter(
-            fecha_resolucion__isnull=False,
-            fecha_asignacion__isnull=False
-        )
-        
-        tiempo_promedio = 0
-        if tickets_con_resolucion.exists():
-            tiempos = []
-            for ticket in tickets_con_resolucion:
-                diferencia = (ticket.fecha_resolucion - ticket.fecha_asignacion).total_seconds() / 3600
-                tiempos.append(diferencia)
-            tiempo_promedio = round(sum(tiempos) / len(tiempos), 1) if tiempos else 0
+        # La clave debe coincidir con la que borra la invalidación (id entero)
+        try:
+            tecnico_id = int(tecnico_id)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'tecnico_id debe ser un entero'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Calificación promedio
-        calificaciones = CalificacionTicket.objects.filter(
-            ticket_id__tecnico_asignado_id=tecnico_id
-        )
-        total_calificaciones = calificaciones.count()
-        promedio_calificacion = 0
+        clave_cache = CLAVE_ESTADISTICAS_TECNICO.format(tecnico_id)
+        estadisticas = cache.get(clave_cache)
         
-        if total_calificaciones > 0:
-            promedio_calificacion = round(
-                calificaciones.aggregate(Avg('calificacion'))['calificacion__avg'], 
-                2
-            )
-        
-        # Distribución de calificaciones
-        distribucion_calificaciones = {}
-        for i in range(1, 6):
-            distribucion_calificaciones[str(i)] = calificaciones.filter(calificacion=i).count()
-        
-        # Tickets por prioridad (activos)
-        tickets_activos = tickets_asignados.filter(estado_id__in=[1, 2])
-        por_prioridad = {
-            'baja': tickets_activos.filter(prioridad_id=1).count(),
-            'media': tickets_activos.filter(prioridad_id=2).count(),
-            'alta': tickets_activos.filter(prioridad_id=3).count(),
-            'urgente': tickets_activos.filter(prioridad_id=4).count()
-        }
+        if estadisticas is None:
+            # Se guarda por TTL_ESTADISTICAS_TECNICO: desde la réplica podría guardar datos previos a la invalidación
+            with leer_primaria():
+                estadisticas = _calcular_estadisticas_tecnico(tecnico_id)
+            cache.set(clave_cache, estadisticas, ttl_invalidable(TTL_ESTADISTICAS_TECNICO))
         
         return Response({
             'success': True,
-            'estadisticas': {
-                'total_asignados': total_asignados,
-                'en_proceso': en_proceso,
-                'resueltos': resueltos,
-                'cerrados': cerrados,
-                'completados': resueltos + cerrados,
-                'resueltos_mes': resueltos_mes,
-                'tiempo_promedio_horas': tiempo_promedio,
-                'calificacion_promedio': promedio_calificacion,
-                'total_calificaciones': total_calificaciones,
-                'distribucion_calificaciones': distribucion_calificaciones,
-                'por_prioridad': por_prioridad
-            }
+            'estadisticas': estadisticas
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -1304,8 +1623,8 @@ def tecnico_mis_tickets(request):
             'categoria_id',
             'estado_id',
             'prioridad_id',
-            'usuario_creador_id',
-            'usuario_creador_id__personas_id_personas'
+            'usuario_creador_id__personas_id_personas',
+            'tecnico_asignado_id__personas_id_personas'
         )
         
         # Filtrar por estado si se especifica
@@ -1371,8 +1690,8 @@ def tecnico_historial(request):
             'categoria_id',
             'estado_id',
             'prioridad_id',
-            'usuario_creador_id',
-            'usuario_creador_id__personas_id_personas'
+            'usuario_creador_id__personas_id_personas',
+            'tecnico_asignado_id__personas_id_personas'
         )
         
         # Filtrar por fechas si se proporcionan
@@ -1397,17 +1716,21 @@ def tecnico_historial(request):
         # Serializar
         serializer = TicketListSerializer(tickets, many=True)
         
-        # Agregar calificación a cada ticket
+        # Agregar calificación a cada ticket (una sola consulta para todas)
         tickets_data = serializer.data
+        calificaciones = {
+            c.ticket_id_id: c
+            for c in CalificacionTicket.objects.filter(ticket_id__in=tickets.values('id_ticket'))
+        }
         for ticket_data in tickets_data:
-            try:
-                calificacion = CalificacionTicket.objects.get(ticket_id=ticket_data['id_ticket'])
+            calificacion = calificaciones.get(ticket_data['id_ticket'])
+            if calificacion:
                 ticket_data['calificacion'] = {
                     'valor': calificacion.calificacion,
                     'comentario': calificacion.comentario,
                     'fecha': calificacion.fecha_calificacion
                 }
-            except CalificacionTicket.DoesNotExist:
+            else:
                 ticket_data['calificacion'] = None
         
         return Response({
@@ -1425,11 +1748,121 @@ def tecnico_historial(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _construir_alertas_tecnico(tecnico_id, contador):
+    """
+    Alertas del técnico a partir de su contador. Solo los conteos que
+    dependen de la hora (nuevos, antiguos) y la lista de urgentes consultan
+    los tickets.
+    """
+    from datetime import timedelta
+    
+    clave_cache = CLAVE_ALERTAS_TECNICO.format(tecnico_id, contador.version)
+    resultado = cache.get(clave_cache)
+    if resultado is not None:
+        return resultado
+    
+    hoy = timezone.now()
+    hace_24h = hoy - timedelta(hours=24)
+    hace_3_dias = hoy - timedelta(days=3)
+    
+    # Tickets urgentes sin resolver
+    tickets_urgentes = contador.activos_urgente
+    
+    # Tickets pendientes de atención (Abierto, asignado pero no en proceso)
+    tickets_pendientes = contador.abiertos
+    
+    tickets_nuevos = tickets_antiguos = 0
+    if contador.activos:
+        por_fecha = Ticket.objects.filter(
+            tecnico_asignado_id=tecnico_id,
+            estado_id__in=[1, 2]
+        ).aggregate(
+            # Tickets nuevos (asignados en las últimas 24h)
+            nuevos=Count('id_ticket', filter=Q(fecha_asignacion__gte=hace_24h)),
+            # Tickets en proceso hace más de 3 días
+            antiguos=Count('id_ticket', filter=Q(estado_id=2, fecha_asignacion__lte=hace_3_dias))
+        )
+        tickets_nuevos = por_fecha['nuevos']
+        tickets_antiguos = por_fecha['antiguos']
+    
+    # Lista de tickets urgentes para mostrar
+    lista_urgentes = []
+    if tickets_urgentes > 0:
+        lista_urgentes = TicketListSerializer(
+            Ticket.objects.filter(
+                tecnico_asignado_id=tecnico_id,
+                prioridad_id=4,
+                estado_id__in=[1, 2]
+            ).select_related(
+                'categoria_id',
+                'estado_id',
+                'prioridad_id',
+                'usuario_creador_id__personas_id_personas',
+                'tecnico_asignado_id__personas_id_personas'
+            ).order_by('fecha_creacion')[:5],
+            many=True
+        ).data
+    
+    alertas = []
+    
+    if tickets_urgentes > 0:
+        alertas.append({
+            'tipo': 'urgente',
+            'icono': '🚨',
+            'mensaje': f'Tienes {tickets_urgentes} ticket{"s" if tickets_urgentes > 1 else ""} urgente{"s" if tickets_urgentes > 1 else ""} pendiente{"s" if tickets_urgentes > 1 else ""}',
+            'cantidad': tickets_urgentes
+        })
+    
+    if tickets_nuevos > 0:
+        alertas.append({
+            'tipo': 'nuevo',
+            'icono': '🆕',
+            'mensaje': f'Tienes {tickets_nuevos} ticket{"s" if tickets_nuevos > 1 else ""} nuevo{"s" if tickets_nuevos > 1 else ""} asignado{"s" if tickets_nuevos > 1 else ""}',
+            'cantidad': tickets_nuevos
+        })
+    
+    if tickets_antiguos > 0:
+        alertas.append({
+            'tipo': 'antiguo',
+            'icono': '⏰',
+            'mensaje': f'Tienes {tickets_antiguos} ticket{"s" if tickets_antiguos > 1 else ""} sin resolver hace más de 3 días',
+            'cantidad': tickets_antiguos
+        })
+    
+    if tickets_pendientes > 0:
+        alertas.append({
+            'tipo': 'pendiente',
+            'icono': '📋',
+            'mensaje': f'Tienes {tickets_pendientes} ticket{"s" if tickets_pendientes > 1 else ""} pendiente{"s" if tickets_pendientes > 1 else ""} de iniciar',
+            'cantidad': tickets_pendientes
+        })
+    
+    resultado = {
+        'version': contador.version,
+        'alertas': alertas,
+        'resumen': {
+            'urgentes': tickets_urgentes,
+            'nuevos': tickets_nuevos,
+            'antiguos': tickets_antiguos,
+            'pendientes': tickets_pendientes
+        },
+        'tickets_urgentes': lista_urgentes
+    }
+    cache.set(clave_cache, resultado, TTL_ALERTAS_TECNICO)
+    
+    return resultado
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def tecnico_alertas(request):
     """
     Obtener alertas y notificaciones para el técnico
+    Parámetros opcionales:
+    - version: última versión recibida; si no hubo cambios solo se
+      responde sin_cambios (una consulta)
+    - esperar: segundos (máx. 30) a esperar un cambio antes de responder
+      (long-poll). Para recibir los cambios en vivo usar tecnico/alertas/stream/
     """
     try:
         tecnico_id = request.GET.get('tecnico_id')
@@ -1440,97 +1873,32 @@ def tecnico_alertas(request):
                 'error': 'tecnico_id es requerido'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        from datetime import timedelta
-        
-        hoy = timezone.now()
-        hace_24h = hoy - timedelta(hours=24)
-        hace_3_dias = hoy - timedelta(days=3)
-        
-        # Tickets urgentes sin resolver
-        tickets_urgentes = Ticket.objects.filter(
-            tecnico_asignado_id=tecnico_id,
-            prioridad_id=4,  # Urgente
-            estado_id__in=[1, 2]  # Abierto o En Proceso
-        ).count()
-        
-        # Tickets nuevos (asignados en las últimas 24h)
-        tickets_nuevos = Ticket.objects.filter(
-            tecnico_asignado_id=tecnico_id,
-            fecha_asignacion__gte=hace_24h,
-            estado_id__in=[1, 2]
-        ).count()
-        
-        # Tickets sin atender hace más de 3 días
-        tickets_antiguos = Ticket.objects.filter(
-            tecnico_asignado_id=tecnico_id,
-            estado_id=2,  # En Proceso
-            fecha_asignacion__lte=hace_3_dias
-        ).count()
+        try:
+            tecnico_id = int(tecnico_id)
+            version = request.GET.get('version')
+            version = int(version) if version is not None else None
+            esperar = min(int(request.GET.get('esperar', 0)), 30)
+        except ValueError:
+            return Response({
+                'success': False,
+                'error': 'tecnico_id, version y esperar deben ser enteros'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Tickets pendientes de atención (Abierto, asignado pero no en proceso)
-        tickets_pendientes = Ticket.objects.filter(
-            tecnico_asignado_id=tecnico_id,
-            estado_id=1  # Abierto
-        ).count()
+        if version is not None and esperar > 0:
+            contador = contadores.esperar_cambio(tecnico_id, version, esperar)
+        else:
+            contador = contadores.obtener(tecnico_id)
         
-        # Lista de tickets urgentes para mostrar
-        lista_urgentes = Ticket.objects.filter(
-            tecnico_asignado_id=tecnico_id,
-            prioridad_id=4,
-            estado_id__in=[1, 2]
-        ).select_related(
-            'categoria_id',
-            'estado_id',
-            'prioridad_id',
-            'usuario_creador_id__personas_id_personas'
-        ).order_by('fecha_creacion')[:5]
-        
-        serializer = TicketListSerializer(lista_urgentes, many=True)
-        
-        alertas = []
-        
-        if tickets_urgentes > 0:
-            alertas.append({
-                'tipo': 'urgente',
-                'icono': '🚨',
-                'mensaje': f'Tienes {tickets_urgentes} ticket{"s" if tickets_urgentes > 1 else ""} urgente{"s" if tickets_urgentes > 1 else ""} pendiente{"s" if tickets_urgentes > 1 else ""}',
-                'cantidad': tickets_urgentes
-            })
-        
-        if tickets_nuevos > 0:
-            alertas.append({
-                'tipo': 'nuevo',
-                'icono': '🆕',
-                'mensaje': f'Tienes {tickets_nuevos} ticket{"s" if tickets_nuevos > 1 else ""} nuevo{"s" if tickets_nuevos > 1 else ""} asignado{"s" if tickets_nuevos > 1 else ""}',
-                'cantidad': tickets_nuevos
-            })
-        
-        if tickets_antiguos > 0:
-            alertas.append({
-                'tipo': 'antiguo',
-                'icono': '⏰',
-                'mensaje': f'Tienes {tickets_antiguos} ticket{"s" if tickets_antiguos > 1 else ""} sin resolver hace más de 3 días',
-                'cantidad': tickets_antiguos
-            })
-        
-        if tickets_pendientes > 0:
-            alertas.append({
-                'tipo': 'pendiente',
-                'icono': '📋',
-                'mensaje': f'Tienes {tickets_pendientes} ticket{"s" if tickets_pendientes > 1 else ""} pendiente{"s" if tickets_pendientes > 1 else ""} de iniciar',
-                'cantidad': tickets_pendientes
-            })
+        if version is not None and contador.version == version:
+            return Response({
+                'success': True,
+                'sin_cambios': True,
+                'version': contador.version
+            }, status=status.HTTP_200_OK)
         
         return Response({
             'success': True,
-            'alertas': alertas,
-            'resumen': {
-                'urgentes': tickets_urgentes,
-                'nuevos': tickets_nuevos,
-                'antiguos': tickets_antiguos,
-                'pendientes': tickets_pendientes
-            },
-            'tickets_urgentes': serializer.data
+            **_construir_alertas_tecnico(tecnico_id, contador)
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -1545,11 +1913,102 @@ def tecnico_alertas(request):
 # RECLAMOS
 # ============================================
 
+
+def tecnico_alertas_stream(request):
+    """
+    Canal Server-Sent Events con las alertas del técnico.
+    Bajo ASGI envía las alertas al conectar y luego un evento con el delta
+    del resumen cada vez que cambian sus tickets; se cierra tras
+    DURACION_STREAM_ALERTAS segundos y el navegador reconecta con
+    Last-Event-ID (la versión).
+    Bajo WSGI cada conexión abierta ocuparía un worker: responde sin esperar
+    (las alertas si cambiaron desde Last-Event-ID) y el navegador reconecta
+    tras REINTENTO_STREAM_WSGI segundos.
+    """
+    import json
+    from asgiref.sync import sync_to_async
+    from django.core.handlers.asgi import ASGIRequest
+    from django.core.serializers.json import DjangoJSONEncoder
+    from django.http import JsonResponse, StreamingHttpResponse
+    
+    tecnico_id = request.GET.get('tecnico_id')
+    if not tecnico_id:
+        return JsonResponse({
+            'success': False,
+            'error': 'tecnico_id es requerido'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        tecnico_id = int(tecnico_id)
+        ultima_version = request.headers.get('Last-Event-ID')
+        version_inicial = int(ultima_version) if ultima_version else None
+    except ValueError:
+        return JsonResponse({
+            'success': False,
+            'error': 'tecnico_id y Last-Event-ID deben ser enteros'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    def mensaje(version, datos):
+        return f"id: {version}\nevent: alertas\ndata: {json.dumps(datos, cls=DjangoJSONEncoder)}\n\n"
+    
+    def eventos_wsgi():
+        yield f'retry: {REINTENTO_STREAM_WSGI * 1000}\n\n'
+        contador = contadores.obtener(tecnico_id)
+        if contador.version != version_inicial:
+            yield mensaje(contador.version, _construir_alertas_tecnico(tecnico_id, contador))
+    
+    async def eventos():
+        # Generador async: StreamingHttpResponse lo envía a medida que produce
+        # (uno síncrono se consumiría entero antes de enviar) y las esperas
+        # usan asyncio.sleep; solo las consultas pasan por sync_to_async
+        version = version_inicial
+        resumen = None
+        fin = time.monotonic() + DURACION_STREAM_ALERTAS
+        
+        yield 'retry: 3000\n\n'
+        
+        while time.monotonic() < fin:
+            espera = min(LATIDO_STREAM_ALERTAS, fin - time.monotonic())
+            if version is None:
+                contador = await sync_to_async(contadores.obtener)(tecnico_id)
+            else:
+                contador = await contadores.aesperar_cambio(tecnico_id, version, espera)
+            
+            if contador.version == version:
+                yield ': latido\n\n'
+                continue
+            
+            datos = await sync_to_async(_construir_alertas_tecnico)(tecnico_id, contador)
+            if resumen is not None:
+                datos = {
+                    **datos,
+                    'delta': {
+                        clave: valor - resumen[clave]
+                        for clave, valor in datos['resumen'].items()
+                        if valor != resumen[clave]
+                    }
+                }
+            
+            version = contador.version
+            resumen = datos['resumen']
+            yield mensaje(version, datos)
+    
+    continuo = isinstance(request, ASGIRequest)
+    respuesta = StreamingHttpResponse(eventos() if continuo else eventos_wsgi(), content_type='text/event-stream')
+    respuesta['Cache-Control'] = 'no-cache'
+    respuesta['X-Accel-Buffering'] = 'no'
+    return respuesta
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def listar_reclamos(request):
     try:
-        reclamos = Reclamo.objects.all()
+        reclamos = Reclamo.objects.select_related(
+            'ticket_id',
+            'usuario_id__personas_id_personas',
+            'tecnico_id__personas_id_personas'
+        )
         
         tecnico_id = request.GET.get('tecnico_id')
         if tecnico_id:
@@ -1585,6 +2044,16 @@ def obtener_reclamo(request, id_reclamo):
         return Response({'success': False, 'error': 'Reclamo no encontrado'}, status=status.HTTP_404_NOT_FOUND)
 
 
+def _publicar_reclamo(reclamo):
+    """Evento 'reclamo' del outbox (dentro de la transacción del cambio)"""
+    eventos.publicar('reclamo', [{
+        'id_reclamo': reclamo.id_reclamo,
+        'ticket_id': reclamo.ticket_id_id,
+        'tecnico_id': reclamo.tecnico_id_id,
+        'estado': reclamo.estado
+    }])
+
+
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def crear_reclamo(request):
@@ -1603,14 +2072,16 @@ def crear_reclamo(request):
         if not ticket.tecnico_asignado_id:
             return Response({'success': False, 'error': 'El ticket no tiene técnico asignado'}, status=status.HTTP_400_BAD_REQUEST)
         
-        reclamo = Reclamo.objects.create(
-            ticket_id=ticket,
-            usuario_id=ticket.usuario_creador_id,
-            tecnico_id=ticket.tecnico_asignado_id,
-            categoria=request.data.get('categoria'),
-            descripcion=request.data.get('descripcion'),
-            prioridad=request.data.get('prioridad', 'media')
-        )
+        with transaction.atomic():
+            reclamo = Reclamo.objects.create(
+                ticket_id=ticket,
+                usuario_id=ticket.usuario_creador_id,
+                tecnico_id=ticket.tecnico_asignado_id,
+                categoria=request.data.get('categoria'),
+                descripcion=request.data.get('descripcion'),
+                prioridad=request.data.get('prioridad', 'media')
+            )
+            _publicar_reclamo(reclamo)
         
         serializer = ReclamoDetailSerializer(reclamo)
         return Response({'success': True, 'message': 'Reclamo creado', 'reclamo': serializer.data}, status=status.HTTP_201_CREATED)
@@ -1638,7 +2109,9 @@ def actualizar_reclamo(request, id_reclamo):
             reclamo.respuesta_admin = request.data['respuesta_admin']
         
         reclamo.admin_revisor_id = admin
-        reclamo.save()
+        with transaction.atomic():
+            reclamo.save()
+            _publicar_reclamo(reclamo)
         
         serializer = ReclamoDetailSerializer(reclamo)
         return Response({'success': True, 'reclamo': serializer.data}, status=status.HTTP_200_OK)
@@ -1646,47 +2119,89 @@ def actualizar_reclamo(request, id_reclamo):
         return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+def _calcular_estadisticas_reclamos():
+    """
+    Conteos de reclamos por técnico con agregación condicional; los totales
+    generales son la suma de las filas. tasa_reclamos = reclamos por ticket
+    cerrado del técnico.
+    """
+    from django.db.models import IntegerField, OuterRef, Subquery
+    
+    def contar(**filtros):
+        return Count('id_reclamo', filter=Q(**filtros))
+    
+    tickets_cerrados = Ticket.objects.filter(
+        tecnico_asignado_id=OuterRef('tecnico_id'),
+        estado_id=4
+    ).order_by().values('tecnico_asignado_id').annotate(
+        total=Count('id_ticket')
+    ).values('total')
+    
+    filas = list(Reclamo.objects.values(
+        'tecnico_id__id_usuarios',
+        'tecnico_id__personas_id_personas__primer_nombre',
+        'tecnico_id__personas_id_personas__primer_apellido'
+    ).annotate(
+        total_reclamos=Count('id_reclamo'),
+        pendientes=contar(estado='pendiente'),
+        resueltos=contar(estado='resuelto'),
+        solucion_ticket=contar(categoria='solucion_ticket'),
+        comportamiento_tecnico=contar(categoria='comportamiento_tecnico'),
+        baja=contar(prioridad='baja'),
+        media=contar(prioridad='media'),
+        alta=contar(prioridad='alta'),
+        tickets_cerrados=Subquery(tickets_cerrados, output_field=IntegerField())
+    ).order_by('-total_reclamos'))
+    
+    def sumar(campo):
+        return sum(f[campo] for f in filas)
+    
+    por_tecnico = [{
+        'tecnico_id': f['tecnico_id__id_usuarios'],
+        'nombre': f"{f['tecnico_id__personas_id_personas__primer_nombre']} {f['tecnico_id__personas_id_personas__primer_apellido']}",
+        'total': f['total_reclamos'],
+        'tickets_cerrados': f['tickets_cerrados'] or 0,
+        'tasa_reclamos': round(f['total_reclamos'] / f['tickets_cerrados'], 3) if f['tickets_cerrados'] else None
+    } for f in filas]
+    
+    return {
+        'total': sumar('total_reclamos'),
+        'pendientes': sumar('pendientes'),
+        'resueltos': sumar('resueltos'),
+        'por_categoria': {
+            'solucion_ticket': sumar('solucion_ticket'),
+            'comportamiento_tecnico': sumar('comportamiento_tecnico'),
+        },
+        'por_prioridad': {
+            'baja': sumar('baja'),
+            'media': sumar('media'),
+            'alta': sumar('alta'),
+        },
+        'top_tecnicos': [
+            {clave: t[clave] for clave in ('tecnico_id', 'nombre', 'total')}
+            for t in por_tecnico[:5]
+        ],
+        'por_tecnico': por_tecnico
+    }
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def estadisticas_reclamos(request):
+    """
+    Estadísticas de reclamos. Se calculan en una sola pasada agrupada por
+    técnico (con sus tickets cerrados como subconsulta) y se cachean hasta
+    que cambia un reclamo o un ticket cerrado.
+    """
     try:
-        total = Reclamo.objects.count()
-        pendientes = Reclamo.objects.filter(estado='pendiente').count()
-        resueltos = Reclamo.objects.filter(estado='resuelto').count()
-        
-        por_categoria = {
-            'solucion_ticket': Reclamo.objects.filter(categoria='solucion_ticket').count(),
-            'comportamiento_tecnico': Reclamo.objects.filter(categoria='comportamiento_tecnico').count(),
-        }
-        
-        por_prioridad = {
-            'baja': Reclamo.objects.filter(prioridad='baja').count(),
-            'media': Reclamo.objects.filter(prioridad='media').count(),
-            'alta': Reclamo.objects.filter(prioridad='alta').count(),
-        }
-        
-        top_tecnicos = Reclamo.objects.values(
-            'tecnico_id__id_usuarios',
-            'tecnico_id__personas_id_personas__primer_nombre',
-            'tecnico_id__personas_id_personas__primer_apellido'
-        ).annotate(total_reclamos=Count('id_reclamo')).order_by('-total_reclamos')[:5]
-        
-        top_list = [{
-            'tecnico_id': t['tecnico_id__id_usuarios'],
-            'nombre': f"{t['tecnico_id__personas_id_personas__primer_nombre']} {t['tecnico_id__personas_id_personas__primer_apellido']}",
-            'total': t['total_reclamos']
-        } for t in top_tecnicos]
+        estadisticas = cache.get(CLAVE_ESTADISTICAS_RECLAMOS)
+        if estadisticas is None:
+            estadisticas = _calcular_estadisticas_reclamos()
+            cache.set(CLAVE_ESTADISTICAS_RECLAMOS, estadisticas, ttl_invalidable(TTL_ESTADISTICAS_RECLAMOS))
         
         return Response({
             'success': True,
-            'estadisticas': {
-                'total': total,
-                'pendientes': pendientes,
-                'resueltos': resueltos,
-                'por_categoria': por_categoria,
-                'por_prioridad': por_prioridad,
-                'top_tecnicos': top_list
-            }
+            'estadisticas': estadisticas
         }, status=status.HTTP_200_OK)
     except Exception as e:
         return Response({'success': False, 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
\ No newline at end of file